@@ -0,0 +1,102 @@
+# accuracy.py
+# Reader accuracy against the ground truth in a task's manifest.
+#
+# Each reader's ratings are joined with the manifest labels and reduced to the
+# four confusion counts (TP, FN, TN, FP) for the task's positive option; accuracy,
+# sensitivity, specificity and balanced accuracy follow from those. Resampling a
+# reader's cases with replacement only changes how many land in each of the four
+# cells, so a bootstrap replicate is one multinomial draw over the cells: all
+# replicates of a reader come from a single vectorized call, independent of the
+# number of cases. Readers are bootstrapped independently and can be spread over a
+# process pool; per-reader seeds make the result the same either way.
+#
+# Only numpy and pandas are imported here, so pool workers start quickly.
+import multiprocessing
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+BOOTSTRAP_REPLICATES = 2000
+CONFIDENCE = 0.95
+METRICS = ("accuracy", "sensitivity", "specificity", "balanced_accuracy")
+CELLS = ("tp", "fn", "tn", "fp")
+
+# Replicates x readers below which a process pool costs more than it saves
+PARALLEL_MIN_DRAWS = 10_000_000
+
+
+def truth_labels(task, manifest):
+    """Ground truth option per case id (str) from a manifest; unlabeled cases are left out"""
+    codes = pd.to_numeric(manifest[task.truth_column], errors="coerce")
+    valid = codes.notna() & codes.between(0, len(task.truth_options) - 1)
+    options = np.array(task.truth_options, dtype=object)[codes[valid].astype(int).to_numpy()]
+    return pd.Series(options, index=manifest.loc[valid, "CaseID"].astype(str).to_numpy(), name="truth")
+
+
+def confusion_counts(results, truth, task):
+    """TP, FN, TN, FP per reader (DataFrame indexed by reader_id) of the rated, labeled cases"""
+    frame = pd.DataFrame({
+        "reader_id": results["reader_id"].astype(str),
+        "case_id": results["case_id"].astype(str),
+        "rating": results[task.db_column],
+    })
+    frame = frame[frame["rating"].isin(task.options)].join(truth, on="case_id", how="inner")
+    predicted = (frame["rating"] == task.positive_option).to_numpy()
+    actual = (frame["truth"] == task.positive_option).to_numpy()
+    cells = np.select([predicted & actual, ~predicted & actual, ~predicted & ~actual], CELLS[:3], CELLS[3])
+    counts = pd.crosstab(frame["reader_id"].to_numpy(), cells).reindex(columns=list(CELLS), fill_value=0)
+    counts.index.name, counts.columns.name = "reader_id", None
+    return counts.astype(np.int64)
+
+
+def metrics(counts):
+    """(..., 4) confusion counts -> (..., 4) accuracy, sensitivity, specificity, balanced accuracy"""
+    tp, fn, tn, fp = np.moveaxis(np.asarray(counts, dtype=np.float64), -1, 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sensitivity = tp / (tp + fn)
+        specificity = tn / (tn + fp)
+        accuracy = (tp + tn) / (tp + fn + tn + fp)
+    return np.stack([accuracy, sensitivity, specificity, (sensitivity + specificity) / 2], axis=-1)
+
+
+def bootstrap_interval(counts, replicates, seed, confidence=CONFIDENCE):
+    """Percentile interval (2 x 4: low, high) of the metrics of one reader's confusion counts"""
+    counts = np.asarray(counts, dtype=np.int64)
+    total = int(counts.sum())
+    if total == 0:
+        return np.full((2, len(METRICS)), np.nan)
+    rng = np.random.default_rng(seed)
+    draws = rng.multinomial(total, counts / total, size=replicates)
+    tail = (1 - confidence) / 2 * 100
+    with warnings.catch_warnings():
+        # A reader without positives (or negatives) has no sensitivity (or specificity)
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.nanpercentile(metrics(draws), [tail, 100 - tail], axis=0)
+
+
+def accuracy_report(results, manifest, task, replicates=BOOTSTRAP_REPLICATES, seed=0, workers=1,
+                    confidence=CONFIDENCE):
+    """One row per reader: cases, confusion counts, metrics and their bootstrap interval"""
+    counts = confusion_counts(results, truth_labels(task, manifest), task)
+    seeds = np.random.SeedSequence(seed).spawn(len(counts))
+    rows = list(counts.to_numpy())
+    if workers > 1 and len(rows) > 1 and replicates * len(rows) >= PARALLEL_MIN_DRAWS:
+        # Spawned: a forked Streamlit worker would hand the children its threads' locks
+        with ProcessPoolExecutor(max_workers=min(workers, len(rows)),
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            intervals = list(pool.map(bootstrap_interval, rows, [replicates] * len(rows), seeds,
+                                      [confidence] * len(rows)))
+    else:
+        intervals = [bootstrap_interval(row, replicates, s, confidence) for row, s in zip(rows, seeds)]
+
+    report = counts.copy()
+    report.insert(0, "cases", counts.sum(axis=1))
+    point = metrics(counts.to_numpy()) if len(counts) else np.empty((0, len(METRICS)))
+    bounds = np.array(intervals) if intervals else np.empty((0, 2, len(METRICS)))
+    for column, metric in enumerate(METRICS):
+        report[metric] = point[:, column]
+        report[f"{metric}_low"] = bounds[:, 0, column]
+        report[f"{metric}_high"] = bounds[:, 1, column]
+    return report.reset_index()
@@ -0,0 +1,159 @@
+# activity.py
+import atexit
+import threading
+import time
+from datetime import datetime, timezone
+
+import streamlit as st
+
+from utils import init_supabase
+
+ACTIVITY_TABLE = "reader_activity"
+FLUSH_INTERVAL_SECONDS = 10
+MAX_BATCH = 500
+# Events held while the store cannot be written; past this the oldest are dropped
+MAX_BUFFERED = 50_000
+
+
+class ActivityTracker:
+    """Buffers reader activity in process and writes it to the store in batches on a timer"""
+
+    def __init__(self, supabase, flush_interval=FLUSH_INTERVAL_SECONDS, max_batch=MAX_BATCH,
+                 max_buffered=MAX_BUFFERED):
+        self.supabase = supabase
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_buffered = max_buffered
+        self.error = None
+        self.dropped = 0
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="activity-flush", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def record(self, reader_id, event, module=None, case_id=None, dwell_ms=None):
+        if not reader_id:
+            return
+        with self._lock:
+            self._buffer.append({
+                "reader_id": str(reader_id),
+                "event": event,
+                "module": module,
+                "case_id": None if case_id is None else str(case_id),
+                "dwell_ms": dwell_ms,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+            })
+            self._trim()
+            full = len(self._buffer) >= self.max_batch
+        if full:
+            self._wake.set()
+
+    def flush_soon(self):
+        """Ask the flush thread to write now instead of at its next tick"""
+        self._wake.set()
+
+    def pending(self):
+        """Events recorded in this process and not written yet"""
+        with self._lock:
+            return len(self._buffer)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """Write everything buffered so far, returns the number of events written"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+            if not batch or self.supabase is None:
+                return 0
+            written = 0
+            try:
+                for start in range(0, len(batch), self.max_batch):
+                    self.supabase.table(ACTIVITY_TABLE).insert(batch[start:start + self.max_batch]).execute()
+                    written = start + self.max_batch
+                self.error = None
+                return len(batch)
+            except Exception as e:
+                # Keep the unwritten events for the next tick, within the buffer cap
+                self.error = e
+                with self._lock:
+                    self._buffer = batch[written:] + self._buffer
+                    self._trim()
+                return written
+
+    def _trim(self):
+        # Called with the lock held: drop the oldest events past the cap
+        excess = len(self._buffer) - self.max_buffered
+        if excess > 0:
+            del self._buffer[:excess]
+            self.dropped += excess
+
+
+@st.cache_resource
+def get_activity_tracker():
+    return ActivityTracker(init_supabase())
+
+
+def track_page_view(module):
+    """Record a page view once per page change, not on every rerun"""
+    if st.session_state.get("_activity_page") == module:
+        return
+    st.session_state["_activity_page"] = module
+    get_activity_tracker().record(st.session_state.get("reader_id"), "page_view", module=module)
+
+
+def track_case_view(module, case_id):
+    """Start the dwell clock for the case on screen; leaving it unsaved records a view"""
+    current = st.session_state.get("_activity_case")
+    if current is not None and current[:2] == (module, str(case_id)):
+        return
+    if current is not None:
+        _record_dwell("case_view", current)
+    st.session_state["_activity_case"] = (module, str(case_id), time.monotonic())
+
+
+def track_save(module, case_id):
+    """Record a save with the time spent on the case"""
+    current = st.session_state.get("_activity_case")
+    if current is None or current[:2] != (module, str(case_id)):
+        current = (module, str(case_id), time.monotonic())
+    _record_dwell("save", current)
+    st.session_state["_activity_case"] = None
+
+
+def track_bulk_save(module, case_ids):
+    """Record a save per case of a grid page, sharing the time spent on the page between them"""
+    current = st.session_state.get("_activity_case")
+    started = current[2] if current is not None and current[0] == module else time.monotonic()
+    dwell_ms = int((time.monotonic() - started) * 1000 / max(len(case_ids), 1))
+    tracker = get_activity_tracker()
+    for case_id in case_ids:
+        tracker.record(st.session_state.get("reader_id"), "save",
+                       module=module, case_id=str(case_id), dwell_ms=dwell_ms)
+    st.session_state["_activity_case"] = None
+
+
+def _record_dwell(event, current):
+    module, case_id, started = current
+    dwell_ms = int((time.monotonic() - started) * 1000)
+    get_activity_tracker().record(st.session_state.get("reader_id"), event,
+                                  module=module, case_id=case_id, dwell_ms=dwell_ms)
+
+
+def load_activity_summary(supabase):
+    """Currently active readers and per-reader throughput, from the aggregate views
+
+    The views lag by what the trackers still buffer; this process's buffer is flushed in
+    the background rather than on the page render.
+    """
+    get_activity_tracker().flush_soon()
+    active = supabase.table("active_readers").select("*").execute().data or []
+    throughput = supabase.table("reader_throughput").select("*").execute().data or []
+    return active, throughput
@@ -0,0 +1,228 @@
+# agreement.py
+# Inter-reader agreement of the result tables.
+#
+# Ratings are pivoted into a reader x case matrix of category codes. Next to it the
+# matrix keeps, for every reader pair, the K x K table of how often one reader gave
+# category i where the other gave j, and for every case the count of each category.
+# One changed rating moves those counts in O(readers), so the matrix follows a
+# LiveTable's change feed deltas; the statistics are computed for all pairs at once
+# from the counts and cached until the next change.
+#
+# Nominal tasks: Cohen's kappa per pair, Fleiss' kappa overall.
+# Ordinal tasks (Task.ordinal): quadratic weighted kappa per pair as well, and
+# Krippendorff's alpha with the ordinal metric (nominal metric otherwise).
+import numpy as np
+import pandas as pd
+
+MISSING = -1
+INITIAL_CAPACITY = 16
+
+
+class AgreementMatrix:
+    """Reader x case category codes of one task and the pair and case counts they imply"""
+
+    def __init__(self, task):
+        self.task = task
+        self.k = len(task.options)
+        self.option_codes = {option: code for code, option in enumerate(task.options)}
+        self.readers = []
+        self.cases = []
+        self.reader_index = {}
+        self.case_index = {}
+        self.codes = np.full((INITIAL_CAPACITY, INITIAL_CAPACITY), MISSING, dtype=np.int8)
+        # pair_counts[a, b, i, j]: cases reader a rated i and reader b rated j (a != b)
+        self.pair_counts = np.zeros((INITIAL_CAPACITY, INITIAL_CAPACITY, self.k, self.k), dtype=np.int32)
+        # case_counts[c, i]: readers who rated case c as i
+        self.case_counts = np.zeros((INITIAL_CAPACITY, self.k), dtype=np.int32)
+        self.source = None
+        self._cache = {}
+
+    def load(self, rows):
+        """Replace the contents with `rows` (result table records), vectorized"""
+        frame = pd.DataFrame(list(rows), columns=["case_id", "reader_id", self.task.db_column])
+        frame["code"] = frame[self.task.db_column].map(self.option_codes)
+        frame = frame.dropna(subset=["code"])
+        reader_rows, readers = pd.factorize(frame["reader_id"].astype(str))
+        case_columns, cases = pd.factorize(frame["case_id"].astype(str))
+        codes = frame["code"].to_numpy(dtype=np.int64)
+
+        self.readers, self.cases = list(readers), list(cases)
+        self.reader_index = {reader: row for row, reader in enumerate(self.readers)}
+        self.case_index = {case: column for column, case in enumerate(self.cases)}
+        n_readers, n_cases = len(self.readers), len(self.cases)
+        reader_capacity, case_capacity = max(INITIAL_CAPACITY, n_readers), max(INITIAL_CAPACITY, n_cases)
+
+        self.codes = np.full((reader_capacity, case_capacity), MISSING, dtype=np.int8)
+        self.codes[reader_rows, case_columns] = codes
+        one_hot = np.zeros((n_readers, n_cases, self.k), dtype=np.float32)
+        one_hot[reader_rows, case_columns, codes] = 1
+
+        # All pairs in one product: (readers*K x cases) @ (cases x readers*K)
+        stacked = one_hot.transpose(0, 2, 1).reshape(n_readers * self.k, n_cases)
+        pairs = (stacked @ stacked.T).reshape(n_readers, self.k, n_readers, self.k).transpose(0, 2, 1, 3)
+        self.pair_counts = np.zeros((reader_capacity, reader_capacity, self.k, self.k), dtype=np.int32)
+        self.pair_counts[:n_readers, :n_readers] = np.rint(pairs)
+        self.pair_counts[np.arange(n_readers), np.arange(n_readers)] = 0
+        self.case_counts = np.zeros((case_capacity, self.k), dtype=np.int32)
+        self.case_counts[:n_cases] = one_hot.sum(axis=0)
+        self._cache.clear()
+
+    def _reader_row(self, reader_id):
+        row = self.reader_index.get(reader_id)
+        if row is None:
+            row = self.reader_index[reader_id] = len(self.readers)
+            self.readers.append(reader_id)
+            if row >= self.codes.shape[0]:
+                capacity = 2 * self.codes.shape[0]
+                self.codes = grow(self.codes, 0, capacity, MISSING)
+                self.pair_counts = grow(grow(self.pair_counts, 0, capacity), 1, capacity)
+        return row
+
+    def _case_column(self, case_id):
+        column = self.case_index.get(case_id)
+        if column is None:
+            column = self.case_index[case_id] = len(self.cases)
+            self.cases.append(case_id)
+            if column >= self.codes.shape[1]:
+                capacity = 2 * self.codes.shape[1]
+                self.codes = grow(self.codes, 1, capacity, MISSING)
+                self.case_counts = grow(self.case_counts, 0, capacity)
+        return column
+
+    def set_rating(self, reader_id, case_id, value):
+        """Record one reader's rating of a case (None removes it), returns True if anything changed"""
+        reader_id, case_id = str(reader_id), str(case_id)
+        code = self.option_codes.get(value, MISSING) if value is not None else MISSING
+        if code == MISSING and (reader_id not in self.reader_index or case_id not in self.case_index):
+            return False
+        row, column = self._reader_row(reader_id), self._case_column(case_id)
+        old = self.codes[row, column]
+        if old == code:
+            return False
+
+        # Only the pairs of this reader with the others who rated the same case move
+        ratings = self.codes[:len(self.readers), column]
+        others = np.flatnonzero(ratings != MISSING)
+        others = others[others != row]
+        other_codes = ratings[others]
+        if old != MISSING:
+            self.pair_counts[row, others, old, other_codes] -= 1
+            self.pair_counts[others, row, other_codes, old] -= 1
+            self.case_counts[column, old] -= 1
+        if code != MISSING:
+            self.pair_counts[row, others, code, other_codes] += 1
+            self.pair_counts[others, row, other_codes, code] += 1
+            self.case_counts[column, code] += 1
+        self.codes[row, column] = code
+        self._cache.clear()
+        return True
+
+    def on_change(self, key, row):
+        # LiveTable listener; keys are (case_id, reader_id)
+        case_id, reader_id = key
+        self.set_rating(reader_id, case_id, None if row is None else row.get(self.task.db_column))
+
+    def pairwise(self):
+        """One row per reader pair with co-rated cases: kappa, weighted kappa (ordinal) and alpha"""
+        if "pairwise" not in self._cache:
+            self._cache["pairwise"] = self._pairwise()
+        return self._cache["pairwise"]
+
+    def _pairwise(self):
+        n_readers = len(self.readers)
+        counts = self.pair_counts[:n_readers, :n_readers].astype(np.float64)
+        n = counts.sum(axis=(2, 3))
+        first = counts.sum(axis=3)   # marginals of reader a over the cases both rated
+        second = counts.sum(axis=2)  # marginals of reader b
+        with np.errstate(divide="ignore", invalid="ignore"):
+            observed = np.trace(counts, axis1=2, axis2=3) / n
+            expected = np.einsum("abi,abi->ab", first, second) / n ** 2
+            stats = {"cases": n, "agreement": observed, "kappa": (observed - expected) / (1 - expected)}
+            if self.task.ordinal:
+                # Quadratic agreement weights
+                i, j = np.indices((self.k, self.k))
+                weights = 1 - (i - j) ** 2 / (self.k - 1) ** 2
+                observed_w = np.einsum("abij,ij->ab", counts, weights) / n
+                expected_w = np.einsum("abi,abj,ij->ab", first, second, weights) / n ** 2
+                stats["weighted_kappa"] = (observed_w - expected_w) / (1 - expected_w)
+            # Two coders: every co-rated case adds both orderings to the coincidence matrix
+            stats["alpha"] = krippendorff_alpha(counts + counts.transpose(0, 1, 3, 2), self.task.ordinal)
+
+        a, b = np.triu_indices(n_readers, k=1)
+        rated = n[a, b] > 0
+        a, b = a[rated], b[rated]
+        frame = pd.DataFrame({"reader_a": np.array(self.readers, dtype=object)[a],
+                              "reader_b": np.array(self.readers, dtype=object)[b]})
+        for name, values in stats.items():
+            frame[name] = values[a, b]
+        frame["cases"] = frame["cases"].astype(int)
+        return frame
+
+    def summary(self):
+        """Overall statistics: readers, cases, Fleiss' kappa, Krippendorff's alpha, mean pairwise kappa"""
+        if "summary" not in self._cache:
+            self._cache["summary"] = self._summary()
+        return self._cache["summary"]
+
+    def _summary(self):
+        counts = self.case_counts[:len(self.cases)].astype(np.float64)
+        reads = counts.sum(axis=1)
+        shared = counts[reads >= 2]
+        m = reads[reads >= 2]
+        result = {"readers": len(self.readers), "cases": int((reads > 0).sum()), "shared_cases": len(m),
+                  "fleiss_kappa": np.nan, "alpha": np.nan}
+        if len(m):
+            with np.errstate(divide="ignore", invalid="ignore"):
+                # Fleiss' kappa, generalized to a varying number of readers per case
+                per_case = ((shared ** 2).sum(axis=1) - m) / (m * (m - 1))
+                shares = shared.sum(axis=0) / m.sum()
+                chance = (shares ** 2).sum()
+                result["fleiss_kappa"] = float((per_case.mean() - chance) / (1 - chance))
+                # Coincidences: o_ik = sum over cases of n_ci (n_ck - [i == k]) / (m_c - 1)
+                scaled = shared / (m - 1)[:, None]
+                coincidences = scaled.T @ shared - np.diag(scaled.sum(axis=0))
+                result["alpha"] = float(krippendorff_alpha(coincidences, self.task.ordinal))
+        pairs = self.pairwise()
+        column = "weighted_kappa" if self.task.ordinal else "kappa"
+        result["mean_pairwise_kappa"] = float(pairs[column].mean()) if len(pairs) else np.nan
+        return result
+
+
+def grow(array, axis, capacity, fill=0):
+    """`array` enlarged along `axis` to `capacity`, new cells set to `fill`"""
+    shape = list(array.shape)
+    shape[axis] = capacity - shape[axis]
+    return np.concatenate([array, np.full(shape, fill, dtype=array.dtype)], axis=axis)
+
+
+def distances(marginals, ordinal):
+    """Squared difference function of Krippendorff's alpha for the last axis's K values"""
+    k = marginals.shape[-1]
+    i, j = np.indices((k, k))
+    if not ordinal:
+        return np.broadcast_to((i != j).astype(np.float64), marginals.shape + (k,))
+    # Ordinal metric: values between i and j (inclusive, ends halved), squared
+    low, high = np.minimum(i, j), np.maximum(i, j)
+    cumulative = np.cumsum(marginals, axis=-1)
+    between = cumulative[..., high] - cumulative[..., low] + marginals[..., low]
+    return (between - (marginals[..., i] + marginals[..., j]) / 2) ** 2
+
+
+def krippendorff_alpha(coincidences, ordinal):
+    """Alpha from coincidence matrices (..., K, K); NaN where undefined"""
+    marginals = coincidences.sum(axis=-1)
+    total = marginals.sum(axis=-1)
+    delta = distances(marginals, ordinal)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        disagreement = (coincidences * delta).sum(axis=(-2, -1))
+        expected = np.einsum("...i,...j,...ij->...", marginals, marginals, delta)
+        return 1 - (total - 1) * disagreement / expected
+
+
+def attach(live_table, task):
+    """Agreement matrix over a LiveTable's current rows, kept in step with its changes"""
+    matrix = AgreementMatrix(task)
+    matrix.load(live_table.rows.values())
+    matrix.source = live_table
+    live_table.listeners.append(matrix.on_change)
+    return matrix
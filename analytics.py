@@ -0,0 +1,186 @@
+# analytics.py
+# Ad hoc SQL over local snapshots of the study data.
+#
+# snapshot() copies the three result tables (every round, not just the current one),
+# the study epochs and the task manifests into Parquet files under SNAPSHOT_DIR;
+# query() runs SQL over them in an embedded DuckDB, so heavy analytical queries
+# read local columnar files instead of the production database. Each snapshot is
+# written to its own directory and published by rewriting the LATEST pointer, so a
+# query never sees a half-written snapshot. Besides one view per file there is a
+# `<table>_current` view with only the rows of each reader's active epoch.
+#
+# duckdb and pyarrow are optional; the dashboard shows what is missing.
+#
+#   python analytics.py snapshot
+#   python analytics.py query "select reader_id, count(*) from classifications group by 1"
+import importlib.util
+import os
+import shutil
+import sys
+import time
+from datetime import datetime, timezone
+
+from epochs import EPOCHS_TABLE, GLOBAL_SCOPE
+from tasks import TASKS
+
+SNAPSHOT_DIR = "snapshots"
+LATEST = "LATEST"
+KEEP_SNAPSHOTS = 3
+PAGE_SIZE = 1000            # PostgREST's default row cap per request
+MAX_RESULT_ROWS = 100_000
+
+# Columns every result table snapshot has, so the views exist on an empty table too
+RESULT_COLUMNS = ["case_id", "reader_id", "image_path", "epoch", "created_at"]
+EPOCH_COLUMNS = ["table_name", "reader_id", "epoch"]
+
+
+def missing_packages():
+    """Optional packages this module needs that are not installed"""
+    return [name for name in ("duckdb", "pyarrow") if importlib.util.find_spec(name) is None]
+
+
+def fetch_all(supabase, table, order):
+    """Every row of a table, paged past the server's per-request row cap"""
+    rows, start = [], 0
+    while True:
+        query = supabase.table(table).select("*")
+        for column in order:
+            query = query.order(column)
+        page = query.range(start, start + PAGE_SIZE - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+        start += PAGE_SIZE
+
+
+def snapshot_frames(supabase):
+    """{view name: DataFrame} of everything a snapshot holds"""
+    import pandas as pd
+    from utils import read_manifest
+
+    frames = {}
+    for table, task in TASKS.items():
+        frame = pd.DataFrame(fetch_all(supabase, table, ["case_id", "reader_id", "epoch"]))
+        for column in RESULT_COLUMNS + [task.db_column]:
+            if column not in frame:
+                frame[column] = None
+        frame["created_at"] = pd.to_datetime(frame["created_at"], utc=True, errors="coerce", format="ISO8601")
+        frames[table] = frame
+        frames[f"manifest_{table}"] = read_manifest(task.csv_path)
+    response = supabase.table(EPOCHS_TABLE).select(", ".join(EPOCH_COLUMNS)).execute()
+    frames[EPOCHS_TABLE] = pd.DataFrame(response.data or [], columns=EPOCH_COLUMNS)
+    return frames
+
+
+def snapshot(supabase, root=SNAPSHOT_DIR):
+    """Write a new snapshot and make it the latest, returns its {view name: rows}"""
+    frames = snapshot_frames(supabase)
+    name = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    staging = os.path.join(root, f".{name}")
+    os.makedirs(staging)
+    for view, frame in frames.items():
+        frame.to_parquet(os.path.join(staging, f"{view}.parquet"), index=False)
+    os.rename(staging, os.path.join(root, name))
+
+    pointer = os.path.join(root, f".{LATEST}")
+    with open(pointer, "w") as f:
+        f.write(name)
+    os.replace(pointer, os.path.join(root, LATEST))
+    prune(root, keep=name)
+    return {view: len(frame) for view, frame in frames.items()}
+
+
+def prune(root, keep):
+    """Remove all but the newest KEEP_SNAPSHOTS snapshots (never `keep`)"""
+    names = sorted(entry for entry in os.listdir(root)
+                   if not entry.startswith(".") and os.path.isdir(os.path.join(root, entry)))
+    for name in names[:-KEEP_SNAPSHOTS]:
+        if name != keep:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+def latest_snapshot(root=SNAPSHOT_DIR):
+    """(name, directory) of the published snapshot, or None"""
+    try:
+        with open(os.path.join(root, LATEST)) as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return None
+    directory = os.path.join(root, name)
+    return (name, directory) if os.path.isdir(directory) else None
+
+
+def current_rows_view(table):
+    """Rows of a result table in their reader's active epoch, as in epochs.is_current"""
+    def scope_epoch(reader):
+        return (f"coalesce((select max(e.epoch) from {EPOCHS_TABLE} e "
+                f"where e.table_name = '{table}' and e.reader_id = {reader}), 0)")
+    return (f"create view {table}_current as select t.* from {table} t "
+            f"where t.epoch >= greatest({scope_epoch(repr(GLOBAL_SCOPE))}, {scope_epoch('t.reader_id')})")
+
+
+def connect(directory):
+    """Read-only DuckDB connection with one view per snapshot file, confined to `directory`"""
+    import duckdb
+
+    connection = duckdb.connect(":memory:")
+    directory = os.path.abspath(directory)
+    for file in sorted(os.listdir(directory)):
+        view, extension = os.path.splitext(file)
+        if extension == ".parquet":
+            path = os.path.join(directory, file).replace("'", "''")
+            connection.execute(f"create view {view} as select * from read_parquet('{path}')")
+    for table in TASKS:
+        connection.execute(current_rows_view(table))
+    # Queries can read the snapshot and nothing else, and cannot lift that
+    connection.execute(f"set allowed_directories = ['{directory.replace(chr(39), chr(39) * 2)}/']")
+    connection.execute("set enable_external_access = false")
+    connection.execute("set lock_configuration = true")
+    return connection
+
+
+def query(connection, sql, max_rows=MAX_RESULT_ROWS):
+    """(DataFrame of at most max_rows rows, truncated, seconds) of one SQL statement"""
+    import pandas as pd
+
+    started = time.perf_counter()
+    cursor = connection.cursor()
+    try:
+        relation = cursor.sql(sql)
+        if relation is None:
+            # A statement without a result (e.g. CREATE TEMP TABLE)
+            return pd.DataFrame(), False, time.perf_counter() - started
+        frame = relation.limit(max_rows + 1).df()
+    finally:
+        cursor.close()
+    return frame.head(max_rows), len(frame) > max_rows, time.perf_counter() - started
+
+
+def views(connection):
+    """Queryable views and their columns"""
+    return connection.cursor().sql(
+        "select table_name as view, string_agg(column_name, ', ' order by ordinal_position) as columns "
+        "from information_schema.columns group by table_name order by table_name").df()
+
+
+if __name__ == "__main__":
+    missing = missing_packages()
+    if missing:
+        sys.exit(f"analytics needs: pip install {' '.join(missing)}")
+    if sys.argv[1:2] == ["snapshot"]:
+        from utils import init_supabase
+
+        client = init_supabase()
+        if client is None:
+            sys.exit(1)
+        for view_name, count in snapshot(client).items():
+            print(f"{view_name}: {count} rows")
+    elif sys.argv[1:2] == ["query"] and len(sys.argv) == 3:
+        latest = latest_snapshot()
+        if latest is None:
+            sys.exit("no snapshot yet, run: python analytics.py snapshot")
+        result, truncated, seconds = query(connect(latest[1]), sys.argv[2])
+        print(result.to_string(index=False))
+        print(f"{len(result)} rows{' (truncated)' if truncated else ''} in {seconds:.3f}s from snapshot {latest[0]}")
+    else:
+        sys.exit('usage: python analytics.py snapshot | query "<sql>"')
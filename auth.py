@@ -0,0 +1,93 @@
+# auth.py
+import base64
+import hashlib
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+HASH_SCHEME = "pbkdf2_sha256"
+HASH_ITERATIONS = 120_000
+
+# Password hashing and last-login writes run here, off the script thread.
+# hashlib releases the GIL while hashing, so a login burst spreads across cores.
+_executor = ThreadPoolExecutor(max_workers=max(4, os.cpu_count() or 1), thread_name_prefix="auth")
+
+
+def hash_password(password, iterations=HASH_ITERATIONS):
+    """Salted PBKDF2 hash stored as pbkdf2_sha256$<iterations>$<salt>$<hash>"""
+    salt = os.urandom(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+    return "$".join([
+        HASH_SCHEME,
+        str(iterations),
+        base64.b64encode(salt).decode(),
+        base64.b64encode(digest).decode(),
+    ])
+
+
+def is_hashed(stored):
+    return str(stored or "").startswith(HASH_SCHEME + "$")
+
+
+def verify_password(password, stored):
+    if not stored:
+        return False
+    if not is_hashed(stored):
+        # Accounts created before hashing still hold the plain password
+        return hmac.compare_digest(str(stored).encode(), password.encode())
+    try:
+        _, iterations, salt, digest = stored.split("$")
+        candidate = hashlib.pbkdf2_hmac("sha256", password.encode(), base64.b64decode(salt), int(iterations))
+        return hmac.compare_digest(candidate, base64.b64decode(digest))
+    except (ValueError, TypeError):
+        return False
+
+
+def verify_password_async(password, stored):
+    """Verify on the auth pool, returns a Future[bool]"""
+    return _executor.submit(verify_password, password, stored)
+
+
+def hash_passwords(passwords):
+    """Hash many passwords in parallel on the auth pool, preserving order"""
+    return list(_executor.map(hash_password, passwords))
+
+
+# Short TTL so deactivations and password changes apply within half a minute
+@st.cache_data(ttl=30, show_spinner=False)
+def _cached_principals(_supabase, username):
+    response = _supabase.rpc("resolve_principal", {"p_username": username}).execute()
+    if not response.data:
+        # Raising keeps misses out of the cache, so a user created a moment ago can log in
+        raise LookupError(username)
+    return response.data
+
+
+def resolve_principal(supabase, username):
+    """Candidate accounts for a username in one round trip, readers before admins"""
+    try:
+        return _cached_principals(supabase, username)
+    except LookupError:
+        return []
+
+
+def record_login_async(supabase, user_id, is_admin, stored_hash, password):
+    """Update last_login (and upgrade a plain-text password) without blocking the redirect"""
+    def record():
+        try:
+            if is_admin:
+                if not is_hashed(stored_hash):
+                    supabase.table("admin_users").update({
+                        "password_hash": hash_password(password)
+                    }).eq("admin_id", user_id).execute()
+                return
+            update = {"last_login": "now()"}
+            if not is_hashed(stored_hash):
+                update["password_hash"] = hash_password(password)
+            supabase.table("readers").update(update).eq("reader_id", user_id).execute()
+        except Exception:
+            pass  # Login bookkeeping must never break a login
+
+    return _executor.submit(record)
@@ -0,0 +1,95 @@
+# bench_startup.py
+# Cold-start benchmark: every measurement runs in a fresh interpreter.
+#
+#   python bench_startup.py [--repeat 5]
+#
+# import:*        importing a page's module graph (eager = pandas, PIL and the
+#                 supabase SDK up front, as utils did before they became lazy)
+# render:*        first AppTest run of a page in a cold process
+# render:*+warm   the same after warmup.warm_up() (warm-up time reported apart)
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+HEAVY_MODULES = ("pandas", "PIL.Image", "supabase")
+LOGIN_MODULES = ("streamlit", "utils", "auth", "session_store", "tasks")
+TASK_MODULES = ("streamlit", "task_engine")
+
+SCENARIOS = ("import:login", "import:login eager", "import:task", "import:task eager",
+             "render:login", "render:task", "render:task+warm")
+
+
+def measure(scenario):
+    """Runs in the child process; returns {step: seconds}"""
+    import importlib
+
+    if scenario.startswith("import:"):
+        modules = LOGIN_MODULES if "login" in scenario else TASK_MODULES
+        started = time.perf_counter()
+        if scenario.endswith("eager"):
+            for name in HEAVY_MODULES:
+                importlib.import_module(name)
+        for name in modules:
+            importlib.import_module(name)
+        return {scenario: time.perf_counter() - started}
+
+    from streamlit.testing.v1 import AppTest
+    result = {}
+    if scenario.endswith("+warm"):
+        from warmup import warm_up
+        started = time.perf_counter()
+        warm_up()
+        result["warm-up"] = time.perf_counter() - started
+
+    page = "login.py" if "login" in scenario else "Classification.py"
+    at = AppTest.from_file(os.path.join(APP_DIR, "pages", page), default_timeout=60)
+    at.secrets["SUPABASE_URL"] = "local://"
+    at.secrets["SUPABASE_KEY"] = "local"
+    if "task" in scenario:
+        at.session_state["authenticated"] = True
+        at.session_state["reader_id"] = "reader_001"
+        at.session_state["reader_name"] = "Bench"
+    started = time.perf_counter()
+    at.run()
+    result[scenario] = time.perf_counter() - started
+    if len(at.exception):
+        raise RuntimeError(at.exception[0].message)
+    return result
+
+
+def run_child(scenario):
+    output = subprocess.run([sys.executable, __file__, "--child", scenario], cwd=APP_DIR,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start benchmark")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        os.chdir(APP_DIR)
+        sys.path.insert(0, APP_DIR)
+        print(json.dumps(measure(args.child)))
+        return
+
+    samples = {}
+    for scenario in SCENARIOS:
+        for _ in range(args.repeat):
+            for step, seconds in run_child(scenario).items():
+                samples.setdefault(step, []).append(seconds * 1000)
+
+    print(f"{'step':<22}{'median ms':>11}{'min ms':>9}{'max ms':>9}")
+    for step, values in samples.items():
+        print(f"{step:<22}{statistics.median(values):>11.0f}{min(values):>9.0f}{max(values):>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
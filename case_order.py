@@ -0,0 +1,62 @@
+# case_order.py
+# Per-reader case order.
+#
+# Readers see a task's cases in an order of their own rather than manifest order, so
+# order and fatigue effects do not line up across the panel. A case's place is given
+# by a keyed hash of its CaseID, the key derived from the study seed, the reader and
+# the task: the order is the same on every load and device, differs between readers
+# and between modules, and a case added to the manifest does not reshuffle the rest.
+#
+# The session DataFrame stays in manifest order. The order is one int32 array of its
+# row positions, computed the first time a page needs it; st.session_state.current_index
+# is a position in that array.
+import hashlib
+
+import numpy as np
+import streamlit as st
+
+ORDER_KEY = "case_order"
+
+
+def order_key(task_key, reader_id):
+    """Hash key of one reader's order on one task"""
+    seed = str(st.secrets.get("CASE_ORDER_SEED", ""))
+    return hashlib.sha256(f"{seed}\0{reader_id}\0{task_key}".encode()).digest()
+
+
+def permutation(case_ids, key):
+    """Row positions of `case_ids` sorted by their keyed hash"""
+    ranks = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(str(case_id).encode(), key=key, digest_size=8).digest(), "big")
+         for case_id in case_ids),
+        dtype=np.uint64, count=len(case_ids))
+    return np.argsort(ranks, kind="stable").astype(np.int32)
+
+
+def case_order(task):
+    """Row positions of st.session_state.df in the order the reader works through them"""
+    df = st.session_state.df
+    # Scheduled tasks (scheduler.py) keep lease order; their case list grows as they go
+    shuffled = task.shuffle and st.session_state.get("case_schedule") != task.key
+    identity = (task.key, st.session_state.get("reader_id"), len(df), shuffled)
+    cached = st.session_state.get(ORDER_KEY)
+    if cached is None or cached[0] != identity:
+        if shuffled:
+            order = permutation(df["CaseID"], order_key(task.key, st.session_state.get("reader_id")))
+        else:
+            order = np.arange(len(df), dtype=np.int32)
+        cached = st.session_state[ORDER_KEY] = (identity, order)
+    return cached[1]
+
+
+def position_of(task, row):
+    """Position of a DataFrame row in the reader's order"""
+    positions = np.flatnonzero(case_order(task) == row)
+    return int(positions[0]) if len(positions) else 0
+
+
+def first_open_position(task, result_column):
+    """First position whose case the reader has not rated yet (0 when all are rated)"""
+    values = st.session_state.df[result_column].to_numpy()[case_order(task)]
+    missing = np.flatnonzero((values == "") | (values != values))
+    return int(missing[0]) if len(missing) else 0
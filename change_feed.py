@@ -0,0 +1,367 @@
+# change_feed.py
+import asyncio
+import queue
+import threading
+import time
+import weakref
+from collections import Counter, deque
+
+import pandas as pd
+import streamlit as st
+
+from epochs import EPOCHS_TABLE, GLOBAL_SCOPE, is_current
+from utils import RESULT_TABLES, RESULT_KEY, RESULT_ROW_KEY, PAGE_SIZE, init_supabase
+
+# Primary key of the tables the polling feed follows (result tables: RESULT_ROW_KEY)
+POLL_KEYS = {EPOCHS_TABLE: ("table_name", "reader_id")}
+CURSOR_COLUMN = "updated_at"
+RECONCILE_SECONDS = 60
+
+# Events a subscriber holds before it drops the oldest and has to resync
+MAX_PENDING_EVENTS = 10_000
+
+
+class Subscriber:
+    """Bounded event queue of one admin session
+
+    When more than `max_pending` events pile up (a tab in the background, a burst of
+    saves) the oldest are dropped and `overflowed` is set: the session's copies are
+    then incomplete and have to be fetched again.
+    """
+
+    def __init__(self, max_pending=MAX_PENDING_EVENTS):
+        self.events = deque(maxlen=max_pending)
+        self.overflowed = False
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def put(self, event):
+        with self._lock:
+            if len(self.events) == self.events.maxlen:
+                self.overflowed = True
+                self.dropped += 1
+            self.events.append(event)
+
+    def get_nowait(self):
+        with self._lock:
+            if not self.events:
+                raise queue.Empty
+            return self.events.popleft()
+
+
+class ChangeFeed:
+    """Fan-out of row changes on the result tables to subscriber queues
+
+    Subscribers are held weakly: a session Streamlit has dropped (a closed tab) takes its
+    queue with it, without waiting for an unsubscribe that may never come.
+    """
+
+    def __init__(self, tables):
+        self.tables = list(tables)
+        self._subscribers = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        subscriber = Subscriber()
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, table, event_type, record, old_record=None):
+        event = {
+            "table": table,
+            "type": event_type,
+            "record": record or {},
+            "old_record": old_record or {},
+        }
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.put(event)
+
+
+class RealtimeChangeFeed(ChangeFeed):
+    """Supabase Realtime subscription running on a background event loop"""
+
+    def __init__(self, url, key, tables):
+        super().__init__(tables)
+        self.url = url
+        self.key = key
+        self.error = None
+        self._thread = threading.Thread(target=self._run, name="change-feed", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(self._subscribe())
+            loop.run_forever()
+        except Exception as e:
+            self.error = e
+
+    async def _subscribe(self):
+        from supabase import acreate_client
+
+        client = await acreate_client(self.url, self.key)
+        channel = client.channel("result-tables")
+        for table in self.tables:
+            channel.on_postgres_changes("*", schema="public", table=table, callback=self._on_change)
+        await channel.subscribe()
+
+    def _on_change(self, payload):
+        data = payload.get("data", {})
+        self.publish(data.get("table"), data.get("type"), data.get("record"), data.get("old_record"))
+
+
+class PollingChangeFeed(ChangeFeed):
+    """Local stand-in for Realtime: polls each table for rows changed since a cursor
+
+    The cursor is updated_at, which a trigger sets on every insert and update
+    (sql/010_result_updated_at.sql), so re-saved ratings are seen as well as new ones.
+    The first poll of a table only places the cursor; rows already there are what the
+    subscribers fetched themselves. Deletes never move the cursor, so every
+    RECONCILE_SECONDS the table's keys are compared with the previous key scan.
+    Only primary keys are kept, never row copies.
+    """
+
+    def __init__(self, supabase, tables, interval=5.0, reconcile_seconds=RECONCILE_SECONDS):
+        super().__init__(tables)
+        self.supabase = supabase
+        self.interval = interval
+        self.reconcile_seconds = reconcile_seconds
+        self.error = None
+        self._cursors = {}
+        self._at_cursor = {}      # table -> keys already published at the cursor value
+        self._keys = {}           # table -> primary keys known to exist
+        self._reconciled = {}
+        self._thread = threading.Thread(target=self._run, name="change-feed-poll", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            for table in self.tables:
+                try:
+                    self.poll(table)
+                    self.error = None
+                except Exception as e:
+                    self.error = e
+            time.sleep(self.interval)
+
+    def _key(self, table, row):
+        return tuple(row.get(col) for col in POLL_KEYS.get(table, RESULT_ROW_KEY))
+
+    def scan_keys(self, table):
+        """{primary key: cursor value} of every row of the table, paged past the row cap"""
+        key_columns = POLL_KEYS.get(table, RESULT_ROW_KEY)
+        scanned, start = {}, 0
+        while True:
+            query = self.supabase.table(table).select(", ".join((*key_columns, CURSOR_COLUMN)))
+            for column in key_columns:
+                query = query.order(column)
+            page = query.range(start, start + PAGE_SIZE - 1).execute().data or []
+            scanned.update((self._key(table, row), row.get(CURSOR_COLUMN)) for row in page)
+            if len(page) < PAGE_SIZE:
+                return scanned
+            start += PAGE_SIZE
+
+    def poll(self, table):
+        if table not in self._keys:
+            # First poll: place the cursor without publishing what is already there
+            scanned = self.scan_keys(table)
+            cursor = max((value for value in scanned.values() if value is not None), default=None)
+            self._keys[table] = set(scanned)
+            self._cursors[table] = cursor
+            self._at_cursor[table] = {key for key, value in scanned.items() if value == cursor}
+            self._reconciled[table] = time.monotonic()
+            return
+
+        cursor = self._cursors[table]
+        rows = self.changed_rows(table, cursor)
+
+        keys, at_cursor = self._keys[table], self._at_cursor[table]
+        for row in rows:
+            key = self._key(table, row)
+            if row.get(CURSOR_COLUMN) == cursor and key in at_cursor:
+                continue
+            self.publish(table, "UPDATE" if key in keys else "INSERT", row)
+            keys.add(key)
+        if rows:
+            last = rows[-1].get(CURSOR_COLUMN)
+            if last != cursor:
+                at_cursor.clear()
+                self._cursors[table] = last
+            at_cursor.update(self._key(table, row) for row in rows if row.get(CURSOR_COLUMN) == last)
+
+        if time.monotonic() - self._reconciled[table] >= self.reconcile_seconds:
+            self.reconcile(table)
+
+    def changed_rows(self, table, cursor):
+        """Rows from the cursor value on in (cursor, primary key) order, paged past the row cap
+
+        Each page starts at the last cursor value read and skips by offset only the rows
+        already read at that value, so a row updated mid-scan (it moves to the end) does
+        not shift the pages over an unread row.
+        """
+        order = (CURSOR_COLUMN, *POLL_KEYS.get(table, RESULT_ROW_KEY))
+        rows, since, start = [], cursor, 0
+        while True:
+            query = self.supabase.table(table).select("*")
+            if since is not None:
+                # gte rather than gt so rows sharing the cursor value are not lost
+                query = query.gte(CURSOR_COLUMN, since)
+            for column in order:
+                query = query.order(column)
+            page = query.range(start, start + PAGE_SIZE - 1).execute().data or []
+            rows.extend(page)
+            if len(page) < PAGE_SIZE:
+                return rows
+            last = page[-1].get(CURSOR_COLUMN)
+            start = start + len(page) if last == since else sum(row.get(CURSOR_COLUMN) == last for row in page)
+            since = last
+
+    def reconcile(self, table):
+        """Publish a DELETE for every known key that is gone from the table"""
+        key_columns = POLL_KEYS.get(table, RESULT_ROW_KEY)
+        present = set(self.scan_keys(table))
+        keys = self._keys[table]
+        for key in keys - present:
+            self.publish(table, "DELETE", None, dict(zip(key_columns, key)))
+        keys.intersection_update(present)
+        self._reconciled[table] = time.monotonic()
+
+
+@st.cache_resource
+def get_change_feed():
+    """Shared change feed for all admin sessions (Realtime, or polling when CHANGE_FEED = "polling")"""
+    tables = list(RESULT_TABLES) + [EPOCHS_TABLE]
+    mode = st.secrets.get("CHANGE_FEED", "realtime")
+    if mode == "polling":
+        supabase = init_supabase()
+        if supabase is None:
+            return None
+        return PollingChangeFeed(supabase, tables, interval=float(st.secrets.get("CHANGE_FEED_INTERVAL", 5)))
+    try:
+        return RealtimeChangeFeed(st.secrets["SUPABASE_URL"], st.secrets["SUPABASE_KEY"], tables)
+    except Exception as e:
+        st.error(f"❌ Failed to start change feed: {e}")
+        return None
+
+
+class LiveTable:
+    """In-memory copy of a result table kept current by applying change feed deltas
+
+    Only rows in their reader's active epoch are kept; an epoch bump prunes the rest.
+    """
+
+    def __init__(self, rows=None, epochs=None):
+        self.rows = {}
+        self.epochs = dict(epochs or {})
+        self.case_counts = Counter()
+        self.reader_counts = Counter()
+        self._frame = None
+        self._derived = {}
+        # Called with (key, row) on every upsert and (key, None) on every delete
+        self.listeners = []
+        for row in rows or []:
+            if is_current(row, self.epochs):
+                self._upsert(row)
+
+    def _key(self, row):
+        return tuple(str(row.get(col)) for col in RESULT_KEY)
+
+    def _upsert(self, row):
+        key = self._key(row)
+        if key not in self.rows:
+            self.case_counts[key[0]] += 1
+            self.reader_counts[key[1]] += 1
+        self.rows[key] = row
+        self._frame = None
+        self._derived = {}
+        for listener in self.listeners:
+            listener(key, row)
+
+    def _delete(self, row):
+        key = self._key(row)
+        if self.rows.pop(key, None) is None:
+            return
+        for counter, value in ((self.case_counts, key[0]), (self.reader_counts, key[1])):
+            counter[value] -= 1
+            if counter[value] <= 0:
+                del counter[value]
+        self._frame = None
+        self._derived = {}
+        for listener in self.listeners:
+            listener(key, None)
+
+    def apply(self, event):
+        """Apply one change feed event, returns True if the table changed"""
+        if event["type"] == "DELETE":
+            row = event["old_record"] or event["record"]
+            held = self.rows.get(self._key(row))
+            # Purging a retired epoch must not remove the reader's current row for the same case
+            if held is None or ("epoch" in row and row["epoch"] != held.get("epoch")):
+                return False
+            self._delete(row)
+            return True
+        if not is_current(event["record"], self.epochs):
+            return False
+        self._upsert(event["record"])
+        return True
+
+    def set_epoch(self, reader_id, epoch):
+        """Record an epoch bump and drop the rows it retired, returns True if any were dropped"""
+        self.epochs[str(reader_id)] = int(epoch)
+        stale = [row for key, row in self.rows.items()
+                 if (reader_id == GLOBAL_SCOPE or key[1] == str(reader_id)) and not is_current(row, self.epochs)]
+        for row in stale:
+            self._delete(row)
+        return bool(stale)
+
+    @property
+    def total(self):
+        return len(self.rows)
+
+    @property
+    def unique_cases(self):
+        return len(self.case_counts)
+
+    @property
+    def unique_readers(self):
+        return len(self.reader_counts)
+
+    def to_frame(self):
+        # Rebuilt only after a change, so idle refreshes cost nothing
+        if self._frame is None:
+            self._frame = pd.DataFrame(list(self.rows.values()))
+        return self._frame
+
+    def derived(self, name, build):
+        """build(frame), computed once per change of the table"""
+        if name not in self._derived:
+            self._derived[name] = build(self.to_frame())
+        return self._derived[name]
+
+
+def drain_into(subscriber, live_tables, max_events=5000):
+    """Apply pending events to the matching LiveTables, returns the set of tables that changed"""
+    changed = set()
+    for _ in range(max_events):
+        try:
+            event = subscriber.get_nowait()
+        except queue.Empty:
+            break
+        if event["table"] == EPOCHS_TABLE:
+            record = event["record"]
+            live_table = live_tables.get(record.get("table_name"))
+            if live_table is not None and live_table.set_epoch(record.get("reader_id"), record.get("epoch") or 0):
+                changed.add(record.get("table_name"))
+            continue
+        live_table = live_tables.get(event["table"])
+        if live_table is not None and live_table.apply(event):
+            changed.add(event["table"])
+    return changed
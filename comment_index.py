@@ -0,0 +1,184 @@
+# comment_index.py
+# Full-text search over the free-text comments of a result table.
+#
+# An inverted index maps each term to the comments containing it and the positions
+# it occurs at. A changed comment only touches the postings of its own terms, so the
+# index follows a LiveTable's change feed deltas like the agreement matrix does.
+# Results are ranked with BM25.
+#
+# Query syntax: words must all occur (in any order); "quoted words" must occur as a
+# phrase; a trailing * matches any word with that prefix (blur* finds blurred,
+# blurring). Words are lower-cased and plural/singular forms match (artifact,
+# artifacts).
+import math
+import re
+from bisect import bisect_left
+
+# BM25 parameters (the usual defaults)
+K1 = 1.2
+B = 0.75
+
+TOKEN = re.compile(r"[a-z0-9]+")
+QUERY_PART = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def normalize(word):
+    """Fold simple English plurals onto the singular"""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def tokenize(text):
+    return [normalize(word) for word in TOKEN.findall(str(text or "").lower())]
+
+
+def parse_query(text):
+    """(terms, phrases, prefixes) of a query; terms and phrase words are normalized"""
+    terms, phrases, prefixes = [], [], []
+    for phrase, word in QUERY_PART.findall(text.lower()):
+        if phrase:
+            words = tokenize(phrase)
+            if len(words) > 1:
+                phrases.append(words)
+            terms.extend(words)
+        elif word.endswith("*") and TOKEN.fullmatch(word[:-1]):
+            prefixes.append(word[:-1])
+        else:
+            terms.extend(tokenize(word))
+    return list(dict.fromkeys(terms)), phrases, prefixes
+
+
+class CommentIndex:
+    """Inverted index of one result table's comments, keyed like the LiveTable: (case_id, reader_id)"""
+
+    def __init__(self):
+        self.postings = {}       # term -> {doc: positions}
+        self.doc_terms = {}      # doc -> {term: positions}
+        self.doc_length = {}
+        self.doc_ids = {}        # (case_id, reader_id) -> doc
+        self.doc_keys = []       # doc -> (case_id, reader_id); a key keeps its doc when re-indexed
+        self.total_length = 0
+        self.source = None
+        self._vocabulary = None  # sorted terms, for prefix queries
+
+    def __len__(self):
+        return len(self.doc_length)
+
+    def load(self, rows):
+        for row in rows:
+            self.set_comment((str(row.get("case_id")), str(row.get("reader_id"))), row.get("comment"))
+
+    def set_comment(self, key, comment):
+        """Index (or re-index) one comment; an empty comment or None removes it"""
+        self._remove(key)
+        tokens = tokenize(comment)
+        if not tokens:
+            return
+        doc = self.doc_ids.get(key)
+        if doc is None:
+            doc = self.doc_ids[key] = len(self.doc_keys)
+            self.doc_keys.append(key)
+        positions = {}
+        for position, term in enumerate(tokens):
+            positions.setdefault(term, []).append(position)
+        for term, at in positions.items():
+            if term not in self.postings:
+                self.postings[term] = {}
+                self._vocabulary = None
+            self.postings[term][doc] = at
+        self.doc_terms[doc] = positions
+        self.doc_length[doc] = len(tokens)
+        self.total_length += len(tokens)
+
+    def _remove(self, key):
+        doc = self.doc_ids.get(key)
+        if doc is None or doc not in self.doc_terms:
+            return
+        for term in self.doc_terms.pop(doc):
+            postings = self.postings[term]
+            del postings[doc]
+            if not postings:
+                del self.postings[term]
+                self._vocabulary = None
+        self.total_length -= self.doc_length.pop(doc)
+
+    def on_change(self, key, row):
+        # LiveTable listener
+        self.set_comment(key, None if row is None else row.get("comment"))
+
+    def expand(self, prefix):
+        """Indexed terms starting with `prefix`"""
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        start = bisect_left(self._vocabulary, prefix)
+        end = bisect_left(self._vocabulary, prefix + "\uffff")
+        return self._vocabulary[start:end]
+
+    def search(self, text, case_ids=None, reader_ids=None, limit=100):
+        """[(score, (case_id, reader_id))] of the comments matching a query, best first"""
+        terms, phrases, prefixes = parse_query(text)
+        # Each required group matches a doc if any of its terms does
+        groups = [[term] for term in terms] + [self.expand(prefix) for prefix in prefixes]
+        if not groups:
+            return []
+        matches = []
+        for group in groups:
+            docs = set()
+            for term in group:
+                docs.update(self.postings.get(term, ()))
+            matches.append(docs)
+        matches.sort(key=len)
+        candidates = set.intersection(*matches)
+
+        if case_ids or reader_ids:
+            case_ids = set(map(str, case_ids or ())) or None
+            reader_ids = set(map(str, reader_ids or ())) or None
+            candidates = {doc for doc in candidates
+                          if (case_ids is None or self.doc_keys[doc][0] in case_ids)
+                          and (reader_ids is None or self.doc_keys[doc][1] in reader_ids)}
+        candidates = [doc for doc in candidates if all(self.has_phrase(doc, phrase) for phrase in phrases)]
+        if not candidates:
+            return []
+
+        scoring = set(term for group in groups for term in group)
+        scored = [(self.score(doc, scoring), self.doc_keys[doc]) for doc in candidates]
+        scored.sort(key=lambda hit: (-hit[0], hit[1]))
+        return scored[:limit]
+
+    def has_phrase(self, doc, words):
+        positions = self.doc_terms[doc]
+        if any(word not in positions for word in words):
+            return False
+        starts = set(positions[words[0]])
+        for offset, word in enumerate(words[1:], start=1):
+            starts &= {at - offset for at in positions[word]}
+            if not starts:
+                return False
+        return True
+
+    def score(self, doc, terms):
+        """BM25 score of one comment for a set of query terms"""
+        n = len(self.doc_length)
+        average = self.total_length / n
+        length = self.doc_length[doc]
+        positions = self.doc_terms[doc]
+        total = 0.0
+        for term in terms:
+            frequency = len(positions.get(term, ()))
+            if frequency:
+                df = len(self.postings[term])
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                total += idf * frequency * (K1 + 1) / (frequency + K1 * (1 - B + B * length / average))
+        return total
+
+
+def attach(live_table):
+    """Comment index over a LiveTable's current rows, kept in step with its changes"""
+    index = CommentIndex()
+    index.load(live_table.rows.values())
+    index.source = live_table
+    live_table.listeners.append(index.on_change)
+    return index
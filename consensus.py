@@ -0,0 +1,141 @@
+# consensus.py
+# Per-case consensus of the result tables (sql/007_case_consensus.sql).
+#
+# The database keeps `case_consensus` current with triggers on every save and epoch
+# bump, so the admin dashboard reads it in one query. summarize() is the same
+# per-case summary for the local backend; expected_consensus() recomputes it from
+# the raw ratings so the maintained table can be checked against them. Rating scales
+# and the per-table triggers come from TASKS: rebuild installs them first
+# (sql/011_task_tables.sql), verify also checks the stored scale against tasks.py:
+#
+#   python consensus.py verify [table ...]
+#   python consensus.py rebuild [table ...]
+import statistics
+import sys
+from collections import Counter
+
+from epochs import is_current, load_epochs
+from tasks import TASKS
+from utils import RESULT_ROW_KEY, fetch_all
+
+CONSENSUS_TABLE = "case_consensus"
+SCALES_TABLE = "consensus_scales"
+SCALE_COLUMNS = ("rating_column", "ordinal", "options")
+
+# Score columns are compared with this tolerance (numeric in SQL, float here)
+SCORE_TOLERANCE = 1e-6
+
+
+def summarize(task, counts):
+    """Reads, histogram, mean/median score (ordinal tasks) and majority of a {rating: readers} histogram"""
+    counts = {rating: int(n) for rating, n in counts.items() if int(n) > 0}
+    summary = {"n_reads": sum(counts.values()), "counts": counts, "mean_score": None, "median_score": None}
+    if task.ordinal:
+        # First option = 1, as in the SQL
+        scores = [task.options.index(rating) + 1 for rating, n in counts.items() if rating in task.options
+                  for _ in range(n)]
+        if scores:
+            summary["mean_score"] = sum(scores) / len(scores)
+            summary["median_score"] = float(statistics.median(scores))
+    top = max(counts.values(), default=0)
+    leaders = [rating for rating, n in counts.items() if n == top]
+    summary["majority"] = leaders[0] if len(leaders) == 1 else None
+    return summary
+
+
+def expected_consensus(task, rows, epochs):
+    """{case_id: summary} recomputed from a result table's rows and its epochs"""
+    histograms = {}
+    for row in rows:
+        rating = row.get(task.db_column)
+        if rating and is_current(row, epochs):
+            histograms.setdefault(str(row["case_id"]), Counter())[rating] += 1
+    return {case_id: summarize(task, counts) for case_id, counts in histograms.items()}
+
+
+def load_consensus(supabase, table):
+    """The maintained consensus rows of one result table"""
+    return fetch_all(lambda: supabase.table(CONSENSUS_TABLE).select("*").eq("table_name", table), ["case_id"])
+
+
+def task_scale(task):
+    """The consensus_scales row of a task as tasks.py defines it"""
+    return {"rating_column": task.db_column, "ordinal": task.ordinal, "options": list(task.options)}
+
+
+def install(supabase, table):
+    """Write the table's scale from tasks.py and (re)create its triggers"""
+    scale = task_scale(TASKS[table])
+    supabase.rpc("install_task_table", {
+        "p_table": table, "p_rating_column": scale["rating_column"], "p_ordinal": scale["ordinal"],
+        "p_options": scale["options"],
+    }).execute()
+
+
+def scale_mismatch(supabase, table):
+    """Columns of the stored scale that differ from tasks.py (all of them if none is stored)"""
+    response = supabase.table(SCALES_TABLE).select(", ".join(SCALE_COLUMNS)).eq("table_name", table).execute()
+    stored = (response.data or [{}])[0]
+    expected = task_scale(TASKS[table])
+    return [column for column in SCALE_COLUMNS if stored.get(column) != expected[column]]
+
+
+def rebuild(supabase, table):
+    """Install the table from tasks.py, then recompute its consensus from scratch, returns the number of cases"""
+    install(supabase, table)
+    response = supabase.rpc("rebuild_case_consensus", {"p_table": table}).execute()
+    return int(response.data or 0)
+
+
+def verify(supabase, table):
+    """Compare the maintained table with a recomputation, returns a list of (case_id, expected, stored)"""
+    task = TASKS[table]
+    rows = fetch_all(lambda: supabase.table(table).select(f"case_id, reader_id, epoch, {task.db_column}"),
+                     RESULT_ROW_KEY)
+    expected = expected_consensus(task, rows, load_epochs(supabase, table))
+    stored = {str(row["case_id"]): row for row in load_consensus(supabase, table)}
+
+    mismatches = []
+    for case_id in sorted(set(expected) | set(stored)):
+        want, have = expected.get(case_id), stored.get(case_id)
+        if want is None or have is None or not same_summary(want, have):
+            mismatches.append((case_id, want, have))
+    return mismatches
+
+
+def same_summary(expected, stored):
+    if int(stored.get("n_reads") or 0) != expected["n_reads"] or stored.get("majority") != expected["majority"]:
+        return False
+    if {rating: int(n) for rating, n in (stored.get("counts") or {}).items() if int(n)} != expected["counts"]:
+        return False
+    for column in ("mean_score", "median_score"):
+        want, have = expected[column], stored.get(column)
+        if (want is None) != (have is None) or (want is not None and abs(float(have) - want) > SCORE_TOLERANCE):
+            return False
+    return True
+
+
+if __name__ == "__main__":
+    from utils import init_supabase
+
+    command, tables = sys.argv[1:2], sys.argv[2:] or list(TASKS)
+    if command not in (["verify"], ["rebuild"]) or any(table not in TASKS for table in tables):
+        sys.exit(f"usage: python consensus.py verify|rebuild [{'|'.join(TASKS)} ...]")
+    client = init_supabase()
+    if client is None:
+        sys.exit(1)
+    failed = False
+    for name in tables:
+        if command == ["rebuild"]:
+            print(f"{name}: consensus rebuilt for {rebuild(client, name)} cases")
+            continue
+        differing = scale_mismatch(client, name)
+        if differing:
+            failed = True
+            print(f"{name}: scale differs from tasks.py ({', '.join(differing)}), run: python consensus.py rebuild")
+        problems = verify(client, name)
+        failed = failed or bool(problems)
+        print(f"{name}: {'OK' if not problems else f'{len(problems)} cases differ'}")
+        for case_id, want, have in problems[:20]:
+            print(f"  case {case_id}: expected {want}, stored {have}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,68 @@
+# epochs.py
+# Study rounds ("epochs") for the result tables.
+#
+# Every result row carries an `epoch`. The active epoch of a reader on a table is
+# max(global epoch, the reader's own epoch) as recorded in `study_epochs`, so a
+# reset is a single counter bump instead of a mass delete, and rows from older
+# epochs stay in place until purge_stale_epochs archives them in bulk.
+import sys
+
+GLOBAL_SCOPE = "*"
+EPOCHS_TABLE = "study_epochs"
+
+
+def load_epochs(supabase, table):
+    """Return {reader_id or '*': epoch} for one result table"""
+    response = supabase.table(EPOCHS_TABLE).select("reader_id, epoch").eq("table_name", table).execute()
+    return {row["reader_id"]: int(row["epoch"]) for row in response.data or []}
+
+
+def load_all_epochs(supabase):
+    """Return {table: {reader_id or '*': epoch}} for every result table in one query"""
+    response = supabase.table(EPOCHS_TABLE).select("table_name, reader_id, epoch").execute()
+    epochs = {}
+    for row in response.data or []:
+        epochs.setdefault(row["table_name"], {})[row["reader_id"]] = int(row["epoch"])
+    return epochs
+
+
+def active_epoch(epochs, reader_id):
+    return max(epochs.get(GLOBAL_SCOPE, 0), epochs.get(str(reader_id), 0))
+
+
+def current_epoch(supabase, table, reader_id):
+    """Active epoch of a reader on a result table (reads at most two rows)"""
+    response = supabase.table(EPOCHS_TABLE).select("reader_id, epoch").eq("table_name", table).in_(
+        "reader_id", [GLOBAL_SCOPE, str(reader_id)]
+    ).execute()
+    return active_epoch({row["reader_id"]: int(row["epoch"]) for row in response.data or []}, reader_id)
+
+
+def is_current(row, epochs):
+    return int(row.get("epoch") or 0) >= active_epoch(epochs, row.get("reader_id"))
+
+
+def bump_epoch(supabase, table, reader_id=GLOBAL_SCOPE):
+    """Start a new epoch for one reader (or everyone with '*'), returns the new epoch"""
+    response = supabase.rpc("bump_study_epoch", {"p_table": table, "p_reader": str(reader_id)}).execute()
+    return int(response.data)
+
+
+def purge_stale_epochs(supabase, table, archive=True):
+    """Move (or drop) rows that are no longer in their reader's active epoch, returns the row count"""
+    response = supabase.rpc("purge_stale_epochs", {"p_table": table, "p_archive": archive}).execute()
+    return int(response.data or 0)
+
+
+if __name__ == "__main__":
+    # Background job, e.g. nightly from cron:  python epochs.py purge [--no-archive]
+    from utils import init_supabase, RESULT_TABLES
+
+    if sys.argv[1:2] != ["purge"]:
+        sys.exit("usage: python epochs.py purge [--no-archive]")
+    client = init_supabase()
+    if client is None:
+        sys.exit(1)
+    for name in RESULT_TABLES:
+        purged = purge_stale_epochs(client, name, archive="--no-archive" not in sys.argv)
+        print(f"{name}: {purged} stale rows purged")
@@ -0,0 +1,330 @@
+# loadtest.py
+# Concurrent-reader load test, driven headlessly through Streamlit's app testing API.
+#
+# Every simulated reader is its own AppTest session running the real pages against
+# the local backend (local_backend.py): log in, open a task, then a randomized but
+# realistic click sequence (mostly Save & Next, some Skip, Back and quick-nav
+# jumps), then log out. Reports per-action latency percentiles, error rate and the
+# memory of the app processes.
+#
+# AppTest swaps process-wide globals on every run, so the runs of one process are
+# serialized: each process models one server worker, and latency includes the
+# time a click waits for the worker. --processes spreads the readers over several
+# workers (as serve.py does) sharing one backend store.
+#
+#   python loadtest.py --readers 30 --cases 40 --task classifications --latency-ms 20
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing.managers import BaseManager
+
+from streamlit.testing.v1 import AppTest
+
+from auth import hash_passwords
+from local_backend import LocalClient, LocalStore, set_local_backend
+from tasks import TASKS
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+ENTRY = os.path.join(APP_DIR, "main.py")
+RUN_TIMEOUT_SECONDS = 120
+
+# Share of each in-task action; the rest of a session is login, open and logout
+CLICK_MIX = {"save_next": 0.80, "skip": 0.08, "back": 0.05, "jump": 0.07}
+SAVE_LABELS = ("Save & Next", "Update & Next", "Save")
+
+
+# One app run at a time per process (see above)
+RUN_LOCK = threading.Lock()
+
+
+class StoreManager(BaseManager):
+    pass
+
+
+StoreManager.register("LocalStore", LocalStore, exposed=("execute", "call", "request_count", "row_count"))
+
+
+def seed_tables(readers):
+    """`readers` active accounts; reader i logs in as load{i} / load{i}"""
+    hashes = hash_passwords([f"load{i}" for i in range(readers)])
+    return {"readers": [
+        {"reader_id": f"reader_{i + 1:03d}", "username": f"load{i}", "reader_name": f"Load Reader {i}",
+         "password_hash": hashed, "is_active": True, "last_login": None}
+        for i, hashed in enumerate(hashes)
+    ]}
+
+
+class Recorder:
+    """Latency samples and errors per action, shared by all reader threads"""
+
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self.error_messages = []
+        self.lock = threading.Lock()
+
+    def add(self, action, seconds, error=None):
+        with self.lock:
+            self.samples.setdefault(action, []).append(seconds * 1000)
+            if error is not None:
+                self.errors[action] = self.errors.get(action, 0) + 1
+                if len(self.error_messages) < 20:
+                    self.error_messages.append(f"{action}: {error}")
+
+
+class MemorySampler(threading.Thread):
+    """Resident set size of this process, sampled in the background"""
+
+    def __init__(self, interval=0.25):
+        super().__init__(name="memory-sampler", daemon=True)
+        self.interval = interval
+        self.samples = []
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.samples.append(rss_mb())
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        self.samples.append(rss_mb())
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        import resource
+        # Peak rather than current outside Linux; kilobytes on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def percentile(values, q):
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered) + 0.5)) - 1))]
+
+
+def find_button(at, label=None, prefix=None, labels=None):
+    for button in at.button:
+        if (button.label == label or (labels and button.label in labels)
+                or (prefix and button.label.startswith(prefix))):
+            return button
+    return None
+
+
+def page_problem(at):
+    # An uncaught exception or an st.error on the page counts as a failed action
+    if len(at.exception):
+        return at.exception[0].message
+    if len(at.error):
+        return at.error[0].value
+    return None
+
+
+def simulate_reader(index, args, recorder, secrets):
+    rng = random.Random(args.seed * 1000 + index)
+    task = TASKS[args.task]
+    at = AppTest.from_file(ENTRY, default_timeout=RUN_TIMEOUT_SECONDS)
+    for key, value in secrets.items():
+        at.secrets[key] = value
+
+    def act(action, step):
+        started = time.perf_counter()
+        try:
+            with RUN_LOCK:
+                step()
+            error = page_problem(at)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        recorder.add(action, time.perf_counter() - started, error)
+        # Hot path stages timed inside the app (utils.timed)
+        timings = at.session_state["_timings"] if "_timings" in at.session_state else {}
+        for stage, ms in timings.items():
+            recorder.add(f"  stage:{stage}", ms / 1000)
+        if "_timings" in at.session_state:
+            at.session_state["_timings"] = {}
+        return error is None
+
+    def think():
+        if args.think_ms:
+            time.sleep(rng.uniform(0.5, 1.5) * args.think_ms / 1000)
+
+    def login():
+        at.run()
+        inputs = {field.label: field for field in at.text_input}
+        inputs["👤 Username"].input(f"load{index}")
+        inputs["🔒 Password"].input(f"load{index}")
+        find_button(at, label="🚀 Login").click().run()
+        if not at.session_state["authenticated"]:
+            raise RuntimeError("login rejected: " + "; ".join(str(error.value) for error in at.error))
+
+    def open_task():
+        find_button(at, prefix=f"{task.icon} {task.nav_label}").click().run()
+
+    def save_next():
+        radio = next(r for r in at.radio if r.key and r.key.startswith(f"{task.key}_radio_"))
+        radio.set_value(rng.choice(task.options))
+        find_button(at, labels=SAVE_LABELS).click().run()
+
+    def click(label):
+        button = find_button(at, label=label)
+        if button is None:
+            return save_next()
+        button.click().run()
+
+    def jump():
+        targets = [b for b in at.button if b.key and b.key.startswith("jump_")]
+        rng.choice(targets).click().run()
+
+    steps = {"save_next": save_next, "skip": lambda: click("Skip →"),
+             "back": lambda: click("← Back"), "jump": jump}
+
+    if not act("login", login):
+        return
+    think()
+    if not act("open_task", open_task):
+        return
+    for _ in range(args.cases):
+        think()
+        if at.session_state["next_task_confirm"] if "next_task_confirm" in at.session_state else False:
+            break
+        action = rng.choices(list(CLICK_MIX), weights=list(CLICK_MIX.values()))[0]
+        act(action, steps[action])
+    think()
+    act("logout", lambda: find_button(at, label="Logout").click().run())
+
+
+def run_worker(indexes, args, store, secrets):
+    """One app process: its share of the readers, concurrently; returns samples and memory"""
+    os.chdir(APP_DIR)
+    set_local_backend(LocalClient(store, latency=args.latency_ms / 1000))
+    recorder = Recorder()
+    memory = MemorySampler()
+    memory.start()
+    with ThreadPoolExecutor(max_workers=max(len(indexes), 1), thread_name_prefix="reader") as pool:
+        futures = []
+        for index in indexes:
+            futures.append(pool.submit(simulate_reader, index, args, recorder, secrets))
+            # Readers arrive spread over the ramp-up period
+            time.sleep(args.ramp_up / max(args.readers, 1) * args.processes)
+        for future in futures:
+            future.result()
+    memory.stop()
+    return recorder.samples, recorder.errors, recorder.error_messages, memory.samples
+
+
+def run(args):
+    session_db = os.path.join(tempfile.mkdtemp(prefix="loadtest-"), "sessions.db")
+    secrets = {"SUPABASE_URL": "local://", "SUPABASE_KEY": "local", "SESSION_DB": session_db}
+    shares = [list(range(args.readers))[worker::args.processes] for worker in range(args.processes)]
+    tables = seed_tables(args.readers)
+
+    started = time.perf_counter()
+    if args.processes == 1:
+        store = LocalStore(tables)
+        results = [run_worker(shares[0], args, store, secrets)]
+    else:
+        manager = StoreManager()
+        manager.start()
+        store = manager.LocalStore(tables)
+        # Spawned, not forked: a forked child inherits thread pools without their threads
+        with ProcessPoolExecutor(max_workers=args.processes, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results = list(pool.map(run_worker, shares, [args] * args.processes,
+                                    [store] * args.processes, [secrets] * args.processes))
+    elapsed = time.perf_counter() - started
+
+    samples, errors, messages = {}, {}, []
+    for worker_samples, worker_errors, worker_messages, _ in results:
+        for action, values in worker_samples.items():
+            samples.setdefault(action, []).extend(values)
+        for action, count in worker_errors.items():
+            errors[action] = errors.get(action, 0) + count
+        messages.extend(worker_messages)
+    peaks = [max(memory) for *_, memory in results]
+
+    report = {
+        "readers": args.readers,
+        "processes": args.processes,
+        "task": args.task,
+        "elapsed_seconds": round(elapsed, 2),
+        "backend_requests": store.request_count(),
+        "saved_rows": store.row_count(args.task),
+        "memory_mb": {"start": round(sum(memory[0] for *_, memory in results), 1),
+                      "peak": round(sum(peaks), 1),
+                      "end": round(sum(memory[-1] for *_, memory in results), 1),
+                      "peak_per_process": [round(peak, 1) for peak in peaks]},
+        "actions": {
+            action: {
+                "count": len(values),
+                "errors": errors.get(action, 0),
+                "error_rate": round(errors.get(action, 0) / len(values), 4),
+                "p50_ms": round(percentile(values, 50), 1),
+                "p95_ms": round(percentile(values, 95), 1),
+                "p99_ms": round(percentile(values, 99), 1),
+                "max_ms": round(max(values), 1),
+            }
+            for action, values in sorted(samples.items(), key=lambda item: item[0].startswith(" "))
+        },
+        "sample_errors": messages[:20],
+    }
+    if args.processes > 1:
+        manager.shutdown()
+    return report
+
+
+def print_report(report):
+    print(f"{report['readers']} readers on {report['task']} in {report['processes']} process(es): "
+          f"{report['elapsed_seconds']}s, "
+          f"{report['backend_requests']} backend requests, {report['saved_rows']} rows saved")
+    memory = report["memory_mb"]
+    print(f"memory (RSS, all app processes): start {memory['start']} MB, peak {memory['peak']} MB, "
+          f"end {memory['end']} MB\n")
+    print(f"{'action':<24}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for action, stats in report["actions"].items():
+        print(f"{action:<24}{stats['count']:>7}{stats['errors']:>8}{stats['p50_ms']:>10}"
+              f"{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['max_ms']:>10}")
+    if report["sample_errors"]:
+        print("\nerrors:")
+        for message in report["sample_errors"]:
+            print(f"  {message}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless concurrent-reader load test")
+    parser.add_argument("--readers", type=int, default=10, help="simulated readers running at once")
+    parser.add_argument("--cases", type=int, default=20, help="in-task actions per reader")
+    parser.add_argument("--task", choices=list(TASKS), default=next(iter(TASKS)))
+    parser.add_argument("--think-ms", type=float, default=0, help="mean pause between a reader's clicks")
+    parser.add_argument("--processes", type=int, default=1, help="app worker processes sharing the readers")
+    parser.add_argument("--latency-ms", type=float, default=0, help="simulated database round trip")
+    parser.add_argument("--ramp-up", type=float, default=2.0, help="seconds over which readers arrive")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    os.chdir(APP_DIR)
+    report = run(args)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    total_errors = sum(stats["errors"] for stats in report["actions"].values())
+    sys.exit(1 if total_errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,620 @@
+# local_backend.py
+# In-process stand-in for the Supabase client.
+#
+# Implements the part of the postgrest query builder and the RPCs this app uses,
+# over plain dicts guarded by one lock. Selected with SUPABASE_URL = "local://"
+# (see utils.init_supabase); used by loadtest.py and for offline runs. Requests
+# are plain data, so a LocalStore can also live in a manager process shared by
+# several app processes. An optional per-request latency mimics the network
+# round trip to the real database.
+import copy
+import itertools
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from consensus import CONSENSUS_TABLE, SCALES_TABLE, summarize, task_scale
+from epochs import EPOCHS_TABLE, GLOBAL_SCOPE, active_epoch, is_current
+from scheduler import QUEUE_TABLE, LEASES_TABLE, QUOTAS_TABLE
+from tasks import TASKS
+from utils import PAGE_SIZE
+
+# Conflict keys of the upsert/insert targets, mirroring the SQL migrations
+PRIMARY_KEYS = {
+    "readers": ("reader_id",),
+    "admin_users": ("admin_id",),
+    EPOCHS_TABLE: ("table_name", "reader_id"),
+    QUEUE_TABLE: ("table_name", "case_id"),
+    LEASES_TABLE: ("table_name", "case_id", "reader_id"),
+    QUOTAS_TABLE: ("table_name", "reader_id"),
+    SCALES_TABLE: ("table_name",),
+    **{table: ("case_id", "reader_id", "epoch") for table in TASKS},
+}
+UNIQUE_KEYS = {
+    "readers": ("username",),
+    "admin_users": ("username",),
+}
+
+
+class LocalResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class LocalError(Exception):
+    """Raised like a PostgREST APIError; code 23505 is a unique violation"""
+
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+    def __reduce__(self):
+        # Keeps the code when raised across a manager process
+        return type(self), (str(self), self.code)
+
+
+class LocalQuery:
+    """Builds a request as plain data; the store evaluates it (possibly in another process)"""
+
+    def __init__(self, client, table):
+        self.client = client
+        self.spec = {"table": table, "operation": "select", "filters": [], "payload": None, "columns": "*",
+                     "count": None, "ordering": [], "range": None, "limit": None, "on_conflict": None}
+
+    # Filters
+    def _filter(self, operator, column, value):
+        self.spec["filters"].append((operator, column, value))
+        return self
+
+    def eq(self, column, value):
+        return self._filter("eq", column, value)
+
+    def neq(self, column, value):
+        return self._filter("neq", column, value)
+
+    def gt(self, column, value):
+        return self._filter("gt", column, value)
+
+    def gte(self, column, value):
+        return self._filter("gte", column, value)
+
+    def lt(self, column, value):
+        return self._filter("lt", column, value)
+
+    def lte(self, column, value):
+        return self._filter("lte", column, value)
+
+    def in_(self, column, values):
+        return self._filter("in", column, list(values))
+
+    def is_(self, column, value):
+        return self._filter("is", column, value)
+
+    def ilike(self, column, pattern):
+        return self._filter("ilike", column, pattern)
+
+    def or_(self, expression):
+        """PostgREST or=(...) syntax, for the eq/ilike/is operators"""
+        return self._filter("or", None, [tuple(part.split(".", 2)) for part in expression.split(",")])
+
+    # Shaping
+    def select(self, columns="*", count=None):
+        self.spec.update(columns=columns, count=count)
+        return self
+
+    def order(self, column, desc=False):
+        self.spec["ordering"].append((column, desc))
+        return self
+
+    def range(self, start, end):
+        self.spec["range"] = (start, end)
+        return self
+
+    def limit(self, size):
+        self.spec["limit"] = size
+        return self
+
+    # Writes
+    def insert(self, payload):
+        self.spec.update(operation="insert", payload=payload)
+        return self
+
+    def upsert(self, payload, on_conflict=None):
+        self.spec.update(operation="upsert", payload=payload,
+                         on_conflict=tuple(on_conflict.split(",")) if on_conflict else None)
+        return self
+
+    def update(self, payload):
+        self.spec.update(operation="update", payload=payload)
+        return self
+
+    def delete(self):
+        self.spec["operation"] = "delete"
+        return self
+
+    def execute(self):
+        self.client.round_trip()
+        data, count = self.client.store.execute(self.spec)
+        return LocalResponse(data, count)
+
+
+class LocalRpc:
+    def __init__(self, client, name, params):
+        self.client = client
+        self.name = name
+        self.params = params or {}
+
+    def execute(self):
+        self.client.round_trip()
+        return LocalResponse(self.client.store.call(self.name, self.params))
+
+
+class LocalClient:
+    """The Supabase client surface used by the app, over a LocalStore or a proxy to one"""
+
+    def __init__(self, store, latency=0.0):
+        self.store = store
+        self.latency = latency
+
+    def table(self, name):
+        return LocalQuery(self, name)
+
+    def rpc(self, name, params=None):
+        return LocalRpc(self, name, params)
+
+    def round_trip(self):
+        # Waits outside the store lock, like a network hop
+        if self.latency:
+            time.sleep(self.latency)
+
+
+class LocalStore:
+    """Tables, views and RPCs held in memory; every request runs under one lock
+
+    A select returns at most `max_rows` rows, like PostgREST's max-rows setting, so
+    unpaged reads are cut off here as they are in production.
+    """
+
+    def __init__(self, tables=None, max_rows=PAGE_SIZE):
+        self.tables = {name: list(rows) for name, rows in (tables or {}).items()}
+        self.max_rows = max_rows
+        self.lock = threading.RLock()
+        self.requests = 0
+        self._reader_ids = itertools.count(1)
+        # Every task is installed and its seeded results get their consensus, as after
+        # `python consensus.py rebuild`
+        for table, task in TASKS.items():
+            scale = task_scale(task)
+            self.rpc_install_task_table(table, scale["rating_column"], scale["ordinal"], scale["options"])
+            if table in self.tables:
+                self.rpc_rebuild_case_consensus(table)
+
+    def execute(self, spec):
+        with self.lock:
+            self.requests += 1
+            return getattr(self, f"_{spec['operation']}")(spec)
+
+    def call(self, name, params):
+        function = getattr(self, f"rpc_{name}", None)
+        if function is None:
+            raise LocalError(f"function {name} does not exist", code="42883")
+        with self.lock:
+            self.requests += 1
+            return function(**params)
+
+    def request_count(self):
+        return self.requests
+
+    def row_count(self, table):
+        with self.lock:
+            return len(self.tables.get(table, []))
+
+    # Query execution (called with the lock held)
+    def _rows(self, table):
+        view = getattr(self, f"view_{table}", None)
+        if view is not None:
+            return view()
+        return self.tables.setdefault(table, [])
+
+    def _matching(self, spec):
+        return [row for row in self._rows(spec["table"]) if _matches(row, spec["filters"])]
+
+    def _select(self, spec):
+        rows = self._matching(spec)
+        for column, desc in reversed(spec["ordering"]):
+            rows.sort(key=lambda row: (row.get(column) is None, row.get(column) or ""), reverse=desc)
+        total = len(rows)
+        if spec["range"] is not None:
+            rows = rows[spec["range"][0]:spec["range"][1] + 1]
+        if spec["limit"] is not None:
+            rows = rows[:spec["limit"]]
+        rows = rows[:self.max_rows]
+        if spec["columns"].strip() != "*":
+            columns = [column.strip() for column in spec["columns"].split(",")]
+            rows = [{column: row.get(column) for column in columns} for row in rows]
+        return copy.deepcopy(rows), total if spec["count"] else None
+
+    def _insert(self, spec, upsert=False):
+        payload = spec["payload"] if isinstance(spec["payload"], list) else [spec["payload"]]
+        table = spec["table"]
+        rows = self.tables.setdefault(table, [])
+        keys = spec["on_conflict"] or PRIMARY_KEYS.get(table, ())
+        written = []
+        for record in payload:
+            record = self._with_defaults(table, dict(record))
+            existing = _find(rows, keys, record)
+            if existing is not None and upsert:
+                old = dict(existing)
+                existing.update(record)
+                self._after_write(table, old, existing)
+                written.append(existing)
+                continue
+            if existing is not None or any(_find(rows, (unique,), record) is not None
+                                           for unique in UNIQUE_KEYS.get(table, ())):
+                raise LocalError(f'duplicate key value violates unique constraint on "{table}"', code="23505")
+            rows.append(record)
+            self._after_write(table, None, record)
+            written.append(record)
+        return copy.deepcopy(written), None
+
+    def _upsert(self, spec):
+        return self._insert(spec, upsert=True)
+
+    def _update(self, spec):
+        rows = self._matching(spec)
+        now = datetime.now(timezone.utc).isoformat()
+        for row in rows:
+            old = dict(row)
+            # "now()" is evaluated by the database, as on the real backend
+            row.update({key: now if value == "now()" else value for key, value in spec["payload"].items()})
+            if spec["table"] in TASKS:
+                row["updated_at"] = now
+            self._after_write(spec["table"], old, row)
+        return copy.deepcopy(rows), None
+
+    def _delete(self, spec):
+        rows = self._matching(spec)
+        removed = {id(row) for row in rows}
+        self.tables[spec["table"]] = [row for row in self.tables.get(spec["table"], []) if id(row) not in removed]
+        for row in rows:
+            self._after_write(spec["table"], row, None)
+        return copy.deepcopy(rows), None
+
+    def _with_defaults(self, table, record):
+        now = datetime.now(timezone.utc).isoformat()
+        if table == "readers" and not record.get("reader_id"):
+            record["reader_id"] = f"reader_{next(self._reader_ids):03d}"
+        if table in TASKS:
+            # Saves go to the reader's active round (sql/009_result_epoch_stamp.sql)
+            record["epoch"] = active_epoch(self._epochs(table), record.get("reader_id"))
+        if table == EPOCHS_TABLE or table in TASKS:
+            # Result tables: set by a trigger on every write (sql/010_result_updated_at.sql)
+            record["updated_at"] = now
+        if table != EPOCHS_TABLE:
+            record.setdefault("created_at", now)
+        return record
+
+    # Triggers (sql/007_case_consensus.sql, sql/008_case_scheduler.sql)
+    def _after_write(self, table, old, new):
+        task = TASKS.get(table)
+        if task is None:
+            return
+        if old is None and new is not None:
+            self._complete_lease(table, new)
+        if old is not None and new is not None and old.get("epoch") == new.get("epoch") \
+                and old.get(task.db_column) == new.get(task.db_column):
+            return
+        epochs = self._epochs(table)
+        # Rows of retired rounds were already taken out when their epoch was bumped
+        if old is not None and is_current(old, epochs):
+            self._apply_consensus(task, old["case_id"], old.get(task.db_column), -1)
+        if new is not None and is_current(new, epochs):
+            self._apply_consensus(task, new["case_id"], new.get(task.db_column), 1)
+
+    def _epochs(self, table):
+        return {e["reader_id"]: int(e["epoch"]) for e in self.tables.get(EPOCHS_TABLE, []) if e["table_name"] == table}
+
+    def _apply_consensus(self, task, case_id, rating, delta):
+        if not rating:
+            return
+        rows = self.tables.setdefault(CONSENSUS_TABLE, [])
+        key = {"table_name": task.key, "case_id": str(case_id)}
+        existing = _find(rows, ("table_name", "case_id"), key)
+        counts = dict(existing["counts"]) if existing is not None else {}
+        counts[rating] = counts.get(rating, 0) + delta
+        summary = summarize(task, counts)
+        if existing is not None:
+            rows.remove(existing)
+        if summary["n_reads"] > 0:
+            rows.append({**key, **summary, "updated_at": datetime.now(timezone.utc).isoformat()})
+
+    def _retire_consensus(self, table, reader_id, previous_epoch, new_epoch):
+        task = TASKS.get(table)
+        if task is None:
+            return
+        if reader_id == GLOBAL_SCOPE:
+            self.tables[CONSENSUS_TABLE] = [row for row in self.tables.get(CONSENSUS_TABLE, [])
+                                            if row["table_name"] != table]
+            return
+        for row in self.tables.get(table, []):
+            if str(row["reader_id"]) == reader_id and previous_epoch <= int(row.get("epoch") or 0) < new_epoch:
+                self._apply_consensus(task, row["case_id"], row.get(task.db_column), -1)
+
+    def _retire_leases(self, table, reader_id):
+        retired = [lease for lease in self.tables.get(LEASES_TABLE, []) if lease["table_name"] == table
+                   and reader_id in (GLOBAL_SCOPE, lease["reader_id"])]
+        if not retired:
+            return
+        self.tables[LEASES_TABLE] = [lease for lease in self.tables[LEASES_TABLE] if lease not in retired]
+        for lease in retired:
+            queued = _find(self.tables.get(QUEUE_TABLE, []), PRIMARY_KEYS[QUEUE_TABLE], lease)
+            if queued is not None:
+                queued["assigned"] -= 1
+
+    def _complete_lease(self, table, row):
+        key = {"table_name": table, "case_id": str(row["case_id"]), "reader_id": str(row["reader_id"])}
+        leases = self.tables.setdefault(LEASES_TABLE, [])
+        lease = _find(leases, PRIMARY_KEYS[LEASES_TABLE], key)
+        now = datetime.now(timezone.utc).isoformat()
+        if lease is not None:
+            if lease.get("completed_at") is None:
+                lease["completed_at"] = now
+            return
+        # Saved after the lease was reclaimed: the read still counts
+        queued = _find(self.tables.get(QUEUE_TABLE, []), PRIMARY_KEYS[QUEUE_TABLE], key)
+        if queued is not None:
+            leases.append({**key, "leased_at": now, "expires_at": now, "completed_at": now})
+            queued["assigned"] += 1
+
+    # RPCs (sql/*.sql)
+    def rpc_resolve_principal(self, p_username):
+        readers = [{"principal_id": r["reader_id"], "display_name": r.get("reader_name"), "is_admin": False,
+                    "password_hash": r.get("password_hash")}
+                   for r in self.tables.get("readers", []) if r.get("username") == p_username and r.get("is_active")]
+        admins = [{"principal_id": str(a["admin_id"]), "display_name": f"Admin ({a['username']})", "is_admin": True,
+                   "password_hash": a.get("password_hash")}
+                  for a in self.tables.get("admin_users", []) if a.get("username") == p_username]
+        return copy.deepcopy(readers + admins)
+
+    def rpc_bump_study_epoch(self, p_table, p_reader=GLOBAL_SCOPE):
+        epochs = self.tables.setdefault(EPOCHS_TABLE, [])
+        new_epoch = max([int(e["epoch"]) for e in epochs if e["table_name"] == p_table] + [0]) + 1
+        record = {"table_name": p_table, "reader_id": str(p_reader), "epoch": new_epoch}
+        existing = _find(epochs, PRIMARY_KEYS[EPOCHS_TABLE], record)
+        previous_epoch = active_epoch(self._epochs(p_table), p_reader)
+        if existing is not None:
+            existing.update(self._with_defaults(EPOCHS_TABLE, record))
+        else:
+            epochs.append(self._with_defaults(EPOCHS_TABLE, record))
+        self._retire_consensus(p_table, str(p_reader), previous_epoch, new_epoch)
+        self._retire_leases(p_table, str(p_reader))
+        return new_epoch
+
+    def rpc_purge_stale_epochs(self, p_table, p_archive=True):
+        epochs = {e["reader_id"]: int(e["epoch"]) for e in self.tables.get(EPOCHS_TABLE, [])
+                  if e["table_name"] == p_table}
+        rows = self.tables.get(p_table, [])
+        stale = [row for row in rows if int(row.get("epoch") or 0) <
+                 max(epochs.get(GLOBAL_SCOPE, 0), epochs.get(str(row["reader_id"]), 0))]
+        if p_archive:
+            self.tables.setdefault("result_archive", []).extend(
+                {"source_table": p_table, "row_data": copy.deepcopy(row)} for row in stale)
+        self.tables[p_table] = [row for row in rows if row not in stale]
+        return len(stale)
+
+    def rpc_install_task_table(self, p_table, p_rating_column, p_ordinal, p_options):
+        # Triggers are built in here (_with_defaults, _after_write); only the scale is stored
+        self._insert({"table": SCALES_TABLE, "on_conflict": None, "payload": {
+            "table_name": p_table, "rating_column": p_rating_column, "ordinal": p_ordinal, "options": list(p_options),
+        }}, upsert=True)
+
+    def rpc_rebuild_case_consensus(self, p_table):
+        task = TASKS[p_table]
+        self.tables[CONSENSUS_TABLE] = [row for row in self.tables.get(CONSENSUS_TABLE, [])
+                                        if row["table_name"] != p_table]
+        epochs = self._epochs(p_table)
+        for row in self.tables.get(p_table, []):
+            if is_current(row, epochs):
+                self._apply_consensus(task, row["case_id"], row.get(task.db_column), 1)
+        return sum(row["table_name"] == p_table for row in self.tables[CONSENSUS_TABLE])
+
+    def rpc_reclaim_expired_leases(self, p_table=None, p_limit=None):
+        now = datetime.now(timezone.utc).isoformat()
+        leases = self.tables.setdefault(LEASES_TABLE, [])
+        expired = sorted((lease for lease in leases if lease.get("completed_at") is None and lease["expires_at"] < now
+                          and (p_table is None or lease["table_name"] == p_table)),
+                         key=lambda lease: lease["expires_at"])[:p_limit]
+        queue = self.tables.get(QUEUE_TABLE, [])
+        for lease in expired:
+            leases.remove(lease)
+            queued = _find(queue, PRIMARY_KEYS[QUEUE_TABLE], lease)
+            if queued is not None:
+                queued["assigned"] -= 1
+        return len(expired)
+
+    def rpc_lease_cases(self, p_table, p_reader, p_count=1, p_lease_seconds=1800):
+        self.rpc_reclaim_expired_leases(p_table, 32)
+        now = datetime.now(timezone.utc)
+        expires_at = (now + timedelta(seconds=p_lease_seconds)).isoformat()
+        leases = self.tables.setdefault(LEASES_TABLE, [])
+        mine = [lease for lease in leases if lease["table_name"] == p_table and lease["reader_id"] == str(p_reader)]
+        held = [lease for lease in mine if lease.get("completed_at") is None]
+        for lease in held:
+            lease["expires_at"] = expires_at
+
+        quotas = {row["reader_id"]: int(row["quota"]) for row in self.tables.get(QUOTAS_TABLE, [])
+                  if row["table_name"] == p_table}
+        quota = quotas.get(str(p_reader), quotas.get(GLOBAL_SCOPE))
+        had = {lease["case_id"] for lease in mine}
+        open_cases = sorted((row for row in self.tables.get(QUEUE_TABLE, []) if row["table_name"] == p_table
+                             and row["assigned"] < row["target"] and row["case_id"] not in had),
+                            key=lambda row: (row["assigned"], row["case_id"]))
+        used = len(mine)
+        for row in open_cases:
+            if len(held) >= p_count or (quota is not None and used >= quota):
+                break
+            row["assigned"] += 1
+            lease = {"table_name": p_table, "case_id": row["case_id"], "reader_id": str(p_reader),
+                     "leased_at": now.isoformat(), "expires_at": expires_at, "completed_at": None}
+            leases.append(lease)
+            held.append(lease)
+            used += 1
+        held.sort(key=lambda lease: (lease["leased_at"], lease["case_id"]))
+        return [{"case_id": lease["case_id"], "expires_at": lease["expires_at"]} for lease in held]
+
+    def rpc_seed_case_queue(self, p_table, p_cases, p_reads):
+        cases = [str(case_id) for case_id in p_cases]
+        leases = self.tables.setdefault(LEASES_TABLE, [])
+        wanted, epochs = set(cases), self._epochs(p_table)
+        for row in self.tables.get(p_table, []):
+            key = {"table_name": p_table, "case_id": str(row["case_id"]), "reader_id": str(row["reader_id"])}
+            if key["case_id"] in wanted and is_current(row, epochs) \
+                    and _find(leases, PRIMARY_KEYS[LEASES_TABLE], key) is None:
+                saved_at = row.get("created_at") or datetime.now(timezone.utc).isoformat()
+                leases.append({**key, "leased_at": saved_at, "expires_at": saved_at, "completed_at": saved_at})
+        leased = {}
+        for lease in self.tables.get(LEASES_TABLE, []):
+            if lease["table_name"] == p_table:
+                leased[lease["case_id"]] = leased.get(lease["case_id"], 0) + 1
+        self.tables[QUEUE_TABLE] = [row for row in self.tables.get(QUEUE_TABLE, []) if row["table_name"] != p_table]
+        self.tables[QUEUE_TABLE].extend({"table_name": p_table, "case_id": case_id, "target": int(p_reads),
+                                         "assigned": leased.get(case_id, 0)} for case_id in dict.fromkeys(cases))
+        if not cases:
+            self.tables[LEASES_TABLE] = [lease for lease in self.tables.get(LEASES_TABLE, [])
+                                         if lease["table_name"] != p_table]
+        return len(set(cases))
+
+    # Views (sql/*.sql)
+    def view_case_coverage(self):
+        counts = {}
+        for lease in self.tables.get(LEASES_TABLE, []):
+            done, held = counts.setdefault((lease["table_name"], lease["case_id"]), [0, 0])
+            counts[(lease["table_name"], lease["case_id"])] = [done + (lease.get("completed_at") is not None),
+                                                               held + (lease.get("completed_at") is None)]
+        tables = {}
+        for row in self.tables.get(QUEUE_TABLE, []):
+            done, held = counts.get((row["table_name"], row["case_id"]), (0, 0))
+            summary = tables.setdefault(row["table_name"], {"table_name": row["table_name"], "cases": 0,
+                                                            "reads_wanted": 0, "reads_done": 0, "reads_leased": 0,
+                                                            "cases_complete": 0})
+            summary["cases"] += 1
+            summary["reads_wanted"] += row["target"]
+            summary["reads_done"] += done
+            summary["reads_leased"] += held
+            summary["cases_complete"] += done >= row["target"]
+        return list(tables.values())
+
+    def view_reader_stats(self):
+        readers = self.tables.get("readers", [])
+        return [{
+            "total_users": len(readers),
+            "active_users": sum(bool(r.get("is_active")) for r in readers),
+            "inactive_users": sum(not r.get("is_active") for r in readers),
+            "logged_in_users": sum(r.get("last_login") is not None for r in readers),
+        }]
+
+    def view_active_readers(self):
+        cutoff = (datetime.now(timezone.utc) - timedelta(minutes=5)).isoformat()
+        names = {r["reader_id"]: r.get("reader_name") for r in self.tables.get("readers", [])}
+        latest = {}
+        for event in self.tables.get("reader_activity", []):
+            if event["created_at"] > cutoff and event["created_at"] >= latest.get(event["reader_id"], {}).get(
+                    "last_seen", ""):
+                latest[event["reader_id"]] = {"reader_id": event["reader_id"],
+                                              "reader_name": names.get(event["reader_id"]),
+                                              "module": event.get("module"), "last_seen": event["created_at"]}
+        return list(latest.values())
+
+    def view_reader_throughput(self):
+        hour_ago = (datetime.now(timezone.utc) - timedelta(hours=1)).isoformat()
+        names = {r["reader_id"]: r.get("reader_name") for r in self.tables.get("readers", [])}
+        saves = {}
+        for event in self.tables.get("reader_activity", []):
+            if event["event"] == "save":
+                saves.setdefault(event["reader_id"], []).append(event)
+        rows = []
+        for reader_id, events in saves.items():
+            dwell = sorted(e["dwell_ms"] for e in events if e.get("dwell_ms") is not None)
+            rows.append({
+                "reader_id": reader_id,
+                "reader_name": names.get(reader_id),
+                "saves_last_hour": sum(e["created_at"] > hour_ago for e in events),
+                "saves_total": len(events),
+                "median_seconds_per_case": dwell[len(dwell) // 2] / 1000.0 if dwell else None,
+                "last_save": max(e["created_at"] for e in events),
+            })
+        return rows
+
+
+def _matches(row, filters):
+    for operator, column, value in filters:
+        if operator == "or":
+            if not any(_matches(row, [(clause_operator, clause_column, clause_value)])
+                       for clause_column, clause_operator, clause_value in value):
+                return False
+            continue
+        cell = row.get(column)
+        if operator == "eq":
+            ok = _same(cell, value)
+        elif operator == "neq":
+            ok = not _same(cell, value)
+        elif operator == "in":
+            ok = any(_same(cell, item) for item in value)
+        elif operator == "is":
+            ok = cell is None if str(value).lower() == "null" else _same(cell, value)
+        elif operator == "ilike":
+            ok = _ilike(cell, value)
+        else:
+            sign = _compare(cell, value)
+            ok = cell is not None and {"gt": sign > 0, "gte": sign >= 0, "lt": sign < 0, "lte": sign <= 0}[operator]
+        if not ok:
+            return False
+    return True
+
+
+def _same(left, right):
+    # PostgREST compares on the text form; booleans arrive as Python bools
+    if isinstance(left, bool) or isinstance(right, bool):
+        return str(left).lower() == str(right).lower()
+    return left == right or (left is not None and str(left) == str(right))
+
+
+def _compare(left, right):
+    if left is None:
+        return -1
+    left, right = (str(left), str(right)) if isinstance(left, str) or isinstance(right, str) else (left, right)
+    return (left > right) - (left < right)
+
+
+def _ilike(value, pattern):
+    needle = str(pattern).strip("*%").lower()
+    return value is not None and needle in str(value).lower()
+
+
+def _find(rows, keys, record):
+    if not keys or any(key not in record for key in keys):
+        return None
+    for row in rows:
+        if all(_same(row.get(key), record.get(key)) for key in keys):
+            return row
+    return None
+
+
+_shared_client = None
+_shared_lock = threading.Lock()
+
+
+def get_local_backend():
+    """The process-wide client behind SUPABASE_URL = "local://" """
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None:
+            _shared_client = LocalClient(LocalStore())
+        return _shared_client
+
+
+def set_local_backend(client):
+    global _shared_client
+    with _shared_lock:
+        _shared_client = client
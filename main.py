@@ -1,5 +1,6 @@
 # main.py
 import streamlit as st
+from session_store import restore_session
 
 
 
@@ -30,6 +31,8 @@ def init_session_state():
         st.session_state.current_csv_path = ""
     if 'current_result_column' not in st.session_state:
         st.session_state.current_result_column = ""
+    if 'result_epoch' not in st.session_state:
+        st.session_state.result_epoch = 0
 
 # Initialize session state
 init_session_state()
@@ -37,5 +40,8 @@ init_session_state()
 # Hide sidebar on login page
 st.set_page_config(initial_sidebar_state="collapsed")
 
+# Pick up a persisted session before the redirect drops the URL token
+restore_session()
+
 # Redirect to login page
 st.switch_page("pages/login.py")
\ No newline at end of file
@@ -1,8 +1,71 @@
 # pages/Admin_Dashboard.py
+import os
+
 import pandas as pd
-from utils import init_supabase
+from utils import init_supabase, fetch_tables_concurrently, is_unique_violation, read_manifest, RESULT_TABLES
+from change_feed import get_change_feed, LiveTable, drain_into
+from agreement import attach as attach_agreement
+from comment_index import attach as attach_comment_index
+from accuracy import accuracy_report, BOOTSTRAP_REPLICATES
+from reports import combined_report
+import analytics
+import scheduler
+from consensus import load_consensus, rebuild as rebuild_consensus, verify as verify_consensus, scale_mismatch
+from tasks import TASKS
+from auth import hash_password, hash_passwords
+from activity import load_activity_summary, get_activity_tracker
+from epochs import GLOBAL_SCOPE, load_all_epochs, bump_epoch
+from session_store import restore_session, end_session, get_session_store
+from session_monitor import touch_session, get_session_monitor, session_report, process_summary, ADMIN_DATA_KEYS
 import streamlit as st
 
+# Last-login filter of the user grid: days back, "never" or None for any
+LAST_LOGIN_FILTERS = {
+    "Any": None,
+    "Never": "never",
+    "Last 24 hours": 1,
+    "Last 7 days": 7,
+    "Last 30 days": 30,
+}
+
+# Sort options of the user grid: (column, descending)
+USER_SORTS = {
+    "Created": ("created_at", False),
+    "Name": ("reader_name", False),
+    "Username": ("username", False),
+    "Last login": ("last_login", True),
+}
+
+# Accepted spellings of the optional `active` column in bulk imports (blank = active)
+ACTIVE_VALUES = {"": True, "true": True, "yes": True, "1": True, "false": False, "no": False, "0": False}
+
+# Readers per insert request during a bulk import
+IMPORT_CHUNK_SIZE = 100
+
+# Attempts to insert a reader before giving up on reader_id collisions
+READER_ID_RETRIES = 3
+
+# Seconds between change feed refreshes of the Data tab
+LIVE_REFRESH_SECONDS = 3
+
+# Upper bound on the initial download of a result table
+FETCH_TIMEOUT_SECONDS = 20
+
+# Best matches listed by the comment search
+COMMENT_SEARCH_LIMIT = 200
+
+# Rows of the combined report shown on the page; the download has all of them
+COMBINED_PREVIEW_ROWS = 1000
+
+# Sessions listed in the Sessions tab, largest first
+SESSION_ROWS = 50
+
+# Per-table settings for the Data tab: (subheader, widget key suffix, download file name)
+DATA_TABLES = {
+    table: (f"{task.nav_label} Data", table, f"{task.nav_label.lower().replace(' ', '_')}_data.csv")
+    for table, task in TASKS.items()
+}
+
 
 def admin_dashboard():
     st.set_page_config(
@@ -21,7 +84,8 @@ def admin_dashboard():
         </style>
     """, unsafe_allow_html=True)
 
-    # Check if user is admin
+    # Check if user is admin (a refreshed browser tab is re-authenticated from its session token)
+    restore_session()
     if not st.session_state.get('is_admin', False):
         st.error("⛔ Access denied. Admin privileges required.")
         st.switch_page("pages/Reader_Dashboard.py")
@@ -38,6 +102,7 @@ def admin_dashboard():
         st.write("")  # Spacer
         if st.button("🚪 Logout", use_container_width=True):
             # Clear all session state
+            end_session()
             for key in list(st.session_state.keys()):
                 del st.session_state[key]
             st.rerun()
@@ -45,102 +110,211 @@ def admin_dashboard():
     st.markdown("---")
 
     # Tabs for different admin functions
-    tab1, tab2, tab3 = st.tabs(["📋 Manage Users", "➕ Add New User", "📊 Data"])
+    tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8, tab9 = st.tabs(
+        ["📋 Manage Users", "➕ Add New User", "📊 Data", "📈 Activity", "🎯 Accuracy", "🧮 Consensus",
+         "🗂️ Assignment", "🦆 Query", "🧠 Sessions"])
 
     with tab1:
         manage_users_tab(supabase)
 
     with tab2:
         add_user_tab(supabase)
+        bulk_import_section(supabase)
 
     with tab3:
         data_tab(supabase)
 
+    with tab4:
+        activity_tab(supabase)
 
-def manage_users_tab(supabase):
-    st.header("📋 Current Users")
+    with tab5:
+        accuracy_tab()
 
-    try:
-        # Get all readers
-        response = supabase.table("readers").select("*").order("created_at").execute()
-        readers = response.data
+    with tab6:
+        consensus_tab(supabase)
 
-        if not readers:
-            st.info("No users found in the system.")
-            return
+    with tab7:
+        assignment_tab(supabase)
 
-        # Convert to DataFrame for display
-        df = pd.DataFrame(readers)
+    with tab8:
+        query_tab(supabase)
 
-        # Format the dataframe for better display
-        display_df = df[['reader_id', 'username', 'reader_name', 'is_active', 'created_at', 'last_login']].copy()
-        display_df['created_at'] = pd.to_datetime(display_df['created_at']).dt.strftime('%Y-%m-%d %H:%M')
-        display_df['last_login'] = pd.to_datetime(display_df['last_login']).dt.strftime('%Y-%m-%d %H:%M') if display_df[
-            'last_login'].notna().any() else 'Never'
+    with tab9:
+        sessions_tab()
 
-        # Show statistics
+
+def manage_users_tab(supabase):
+    st.header("📋 Current Users")
+
+    try:
+        # Show statistics (one aggregate row instead of the whole table)
+        stats = supabase.table("reader_stats").select("*").execute().data
+        stats = stats[0] if stats else {}
         col1, col2, col3, col4 = st.columns(4)
         with col1:
-            st.metric("Total Users", len(readers))
+            st.metric("Total Users", stats.get('total_users', 0))
         with col2:
-            active_users = len([r for r in readers if r['is_active']])
-            st.metric("Active Users", active_users)
+            st.metric("Active Users", stats.get('active_users', 0))
         with col3:
-            inactive_users = len([r for r in readers if not r['is_active']])
-            st.metric("Inactive Users", inactive_users)
+            st.metric("Inactive Users", stats.get('inactive_users', 0))
         with col4:
-            logged_in_users = len([r for r in readers if r['last_login']])
-            st.metric("Users Logged In", logged_in_users)
+            st.metric("Users Logged In", stats.get('logged_in_users', 0))
 
         st.markdown("---")
 
+        # Filters
+        fcol1, fcol2, fcol3, fcol4, fcol5 = st.columns([3, 2, 2, 2, 1])
+        with fcol1:
+            search = st.text_input("🔎 Search name or username", key="users_search")
+        with fcol2:
+            status = st.selectbox("Status", ["All", "Active", "Inactive"], key="users_status")
+        with fcol3:
+            last_login = st.selectbox("Last Login", list(LAST_LOGIN_FILTERS), key="users_last_login")
+        with fcol4:
+            sort = st.selectbox("Sort by", list(USER_SORTS), key="users_sort")
+        with fcol5:
+            page_size = st.selectbox("Per page", [25, 50, 100], key="users_page_size")
+
+        # Changing any filter starts again from the first page
+        filters = (search, status, last_login, sort, page_size)
+        if st.session_state.get('users_filters') != filters:
+            st.session_state.users_filters = filters
+            st.session_state.users_page = 0
+            st.session_state.users_grid_version = st.session_state.get('users_grid_version', 0) + 1
+
+        readers, total = fetch_current_users_page(supabase, search, status, last_login, sort, page_size)
+
         # Display users table with actions
         st.subheader("User List")
 
-        for reader in readers:
-            with st.container():
-                col1, col2, col3, col4, col5 = st.columns([2, 2, 2, 1, 1])
-
-                with col1:
-                    st.write(f"**{reader['reader_name']}**")
-                    st.write(f"Username: `{reader['username']}`")
-
-                with col2:
-                    st.write(f"ID: `{reader['reader_id']}`")
-                    st.write(f"Created: {reader['created_at'][:10]}")
-
-                with col3:
-                    status = "🟢 Active" if reader['is_active'] else "🔴 Inactive"
-                    st.write(f"Status: {status}")
-                    if reader['last_login']:
-                        st.write(f"Last Login: {reader['last_login'][:16]}")
-                    else:
-                        st.write("Last Login: Never")
-
-                with col4:
-                    # Toggle active status
-                    if reader['is_active']:
-                        if st.button("🚫 Deactivate", key=f"deactivate_{reader['reader_id']}"):
-                            deactivate_user(supabase, reader['reader_id'])
-                            st.rerun()
-                    else:
-                        if st.button("✅ Activate", key=f"activate_{reader['reader_id']}"):
-                            activate_user(supabase, reader['reader_id'])
-                            st.rerun()
-
-                with col5:
-                    # Delete user button
-                    if st.button("🗑️ Delete", key=f"delete_{reader['reader_id']}"):
-                        if delete_user(supabase, reader['reader_id']):
-                            st.success(f"User {reader['username']} deleted successfully!")
-                            st.rerun()
-
-                st.markdown("---")
+        if not total or not readers:
+            st.info("No users found in the system." if not any([search, status != "All", last_login != "Any"])
+                    else "No users match the current filters.")
+            return
+
+        df = pd.DataFrame(readers)
+        df.insert(0, 'select', False)
+        df['created_at'] = pd.to_datetime(df['created_at']).dt.strftime('%Y-%m-%d %H:%M')
+        df['last_login'] = pd.to_datetime(df['last_login']).dt.strftime('%Y-%m-%d %H:%M').fillna('Never')
+
+        edited = st.data_editor(
+            df,
+            key=f"users_grid_{st.session_state.users_grid_version}_{st.session_state.users_page}",
+            hide_index=True,
+            use_container_width=True,
+            disabled=[c for c in df.columns if c != 'select'],
+            column_config={
+                'select': st.column_config.CheckboxColumn("✔", width="small"),
+                'reader_id': "ID",
+                'username': "Username",
+                'reader_name': "Name",
+                'is_active': st.column_config.CheckboxColumn("Active"),
+                'created_at': "Created",
+                'last_login': "Last Login",
+            },
+        )
+        selected = edited.loc[edited['select'], 'reader_id'].tolist()
+
+        # Pager
+        pages = max(1, -(-total // page_size))
+        pcol1, pcol2, pcol3 = st.columns([1, 2, 1])
+        with pcol1:
+            if st.button("← Previous", disabled=st.session_state.users_page == 0, key="users_prev"):
+                st.session_state.users_page -= 1
+                st.rerun()
+        with pcol2:
+            st.write(f"Page {st.session_state.users_page + 1} of {pages} ({total} users)")
+        with pcol3:
+            if st.button("Next →", disabled=st.session_state.users_page >= pages - 1, key="users_next"):
+                st.session_state.users_page += 1
+                st.rerun()
+
+        st.markdown("---")
+
+        # Bulk actions: one request for the whole selection
+        st.write(f"**{len(selected)} selected**")
+        bcol1, bcol2, bcol3 = st.columns(3)
+        with bcol1:
+            if st.button("✅ Activate", disabled=not selected, use_container_width=True, key="bulk_activate"):
+                if set_users_active(supabase, selected, True):
+                    clear_user_selection()
+                    st.rerun()
+        with bcol2:
+            if st.button("🚫 Deactivate", disabled=not selected, use_container_width=True, key="bulk_deactivate"):
+                if set_users_active(supabase, selected, False):
+                    clear_user_selection()
+                    st.rerun()
+        with bcol3:
+            if st.button("🗑️ Delete", disabled=not selected, use_container_width=True, key="bulk_delete"):
+                st.session_state.confirm_bulk_delete = selected
+
+        # Confirmation dialog
+        pending = st.session_state.get('confirm_bulk_delete')
+        if pending:
+            st.warning(f"⚠️ Delete {len(pending)} user(s)? This action cannot be undone!")
+            ccol1, ccol2 = st.columns(2)
+            with ccol1:
+                if st.button("✅ Yes, Delete", type="primary", use_container_width=True, key="bulk_delete_yes"):
+                    st.session_state.confirm_bulk_delete = None
+                    if delete_users(supabase, pending):
+                        clear_user_selection()
+                        st.rerun()
+            with ccol2:
+                if st.button("❌ Cancel", use_container_width=True, key="bulk_delete_no"):
+                    st.session_state.confirm_bulk_delete = None
+                    st.rerun()
 
     except Exception as e:
         st.error(f"Error loading users: {e}")
 
 
+def clear_user_selection():
+    # A new grid key drops the checkbox edits of the old one
+    st.session_state.users_grid_version += 1
+
+
+def fetch_current_users_page(supabase, search, status, last_login, sort, page_size):
+    """fetch_users_page for users_page, moved back to the last page if the list shrank under it"""
+    page = st.session_state.users_page
+    try:
+        readers, total = fetch_users_page(supabase, search, status, last_login, sort, page, page_size)
+    except Exception:
+        if page == 0:
+            raise
+        # PostgREST answers a range past the end with 416, e.g. after a bulk delete
+        readers, total = [], None
+    if readers or page == 0:
+        return readers, total
+    if total is None:
+        _, total = fetch_users_page(supabase, search, status, last_login, sort, 0, 1)
+    st.session_state.users_page = min(page, max(-(-total // page_size) - 1, 0))
+    return fetch_users_page(supabase, search, status, last_login, sort, st.session_state.users_page, page_size)
+
+
+def fetch_users_page(supabase, search, status, last_login, sort, page, page_size):
+    """One page of readers matching the filters, plus the total match count"""
+    query = supabase.table("readers").select(
+        "reader_id, username, reader_name, is_active, created_at, last_login", count="exact"
+    )
+    if status != "All":
+        query = query.eq("is_active", status == "Active")
+    term = ''.join(ch for ch in search.strip() if ch not in ',()*%')
+    if term:
+        query = query.or_(f"reader_name.ilike.*{term}*,username.ilike.*{term}*")
+    since = LAST_LOGIN_FILTERS[last_login]
+    if since == "never":
+        query = query.is_("last_login", "null")
+    elif since is not None:
+        cutoff = (pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=since)).isoformat()
+        query = query.gte("last_login", cutoff)
+    column, desc = USER_SORTS[sort]
+    query = query.order(column, desc=desc)
+
+    start = page * page_size
+    response = query.range(start, start + page_size - 1).execute()
+    return response.data or [], response.count or 0
+
+
 def add_user_tab(supabase):
     st.header("➕ Add New User")
 
@@ -181,357 +355,834 @@ def add_user_tab(supabase):
             st.rerun()
 
 
+def bulk_import_section(supabase):
+    st.markdown("---")
+    st.subheader("📥 Bulk Import from CSV")
+    st.markdown("Columns: `username`, `name`, `password` and optionally `active` (true/false). "
+                "All rows are validated before anything is written.")
+
+    uploaded = st.file_uploader("Reader CSV", type=["csv"], key="bulk_import_file")
+    if uploaded is None:
+        return
+
+    try:
+        raw = pd.read_csv(uploaded, dtype=str, keep_default_na=False)
+    except Exception as e:
+        st.error(f"❌ Could not read CSV: {e}")
+        return
+
+    rows, problems = validate_import_rows(raw)
+    if problems:
+        st.error(f"❌ {len(problems)} row(s) failed validation, nothing was imported")
+        st.dataframe(pd.DataFrame(problems), use_container_width=True, hide_index=True)
+        return
+
+    st.write(f"**{len(rows)} valid row(s)** ready to import")
+    if st.button("👥 Import Readers", type="primary", key="bulk_import_btn"):
+        with st.spinner("Importing readers..."):
+            report = bulk_create_users(supabase, rows)
+        created = sum(1 for r in report if r['status'] == "created")
+        st.success(f"✅ {created} of {len(report)} reader(s) created")
+        report_df = pd.DataFrame(report)
+        st.dataframe(report_df, use_container_width=True, hide_index=True)
+        st.download_button("📥 Download Import Report", report_df.to_csv(index=False),
+                           file_name="reader_import_report.csv", mime="text/csv", key="bulk_import_report")
+
+
+def validate_import_rows(raw):
+    """Check every row locally, returns (valid rows, problems)"""
+    columns = {c.strip().lower(): c for c in raw.columns}
+    name_column = columns.get('name') or columns.get('reader_name')
+    missing = [c for c, present in (("username", 'username' in columns), ("name", name_column),
+                                    ("password", 'password' in columns)) if not present]
+    if missing:
+        return [], [{'row': 0, 'username': "", 'message': f"Missing column(s): {', '.join(missing)}"}]
+
+    rows, problems, seen = [], [], set()
+    for number, record in enumerate(raw.to_dict("records"), start=2):  # row 1 is the header
+        username = record[columns['username']].strip()
+        reader_name = record[name_column].strip()
+        password = record[columns['password']]
+        active = record[columns['active']] if 'active' in columns else ""
+
+        errors = []
+        if not username or not reader_name or not password:
+            errors.append("username, name and password are required")
+        if len(password) < 4:
+            errors.append("password must be at least 4 characters long")
+        if username in seen:
+            errors.append("duplicate username in file")
+        if str(active).strip().lower() not in ACTIVE_VALUES:
+            errors.append(f"active must be one of true/false/yes/no/1/0, got '{active}'")
+        seen.add(username)
+
+        if errors:
+            problems.append({'row': number, 'username': username, 'message': "; ".join(errors)})
+        else:
+            rows.append({
+                'row': number,
+                'username': username,
+                'reader_name': reader_name,
+                'password': password,
+                'is_active': ACTIVE_VALUES[str(active).strip().lower()],
+            })
+    return rows, problems
+
+
+def bulk_create_users(supabase, rows):
+    """Insert validated rows in chunks, returns one report entry per row"""
+    report = {r['username']: {'row': r['row'], 'username': r['username'], 'reader_id': "",
+                              'status': "skipped", 'message': ""} for r in rows}
+
+    # One set-based lookup for every username already taken
+    try:
+        taken = supabase.table("readers").select("username").in_(
+            "username", [r['username'] for r in rows]
+        ).execute().data or []
+    except Exception as e:
+        st.error(f"❌ Error checking usernames: {e}")
+        return list(report.values())
+    for r in taken:
+        report[r['username']]['message'] = "username already exists"
+    rows = [r for r in rows if not report[r['username']]['message']]
+
+    # Hashing is the slow part; it runs in parallel on the auth pool
+    created_by = st.session_state.get('reader_id', 'admin')
+    hashes = hash_passwords([r['password'] for r in rows])
+    records = [{
+        "username": r['username'],
+        "reader_name": r['reader_name'],
+        "password_hash": password_hash,
+        "is_active": r['is_active'],
+        "created_by": created_by
+    } for r, password_hash in zip(rows, hashes)]
+
+    for start in range(0, len(records), IMPORT_CHUNK_SIZE):
+        chunk = records[start:start + IMPORT_CHUNK_SIZE]
+        try:
+            inserted = supabase.table("readers").insert(chunk).execute().data or []
+        except Exception:
+            # A chunk fails as a whole; retry its rows one by one to pin down the culprit
+            inserted = []
+            for record in chunk:
+                try:
+                    inserted += supabase.table("readers").insert(record).execute().data or []
+                except Exception as row_error:
+                    report[record['username']]['message'] = (
+                        "username already exists" if is_unique_violation(row_error) else str(row_error))
+        for r in inserted:
+            entry = report[r['username']]
+            entry['reader_id'] = r.get('reader_id', "")
+            entry['status'] = "created"
+    return sorted(report.values(), key=lambda r: r['row'])
+
+
 def data_tab(supabase):
     st.header("📊 Assessment Data")
     st.markdown("View and download all assessment data from the system.")
 
+    feed = get_change_feed()
+    if 'admin_live_tables' not in st.session_state:
+        # Subscribe before the snapshot so no change falls between the two
+        st.session_state.admin_feed_subscriber = feed.subscribe() if feed is not None else None
+        st.session_state.admin_live_tables = {}
+        try:
+            st.session_state.admin_epochs = load_all_epochs(supabase)
+        except Exception as e:
+            st.warning(f"Could not load study epochs: {e}")
+            st.session_state.admin_epochs = {}
+
+    live = st.toggle("🔴 Live updates", value=feed is not None, disabled=feed is None, key="admin_live_updates")
+    if feed is not None and getattr(feed, "error", None):
+        st.warning(f"Change feed error: {feed.error}")
+
     # Create tabs for each assessment type
-    data_tab1, data_tab2, data_tab3 = st.tabs(
-        [" Classification Data", "Realistic Appearance Data", "Anatomic Correctness Data"])
+    tabs = dict(zip(DATA_TABLES, st.tabs([title for title, _, _ in DATA_TABLES.values()])))
+
+    refresh = LIVE_REFRESH_SECONDS if live else None
+    live_tables = st.session_state.admin_live_tables
+    epochs = st.session_state.admin_epochs
+
+    # Tables already held in memory render straight away
+    for table, tab in tabs.items():
+        if table in live_tables:
+            with tab:
+                live_table_fragment(supabase, table, refresh)
+
+    # Missing tables are fetched concurrently; each tab renders as soon as its own query returns
+    missing = [table for table in tabs if table not in live_tables]
+
+    def current_rounds_only(table, query):
+        # Rows below the global epoch are retired for everyone; per-reader epochs are applied locally
+        return query.gte("epoch", epochs.get(table, {}).get(GLOBAL_SCOPE, 0))
+
+    for table, rows, error in fetch_tables_concurrently(supabase, missing, timeout=FETCH_TIMEOUT_SECONDS,
+                                                         prepare=current_rounds_only):
+        with tabs[table]:
+            if error is not None:
+                st.error(f"Error loading {RESULT_TABLES[table].lower()} data: {error}")
+                if st.button("🔁 Retry", key=f"retry_{DATA_TABLES[table][1]}"):
+                    st.rerun()
+                continue
+            live_tables[table] = LiveTable(rows, epochs.get(table))
+            live_table_fragment(supabase, table, refresh)
 
-    with data_tab1:
-        display_classification_data(supabase)
+    st.markdown("---")
+    combined_report_section(live_tables)
 
-    with data_tab2:
-        display_realistic_appearance_data(supabase)
 
-    with data_tab3:
-        display_anatomic_correctness_data(supabase)
+@st.cache_data(show_spinner="Combining modules...", max_entries=4)
+def cached_combined_report(frames):
+    # Keyed by the three tables' contents, so it is rebuilt only after a change
+    return combined_report(frames)
 
 
-def display_classification_data(supabase):
-    st.subheader("Classification Data")
+def combined_report_section(live_tables):
+    st.subheader("🔗 Combined Report")
+    st.markdown("The ratings of all modules in one table, one row per reader and image. "
+                "The modules rate different images, so each row holds one module's columns.")
+    frames = {table: live_tables[table].to_frame() for table in DATA_TABLES if table in live_tables}
+    if not any(len(frame) for frame in frames.values()):
+        st.info("No assessment data found.")
+        return
 
     try:
-        # Get all classification data
-        response = supabase.table("classifications").select("*").execute()
-
-        if not response.data:
-            st.info("No classification data found.")
-            return
+        report = cached_combined_report(frames)
+    except Exception as e:
+        st.error(f"Error building combined report: {e}")
+        return
 
-        # Create DataFrame
-        df = pd.DataFrame(response.data)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Rows", len(report))
+    with col2:
+        st.metric("Readers", report["reader_id"].nunique())
+    with col3:
+        st.metric("Images", report["image_path"].nunique())
+
+    st.dataframe(report.head(COMBINED_PREVIEW_ROWS), use_container_width=True, hide_index=True)
+    if len(report) > COMBINED_PREVIEW_ROWS:
+        st.caption(f"Showing the first {COMBINED_PREVIEW_ROWS} of {len(report)} rows; the download has all of them.")
+    st.download_button(
+        label="📥 Download Combined Report",
+        data=report.to_csv(index=False),
+        file_name="combined_report.csv",
+        mime="text/csv",
+        key="download_combined_report"
+    )
 
-        # Format datetime
-        if 'created_at' in df.columns:
-            df['created_at'] = pd.to_datetime(df['created_at']).dt.strftime('%Y-%m-%d %H:%M:%S')
 
-        # Show statistics
-        col1, col2, col3= st.columns(3)
-        with col1:
-            st.metric("Total Records", len(df))
-        with col2:
-            unique_cases = df['case_id'].nunique() if 'case_id' in df.columns else 0
-            st.metric("Unique Cases", unique_cases)
-        with col3:
-            unique_readers = df['reader_id'].nunique() if 'reader_id' in df.columns else 0
-            st.metric("Unique Readers", unique_readers)
-        # with col4:
-        #     real_count = len(df[df['classification'] == 'Real']) if 'classification' in df.columns else 0
-        #     st.metric("Real Classifications", real_count)
+def live_table_fragment(supabase, table, refresh):
+    # Only this fragment reruns on each tick. An idle tick makes no request and reuses the
+    # formatted frame and CSV (LiveTable.derived); only the elements themselves are resent.
+    st.fragment(render_live_table, run_every=refresh)(supabase, table)
 
-        st.markdown("---")
 
-        # Display data
-        st.dataframe(df, use_container_width=True)
+def render_live_table(supabase, table):
+    touch_session()
+    if "admin_live_tables" not in st.session_state:
+        # Evicted while idle; the Data tab reloads on a full rerun
+        st.rerun()
+    subscriber = st.session_state.get("admin_feed_subscriber")
+    if subscriber is not None:
+        drain_into(subscriber, st.session_state.admin_live_tables)
+        if subscriber.overflowed:
+            # Events were dropped, so the copies are incomplete: fetch them again
+            drop_live_tables()
+            st.rerun()
+    display_assessment_data(supabase, table)
 
-        # Action buttons - only show if data exists
-        if response.data:
-            col1, col2, col3 = st.columns([1, 1, 1])
 
-            with col2:
-                # Download button
-                csv = df.to_csv(index=False)
-                st.download_button(
-                    label="📥 Download CSV",
-                    data=csv,
-                    file_name="classification_data.csv",
-                    mime="text/csv",
-                    use_container_width=True
-                )
+def drop_live_tables():
+    # The Data tab refetches its tables and resubscribes on the next full run
+    feed = get_change_feed()
+    subscriber = st.session_state.get("admin_feed_subscriber")
+    if feed is not None and subscriber is not None:
+        feed.unsubscribe(subscriber)
+    for key in ADMIN_DATA_KEYS:
+        if key in st.session_state:
+            del st.session_state[key]
 
-            with col3:
-                # Reset button with popup confirmation
-                if st.button("🗑️ Reset Data", type="secondary", use_container_width=True,
-                             key="reset_classification_btn"):
-                    st.session_state.show_reset_confirm_classification = True
-
-            # Confirmation dialog
-            if st.session_state.get('show_reset_confirm_classification', False):
-                st.markdown("---")
-                st.warning("⚠️ **Confirm Data Deletion**")
-                st.error("This will permanently delete ALL classification data. This action cannot be undone!")
-
-                col1, col2, col3 = st.columns([1, 1, 1])
-                with col2:
-                    if st.button("✅ YES, DELETE EVERYTHING", type="primary", use_container_width=True,
-                                 key="confirm_classification_delete"):
-                        if reset_classification_data(supabase):
-                            st.session_state.show_reset_confirm_classification = False
-                            st.rerun()
-
-                with col3:
-                    if st.button("❌ Cancel", use_container_width=True, key="cancel_classification_delete"):
-                        st.session_state.show_reset_confirm_classification = False
-                        st.rerun()
 
-    except Exception as e:
-        st.error(f"Error loading classification data: {e}")
+def display_frame(frame):
+    df = frame.copy()
+    # Format datetime
+    if 'created_at' in df.columns:
+        df['created_at'] = pd.to_datetime(df['created_at']).dt.strftime('%Y-%m-%d %H:%M:%S')
+    return df
 
 
-def display_realistic_appearance_data(supabase):
-    st.subheader(" Realistic Appearance Data")
+def display_assessment_data(supabase, table):
+    title, key, file_name = DATA_TABLES[table]
+    label = RESULT_TABLES[table].lower()
+    st.subheader(title)
 
+    live_table = st.session_state.admin_live_tables[table]
     try:
-        # Get all realistic appearance data
-        response = supabase.table("realistic_appearance").select("*").execute()
-
-        if not response.data:
-            st.info("No realistic appearance data found.")
+        if not live_table.total:
+            st.info(f"No {label} data found.")
             return
 
-        # Create DataFrame
-        df = pd.DataFrame(response.data)
-
-        # Format datetime
-        if 'created_at' in df.columns:
-            df['created_at'] = pd.to_datetime(df['created_at']).dt.strftime('%Y-%m-%d %H:%M:%S')
+        # Formatted once per change of the table, not on every tick
+        df = live_table.derived("display", display_frame)
 
-        # Show statistics
+        # Show statistics (maintained incrementally by the LiveTable)
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("Total Records", len(df))
+            st.metric("Total Records", live_table.total)
         with col2:
-            unique_cases = df['case_id'].nunique() if 'case_id' in df.columns else 0
-            st.metric("Unique Cases", unique_cases)
+            st.metric("Unique Cases", live_table.unique_cases)
         with col3:
-            unique_readers = df['reader_id'].nunique() if 'reader_id' in df.columns else 0
-            st.metric("Unique Readers", unique_readers)
+            st.metric("Unique Readers", live_table.unique_readers)
 
         st.markdown("---")
 
         # Display data
         st.dataframe(df, use_container_width=True)
 
-        # Action buttons - only show if data exists
-        if response.data:
-            col1, col2, col3 = st.columns([1, 1, 1])
+        agreement_section(table, live_table)
+        if TASKS[table].has_comment:
+            comment_search_section(table, live_table)
 
+        # Action buttons
+        col1, col2, col3 = st.columns([1, 1, 1])
+
+        with col2:
+            # Download button
+            csv = live_table.derived("csv", lambda _: df.to_csv(index=False))
+            st.download_button(
+                label="📥 Download CSV",
+                data=csv,
+                file_name=file_name,
+                mime="text/csv",
+                use_container_width=True,
+                key=f"download_{key}"
+            )
+
+        with col3:
+            # Reset button with popup confirmation
+            if st.button("🗑️ Reset Data", type="secondary", use_container_width=True, key=f"reset_{key}_btn"):
+                st.session_state[f"show_reset_confirm_{key}"] = True
+
+        # Confirmation dialog
+        if st.session_state.get(f"show_reset_confirm_{key}", False):
+            st.markdown("---")
+            st.warning("⚠️ **Confirm Data Reset**")
+            st.error(f"This will start a new study round and hide ALL current {label} data. "
+                     "Old rounds are kept until the archive job purges them.")
+
+            col1, col2, col3 = st.columns([1, 1, 1])
             with col2:
-                # Download button
-                csv = df.to_csv(index=False)
-                st.download_button(
-                    label="📥 Download CSV",
-                    data=csv,
-                    file_name="realistic_appearance_data.csv",
-                    mime="text/csv",
-                    use_container_width=True,
-                    key="download_realistic"
-                )
+                if st.button("✅ YES, RESET EVERYTHING", type="primary", use_container_width=True,
+                             key=f"confirm_{key}_delete"):
+                    new_epoch = reset_table_data(supabase, table)
+                    if new_epoch is not None:
+                        live_table.set_epoch(GLOBAL_SCOPE, new_epoch)
+                        st.session_state[f"show_reset_confirm_{key}"] = False
+                        st.rerun()
 
             with col3:
-                # Reset button with popup confirmation
-                if st.button("🗑️ Reset Data", type="secondary", use_container_width=True, key="reset_realistic_btn"):
-                    st.session_state.show_reset_confirm_realistic = True
-
-            # Confirmation dialog
-            if st.session_state.get('show_reset_confirm_realistic', False):
-                st.markdown("---")
-                st.warning("⚠️ **Confirm Data Deletion**")
-                st.error("This will permanently delete ALL realistic appearance data. This action cannot be undone!")
-
-                col1, col2, col3 = st.columns([1, 1, 1])
-                with col2:
-                    if st.button("✅ YES, DELETE EVERYTHING", type="primary", use_container_width=True,
-                                 key="confirm_realistic_delete"):
-                        if reset_realistic_appearance_data(supabase):
-                            st.session_state.show_reset_confirm_realistic = False
-                            st.rerun()
-
-                with col3:
-                    if st.button("❌ Cancel", use_container_width=True, key="cancel_realistic_delete"):
-                        st.session_state.show_reset_confirm_realistic = False
-                        st.rerun()
+                if st.button("❌ Cancel", use_container_width=True, key=f"cancel_{key}_delete"):
+                    st.session_state[f"show_reset_confirm_{key}"] = False
+                    st.rerun()
 
     except Exception as e:
-        st.error(f"Error loading realistic appearance data: {e}")
+        st.error(f"Error loading {label} data: {e}")
+
+
+def agreement_section(table, live_table):
+    # The matrix follows the LiveTable's deltas; statistics are recomputed only after a change
+    if 'admin_agreement' not in st.session_state:
+        st.session_state.admin_agreement = {}
+    matrix = st.session_state.admin_agreement.get(table)
+    if matrix is None or matrix.source is not live_table:
+        matrix = st.session_state.admin_agreement[table] = attach_agreement(live_table, TASKS[table])
+
+    task = TASKS[table]
+    with st.expander("🤝 Inter-reader agreement", expanded=False):
+        summary = matrix.summary()
+        if not summary["shared_cases"]:
+            st.info("Agreement needs cases rated by at least two readers.")
+            return
 
+        def fmt(value):
+            return "n/a" if value != value else f"{value:.3f}"
 
-def display_anatomic_correctness_data(supabase):
-    st.subheader(" Anatomic Correctness Data")
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Cases Read Twice or More", summary["shared_cases"])
+        with col2:
+            st.metric("Fleiss' κ", fmt(summary["fleiss_kappa"]))
+        with col3:
+            st.metric("Krippendorff's α (ordinal)" if task.ordinal else "Krippendorff's α", fmt(summary["alpha"]))
+        with col4:
+            st.metric("Mean Pairwise Weighted κ" if task.ordinal else "Mean Pairwise κ",
+                      fmt(summary["mean_pairwise_kappa"]))
+
+        st.markdown("**Per reader pair**" + (" (quadratic weights)" if task.ordinal else ""))
+        st.dataframe(matrix.pairwise().round(3), use_container_width=True, hide_index=True)
+
+
+def comment_search_section(table, live_table):
+    # Indexed once per LiveTable, then kept current by its deltas like the agreement matrix
+    if 'admin_comment_index' not in st.session_state:
+        st.session_state.admin_comment_index = {}
+    index = st.session_state.admin_comment_index.get(table)
+    if index is None or index.source is not live_table:
+        index = st.session_state.admin_comment_index[table] = attach_comment_index(live_table)
+
+    task = TASKS[table]
+    key = DATA_TABLES[table][1]
+    with st.expander(f"🔎 Search comments ({len(index)})", expanded=False):
+        st.caption('All words must occur; "quoted words" as a phrase; blur* matches any word starting with blur.')
+        col1, col2, col3 = st.columns([2, 1, 1])
+        with col1:
+            text = st.text_input("Search", placeholder='"streak artifact"', key=f"comment_search_{key}")
+        with col2:
+            readers = st.multiselect("Readers", sorted(live_table.reader_counts), key=f"comment_readers_{key}")
+        with col3:
+            cases = st.text_input("Case IDs", placeholder="e.g. 3, 17", key=f"comment_cases_{key}")
+        if not text.strip():
+            return
 
+        case_ids = [case.strip() for case in cases.split(",") if case.strip()]
+        hits = index.search(text, case_ids=case_ids, reader_ids=readers, limit=COMMENT_SEARCH_LIMIT)
+        if not hits:
+            st.info("No matching comments.")
+            return
+        results = pd.DataFrame([
+            {"score": round(score, 3), "case_id": hit[0], "reader_id": hit[1],
+             task.db_column: live_table.rows[hit].get(task.db_column), "comment": live_table.rows[hit].get("comment")}
+            for score, hit in hits
+        ])
+        if len(hits) == COMMENT_SEARCH_LIMIT:
+            st.caption(f"Showing the best {COMMENT_SEARCH_LIMIT} matches.")
+        st.dataframe(results, use_container_width=True, hide_index=True)
+
+
+def reset_table_data(supabase, table):
+    """Start a new study round for a result table, returns the new epoch"""
+    label = RESULT_TABLES[table].lower()
     try:
-        # Get all anatomic correctness data
-        response = supabase.table("anatomic_correctness").select("*").execute()
+        new_epoch = bump_epoch(supabase, table)
+        st.success(f"✅ All {label} data reset successfully!")
+        return new_epoch
+    except Exception as e:
+        st.error(f"❌ Error resetting {label} data: {e}")
+        return None
 
-        if not response.data:
-            st.info("No anatomic correctness data found.")
-            return
 
-        # Create DataFrame
-        df = pd.DataFrame(response.data)
+def activity_tab(supabase):
+    st.header("📈 Reader Activity")
+    st.markdown("Page views, time per case and saves, written in batches by the activity tracker.")
 
-        # Format datetime
-        if 'created_at' in df.columns:
-            df['created_at'] = pd.to_datetime(df['created_at']).dt.strftime('%Y-%m-%d %H:%M:%S')
+    try:
+        active, throughput = load_activity_summary(supabase)
+    except Exception as e:
+        st.error(f"Error loading activity: {e}")
+        return
+    tracker = get_activity_tracker()
+    pending = tracker.pending()
+    if pending:
+        st.caption(f"{pending} events from this process are still being written and are not counted yet; "
+                   f"they show up on the next refresh.")
+    if tracker.dropped:
+        st.warning(f"{tracker.dropped} activity events were dropped in this process while they could not be "
+                   f"written (last error: {tracker.error}).")
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Active Readers (5 min)", len(active))
+    with col2:
+        st.metric("Saves in Last Hour", sum(int(r.get('saves_last_hour') or 0) for r in throughput))
+    with col3:
+        st.metric("Saves Total", sum(int(r.get('saves_total') or 0) for r in throughput))
+
+    st.subheader("Currently Active")
+    if active:
+        st.dataframe(pd.DataFrame(active), use_container_width=True)
+    else:
+        st.info("No reader activity in the last 5 minutes.")
+
+    st.subheader("Throughput per Reader")
+    if throughput:
+        st.dataframe(pd.DataFrame(throughput), use_container_width=True)
+    else:
+        st.info("No saves recorded yet.")
+
+
+@st.cache_data(show_spinner="Bootstrapping confidence intervals...", max_entries=8)
+def cached_accuracy_report(results, task_key, replicates):
+    # Keyed by the ratings themselves, so it is recomputed only after they change
+    task = TASKS[task_key]
+    workers = int(st.secrets.get("BOOTSTRAP_WORKERS", os.cpu_count() or 1))
+    return accuracy_report(results, read_manifest(task.csv_path), task, replicates=replicates, workers=workers)
+
+
+def accuracy_tab():
+    st.header("🎯 Reader Accuracy")
+    st.markdown("Ratings compared with the ground truth labels of the manifest, with 95% bootstrap "
+                "confidence intervals per reader.")
+
+    live_tables = st.session_state.get('admin_live_tables', {})
+    for task in TASKS.values():
+        if not task.truth_column:
+            continue
+        st.subheader(task.title)
+        st.caption(f"Positive class: {task.positive_option}")
+        live_table = live_tables.get(task.key)
+        if live_table is None or not live_table.total:
+            st.info(f"No {task.noun} data found.")
+            continue
+
+        try:
+            results = live_table.to_frame()[["reader_id", "case_id", task.db_column]]
+            report = cached_accuracy_report(results, task.key, BOOTSTRAP_REPLICATES)
+        except Exception as e:
+            st.error(f"Error computing accuracy: {e}")
+            continue
+        if report.empty:
+            st.info("No rated case has a ground truth label yet.")
+            continue
 
-        # Show statistics
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("Total Records", len(df))
+            st.metric("Readers", len(report))
         with col2:
-            unique_cases = df['case_id'].nunique() if 'case_id' in df.columns else 0
-            st.metric("Unique Cases", unique_cases)
+            st.metric("Mean Accuracy", f"{report['accuracy'].mean():.3f}")
         with col3:
-            unique_readers = df['reader_id'].nunique() if 'reader_id' in df.columns else 0
-            st.metric("Unique Readers", unique_readers)
+            st.metric("Mean Balanced Accuracy", f"{report['balanced_accuracy'].mean():.3f}")
 
-        st.markdown("---")
+        st.dataframe(report.round(3), use_container_width=True, hide_index=True)
+        st.download_button(
+            label="📥 Download Accuracy CSV",
+            data=report.to_csv(index=False),
+            file_name=f"{task.key}_accuracy.csv",
+            mime="text/csv",
+            key=f"download_accuracy_{task.key}"
+        )
 
-        # Display data
-        st.dataframe(df, use_container_width=True)
-
-        # Action buttons - only show if data exists
-        if response.data:
-            col1, col2, col3 = st.columns([1, 1, 1])
 
-            with col2:
-                # Download button
-                csv = df.to_csv(index=False)
-                st.download_button(
-                    label="📥 Download CSV",
-                    data=csv,
-                    file_name="anatomic_correctness_data.csv",
-                    mime="text/csv",
-                    use_container_width=True,
-                    key="download_anatomic"
-                )
+def consensus_tab(supabase):
+    st.header("🧮 Per-Case Consensus")
+    st.markdown("Reads, rating histogram, mean/median score and majority per case, maintained by the "
+                "database on every save.")
 
-            with col3:
-                # Reset button with popup confirmation
-                if st.button("🗑️ Reset Data", type="secondary", use_container_width=True, key="reset_anatomic_btn"):
-                    st.session_state.show_reset_confirm_anatomic = True
-
-            # Confirmation dialog
-            if st.session_state.get('show_reset_confirm_anatomic', False):
-                st.markdown("---")
-                st.warning("⚠️ **Confirm Data Deletion**")
-                st.error("This will permanently delete ALL anatomic correctness data. This action cannot be undone!")
-
-                col1, col2, col3 = st.columns([1, 1, 1])
-                with col2:
-                    if st.button("✅ YES, DELETE EVERYTHING", type="primary", use_container_width=True,
-                                 key="confirm_anatomic_delete"):
-                        if reset_anatomic_correctness_data(supabase):
-                            st.session_state.show_reset_confirm_anatomic = False
-                            st.rerun()
-
-                with col3:
-                    if st.button("❌ Cancel", use_container_width=True, key="cancel_anatomic_delete"):
-                        st.session_state.show_reset_confirm_anatomic = False
-                        st.rerun()
+    table = st.selectbox("Module", list(TASKS), format_func=lambda key: TASKS[key].title, key="consensus_table")
+    task = TASKS[table]
 
+    try:
+        rows = load_consensus(supabase, table)
     except Exception as e:
-        st.error(f"Error loading anatomic correctness data: {e}")
+        st.error(f"Error loading consensus: {e}")
+        st.info("Make sure sql/007_case_consensus.sql has been applied")
+        return
+
+    if rows:
+        df = pd.DataFrame(rows)
+        histogram = pd.DataFrame(list(df["counts"])).reindex(columns=list(task.options)).fillna(0).astype(int)
+        columns = ["case_id", "n_reads"] + (["mean_score", "median_score"] if task.ordinal else []) + ["majority"]
+        df = pd.concat([df[columns], histogram], axis=1)
+        df = df.iloc[pd.to_numeric(df["case_id"], errors="coerce").argsort(kind="stable")]
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Cases Read", len(df))
+        with col2:
+            st.metric("Mean Reads per Case", f"{df['n_reads'].mean():.1f}")
+        with col3:
+            st.metric("Cases without Majority", int(df["majority"].isna().sum()))
+
+        st.dataframe(df, use_container_width=True, hide_index=True)
+        st.download_button(
+            label="📥 Download Consensus CSV",
+            data=df.to_csv(index=False),
+            file_name=f"{table}_consensus.csv",
+            mime="text/csv",
+            key=f"download_consensus_{table}"
+        )
+    else:
+        st.info(f"No {task.noun} data found.")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("🔍 Verify against ratings", use_container_width=True, key=f"verify_consensus_{table}"):
+            try:
+                differing = scale_mismatch(supabase, table)
+                mismatches = verify_consensus(supabase, table)
+            except Exception as e:
+                st.error(f"Error verifying consensus: {e}")
+            else:
+                if differing:
+                    st.error(f"The stored rating scale differs from tasks.py ({', '.join(differing)}); "
+                             "rebuild to apply it.")
+                if mismatches:
+                    st.error(f"{len(mismatches)} cases differ from a recomputation.")
+                    st.dataframe(pd.DataFrame(mismatches, columns=["case_id", "expected", "stored"]).astype(str),
+                                 use_container_width=True, hide_index=True)
+                elif not differing:
+                    st.success("Consensus matches the ratings.")
+    with col2:
+        if st.button("🔁 Rebuild from tasks.py and ratings", use_container_width=True, key=f"rebuild_consensus_{table}"):
+            try:
+                st.success(f"Rebuilt consensus for {rebuild_consensus(supabase, table)} cases.")
+            except Exception as e:
+                st.error(f"Error rebuilding consensus: {e}")
 
 
-def reset_classification_data(supabase):
-    """Delete all classification data"""
+def assignment_tab(supabase):
+    st.header("🗂️ Case Assignment")
+    st.markdown("By default every reader gets every case. A scheduled module hands each case to a set "
+                "number of readers instead: readers lease one case at a time, least covered first, and "
+                "leases not saved in time go back to the queue.")
+
+    table = st.selectbox("Module", list(TASKS), format_func=lambda key: TASKS[key].title, key="assignment_table")
+    task = TASKS[table]
     try:
-        supabase.table("classifications").delete().neq("case_id", "").execute()
-        st.success("✅ All classification data deleted successfully!")
-        return True
+        progress = scheduler.coverage(supabase).get(table)
+        quotas = scheduler.quotas(supabase, table)
     except Exception as e:
-        st.error(f"❌ Error deleting classification data: {e}")
-        return False
+        st.error(f"Error loading assignment: {e}")
+        st.info("Make sure sql/008_case_scheduler.sql has been applied")
+        return
 
+    if progress is None:
+        st.info(f"{task.title} is not scheduled: every reader gets all cases in manifest order.")
+    else:
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Cases", progress["cases"])
+        with col2:
+            st.metric("Reads Done", f"{progress['reads_done']} / {progress['reads_wanted']}")
+        with col3:
+            st.metric("Leased Now", progress["reads_leased"])
+        with col4:
+            st.metric("Cases Complete", progress["cases_complete"])
+
+    with st.form(f"schedule_{table}"):
+        reads = st.number_input("Readers per case", min_value=1, max_value=100, value=3, step=1)
+        submitted = st.form_submit_button("▶️ Schedule all manifest cases" if progress is None
+                                          else "🔁 Update readers per case")
+    if submitted:
+        try:
+            # The metrics above show the new queue after the rerun
+            scheduler.seed(supabase, table, read_manifest(task.csv_path)["CaseID"].astype(str).tolist(), reads)
+            st.rerun()
+        except Exception as e:
+            st.error(f"Error scheduling cases: {e}")
+
+    if progress is not None:
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("♻️ Reclaim expired leases", use_container_width=True, key=f"reclaim_{table}"):
+                try:
+                    st.success(f"Returned {scheduler.reclaim(supabase, table)} expired lease(s) to the queue.")
+                except Exception as e:
+                    st.error(f"Error reclaiming leases: {e}")
+        with col2:
+            if st.button("⏹️ Stop scheduling", use_container_width=True, key=f"stop_schedule_{table}"):
+                try:
+                    scheduler.stop(supabase, table)
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"Error stopping scheduling: {e}")
+
+    st.subheader("Quotas")
+    st.markdown("Most cases a reader may take on this module; `*` applies to every reader without their own.")
+    if quotas:
+        st.dataframe(pd.DataFrame(sorted(quotas.items()), columns=["reader_id", "quota"]),
+                     use_container_width=True, hide_index=True)
+    with st.form(f"quota_{table}"):
+        col1, col2 = st.columns(2)
+        with col1:
+            reader_id = st.text_input("Reader ID", value=scheduler.DEFAULT_QUOTA)
+        with col2:
+            quota = st.number_input("Quota (0 removes it)", min_value=0, value=0, step=1)
+        if st.form_submit_button("💾 Save quota"):
+            try:
+                scheduler.set_quota(supabase, table, reader_id.strip() or scheduler.DEFAULT_QUOTA, quota or None)
+                st.rerun()
+            except Exception as e:
+                st.error(f"Error saving quota: {e}")
+
+
+@st.cache_resource(max_entries=2)
+def analytics_connection(name, directory):
+    # One per snapshot; queries take their own cursor
+    return analytics.connect(directory)
+
+
+def query_tab(supabase):
+    st.header("🦆 Query")
+    st.markdown("SQL over a local snapshot of the result tables, study epochs and manifests "
+                "(DuckDB). Queries never touch the production database.")
+
+    missing = analytics.missing_packages()
+    if missing:
+        st.warning(f"The query engine needs `pip install {' '.join(missing)}`.")
+        return
+
+    latest = analytics.latest_snapshot()
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        if latest is None:
+            st.info("No snapshot yet.")
+        else:
+            taken = pd.to_datetime(latest[0], format="%Y%m%dT%H%M%S%fZ", utc=True)
+            st.caption(f"Snapshot taken {taken:%Y-%m-%d %H:%M:%S} UTC")
+    with col2:
+        if st.button("📸 Take snapshot", use_container_width=True, key="analytics_snapshot"):
+            try:
+                with st.spinner("Copying tables..."):
+                    counts = analytics.snapshot(supabase)
+            except Exception as e:
+                st.error(f"Error taking snapshot: {e}")
+            else:
+                st.session_state.pop("admin_query_result", None)
+                st.success(f"Snapshot written: {sum(counts[table] for table in TASKS)} ratings.")
+                latest = analytics.latest_snapshot()
+    if latest is None:
+        return
 
-def reset_realistic_appearance_data(supabase):
-    """Delete all realistic appearance data"""
     try:
-        supabase.table("realistic_appearance").delete().neq("case_id", "").execute()
-        st.success("✅ All realistic appearance data deleted successfully!")
-        return True
+        connection = analytics_connection(*latest)
     except Exception as e:
-        st.error(f"❌ Error deleting realistic appearance data: {e}")
-        return False
+        st.error(f"Error opening snapshot: {e}")
+        return
+
+    with st.expander("Views"):
+        st.markdown("One view per table and manifest; `<table>_current` keeps only the rows of each "
+                    "reader's active epoch.")
+        st.dataframe(analytics.views(connection), use_container_width=True, hide_index=True)
+
+    with st.form("analytics_query"):
+        sql = st.text_area("SQL", height=150, key="analytics_sql",
+                           value="select reader_id, classification, count(*) as n\n"
+                                 "from classifications_current\ngroup by all\norder by all")
+        run = st.form_submit_button("▶️ Run")
+    if run:
+        try:
+            result, truncated, seconds = analytics.query(connection, sql)
+        except Exception as e:
+            st.error(f"Query failed: {e}")
+            st.session_state.pop("admin_query_result", None)
+        else:
+            st.session_state.admin_query_result = (result, truncated, seconds)
+
+    if "admin_query_result" in st.session_state:
+        result, truncated, seconds = st.session_state.admin_query_result
+        st.caption(f"{len(result)} rows in {seconds:.3f}s"
+                   + (f"; only the first {analytics.MAX_RESULT_ROWS} are kept" if truncated else ""))
+        st.dataframe(result, use_container_width=True, hide_index=True)
+        st.download_button(
+            label="📥 Download Result CSV",
+            data=result.to_csv(index=False),
+            file_name="query_result.csv",
+            mime="text/csv",
+            key="download_query_result"
+        )
+
+
+def sessions_tab():
+    st.header("🧠 Sessions")
+    monitor = get_session_monitor()
+    st.markdown(f"Memory held by each open session of this worker. Sessions idle for more than "
+                f"{monitor.idle_seconds / 60:g} minutes lose their loaded data and resume on their "
+                f"last case when the reader returns.")
 
+    col1, col2 = st.columns([3, 1])
+    with col2:
+        if st.button("🧹 Evict idle now", use_container_width=True):
+            st.success(f"Evicted {monitor.evict_idle()} idle session(s).")
 
-def reset_anatomic_correctness_data(supabase):
-    """Delete all anatomic correctness data"""
     try:
-        supabase.table("anatomic_correctness").delete().neq("case_id", "").execute()
-        st.success("✅ All anatomic correctness data deleted successfully!")
-        return True
+        rows = session_report()
+        process = process_summary()
     except Exception as e:
-        st.error(f"❌ Error deleting anatomic correctness data: {e}")
-        return False
+        st.error(f"Error measuring sessions: {e}")
+        return
+
+    with col1:
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("Open Sessions", len(rows))
+        c2.metric("Session State", f"{sum(row['total_mb'] for row in rows):.1f} MB")
+        c3.metric("Process Memory", "n/a" if process["rss_mb"] is None else f"{process['rss_mb']} MB")
+        c4.metric("Disk Image Cache", f"{process['image_cache_mb']} MB")
+
+    if rows:
+        st.dataframe(pd.DataFrame(rows[:SESSION_ROWS]), use_container_width=True, hide_index=True)
+    else:
+        st.info("No open sessions.")
+    st.caption("Figures are for this worker process only; with several workers each one holds its own "
+               "sessions. Resized images are cached once per process, not per session.")
 
 
 def create_new_user(supabase, username, reader_name, password, is_active=True):
     """Create a new reader user"""
     try:
-        # Check if username already exists
-        response = supabase.table("readers").select("username").eq("username", username).execute()
+        # Check if username already exists (single indexed lookup)
+        response = supabase.table("readers").select("reader_id").eq("username", username).limit(1).execute()
         if response.data:
             st.error(f"❌ Username '{username}' already exists")
             return False
 
-        # Generate reader ID
-        reader_id = f"reader_{len(supabase.table('readers').select('*').execute().data) + 1:03d}"
-
-        # Insert new user
-        response = supabase.table("readers").insert({
-            "reader_id": reader_id,
+        new_user = {
             "username": username,
             "reader_name": reader_name,
-            "password_hash": password,  # Plain text as requested
+            "password_hash": hash_password(password),  # Salted PBKDF2, see auth.py
             "is_active": is_active,
             "created_by": st.session_state.get('reader_id', 'admin')
-        }).execute()
-
-        return True
-
-    except Exception as e:
-        st.error(f"❌ Error creating user: {e}")
+        }
+
+        # reader_id is assigned by the reader_id_seq column default; a collision with a
+        # hand-made id just burns one sequence value, so retry a few times
+        for attempt in range(READER_ID_RETRIES):
+            try:
+                supabase.table("readers").insert(new_user).execute()
+                return True
+            except Exception as e:
+                if not is_unique_violation(e):
+                    raise
+                taken = supabase.table("readers").select("reader_id").eq("username", username).limit(1).execute()
+                if taken.data:
+                    # Another admin created the same username in the meantime
+                    st.error(f"❌ Username '{username}' already exists")
+                    return False
+
+        st.error("❌ Could not allocate a free reader ID, please try again")
         return False
 
-
-def deactivate_user(supabase, reader_id):
-    """Deactivate a user"""
-    try:
-        supabase.table("readers").update({
-            "is_active": False
-        }).eq("reader_id", reader_id).execute()
-        st.success("✅ User deactivated successfully!")
-        return True
     except Exception as e:
-        st.error(f"❌ Error deactivating user: {e}")
+        st.error(f"❌ Error creating user: {e}")
         return False
 
 
-def activate_user(supabase, reader_id):
-    """Activate a user"""
+def set_users_active(supabase, reader_ids, is_active):
+    """Activate or deactivate several users in one request"""
+    action = "activated" if is_active else "deactivated"
     try:
         supabase.table("readers").update({
-            "is_active": True
-        }).eq("reader_id", reader_id).execute()
-        st.success("✅ User activated successfully!")
+            "is_active": is_active
+        }).in_("reader_id", reader_ids).execute()
+        if not is_active:
+            # Stored logins of deactivated readers no longer restore
+            get_session_store().delete_readers(reader_ids)
+        st.success(f"✅ {len(reader_ids)} user(s) {action} successfully!")
         return True
     except Exception as e:
-        st.error(f"❌ Error activating user: {e}")
+        st.error(f"❌ Error updating users: {e}")
         return False
 
 
-def delete_user(supabase, reader_id):
-    """Delete a user"""
+def delete_users(supabase, reader_ids):
+    """Delete several users in one request"""
     try:
-        supabase.table("readers").delete().eq("reader_id", reader_id).execute()
-        st.success("✅ User deleted successfully!")
+        supabase.table("readers").delete().in_("reader_id", reader_ids).execute()
+        get_session_store().delete_readers(reader_ids)
+        st.success(f"✅ {len(reader_ids)} user(s) deleted successfully!")
         return True
     except Exception as e:
-        st.error(f"❌ Error deleting user: {e}")
+        st.error(f"❌ Error deleting users: {e}")
         return False
 
 
@@ -0,0 +1,7 @@
+# pages/Evaluation.py
+# Generic page for tasks defined in tasks.py without a page of their own
+from task_engine import render_task
+
+
+if __name__ == "__main__":
+    render_task()
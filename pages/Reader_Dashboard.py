@@ -1,5 +1,8 @@
 # pages/Reader_Dashboard.py
 import streamlit as st
+from activity import track_page_view
+from session_store import restore_session, end_session
+from tasks import TASKS, open_task
 #new
 
 
@@ -22,6 +25,7 @@ def reader_dashboard():
     """, unsafe_allow_html=True)
 
     # Check authentication and ensure user is NOT admin
+    restore_session()
     if not st.session_state.get('authenticated', False):
         st.warning("Please log in to access the application")
         st.switch_page("pages/login.py")
@@ -31,6 +35,8 @@ def reader_dashboard():
         st.switch_page("pages/Admin_Dashboard.py")
         return
 
+    track_page_view("reader_dashboard")
+
     # Header with user info and logout button
     col1, col2 = st.columns([3, 1])
     with col1:
@@ -41,6 +47,7 @@ def reader_dashboard():
         st.markdown(f"**👤 Logged in as:**  **{st.session_state.reader_name}**")
         if st.button("🚪 Logout", use_container_width=True):
             # Clear all session state
+            end_session()
             for key in list(st.session_state.keys()):
                 del st.session_state[key]
             st.rerun()
@@ -48,34 +55,23 @@ def reader_dashboard():
 
     st.markdown("---")
 
-    # Center the module buttons
-    col1, col2, col3 = st.columns(3)
-
-    with col1:
-        if st.button("🎯 Classification\n\nReal vs Synthetic", use_container_width=True,
-                     help="Determine if images are real or synthetically generated"):
-            st.switch_page("pages/Classification.py")
-
-    with col2:
-        if st.button("🖼️ Realistic Appearance\n\nImage Quality Assessment", use_container_width=True,
-                     help="Assess the visual quality and realism of CT images"):
-            st.switch_page("pages/Realistic_Appearance.py")
-
-    with col3:
-        if st.button("🔍 Anatomic Correctness\n\nStructural Accuracy", use_container_width=True,
-                     help="Evaluate the anatomical accuracy and structural integrity"):
-            st.switch_page("pages/Anatomic_Correctness.py")
+    # One button per evaluation task
+    task_cols = st.columns(len(TASKS))
+    for col, task in zip(task_cols, TASKS.values()):
+        with col:
+            if st.button(f"{task.icon} {task.nav_label}\n\n{task.subtitle}", use_container_width=True,
+                         help=task.description):
+                open_task(task.key)
 
     # Additional information
     st.markdown("---")
-    st.markdown("""
+    modules = "\n".join(f"    - **{task.icon} {task.nav_label}**: {task.description}" for task in TASKS.values())
+    st.markdown(f"""
     ### About This Tool
 
-    This platform provides comprehensive evaluation of medical images through three specialized modules:
+    This platform provides comprehensive evaluation of medical images through {len(TASKS)} specialized modules:
 
-    - **🎯 Classification**: Determine if images are real or synthetically generated
-    - **🖼️ Realistic Appearance**: Assess the visual quality and realism of CT images  
-    - **🔍 Anatomic Correctness**: Evaluate the anatomical accuracy and structural integrity
+{modules}
 
     Select a module above to begin your evaluation.
     """)
@@ -1,6 +1,9 @@
 # pages/login.py
 import streamlit as st
 from utils import init_supabase
+from auth import resolve_principal, verify_password_async, record_login_async
+from session_store import restore_session, start_session
+from tasks import TASKS
 
 
 
@@ -90,9 +93,10 @@ def login_page():
                 st.session_state.reader_name = user['reader_name']
                 st.session_state.username = username
                 st.session_state.is_admin = user.get('is_admin', False)
+                start_session()
 
-                # Update last login time
-                update_last_login(supabase, user['reader_id'])
+                # Update last login time in the background
+                record_login_async(supabase, user['reader_id'], user['is_admin'], user['password_hash'], password)
 
                 st.success(f"✅ Welcome, {user['reader_name']}!")
                 st.rerun()
@@ -103,32 +107,19 @@ def login_page():
 def authenticate_user(supabase, username, password):
     """Authenticate user against database"""
     try:
-        # First check if it's a reader
-        response = supabase.table("readers").select("*").eq("username", username).eq("is_active", True).execute()
-
-        if response.data and len(response.data) > 0:
-            reader = response.data[0]
-            # Simple password check (plain text comparison)
-            if reader['password_hash'] == password:
-                return {
-                    'reader_id': reader['reader_id'],
-                    'reader_name': reader['reader_name'],
-                    'is_admin': False
-                }
-
-        # Check if it's an admin user
-        response = supabase.table("admin_users").select("*").eq("username", username).execute()
-
-        if response.data and len(response.data) > 0:
-            admin = response.data[0]
-            # Simple password check (plain text comparison)
-            if admin['password_hash'] == password:
+        # Readers and admins come back from a single RPC, readers first
+        for principal in resolve_principal(supabase, username):
+            # Salted hash check runs on the auth pool rather than the script thread
+            if not verify_password_async(password, principal['password_hash']).result(timeout=10):
+                continue
+            if principal['is_admin']:
                 st.success("🔧 Admin privileges granted!")  # This is the new line
-                return {
-                    'reader_id': admin['admin_id'],
-                    'reader_name': f"Admin ({admin['username']})",
-                    'is_admin': True
-                }
+            return {
+                'reader_id': principal['principal_id'],
+                'reader_name': principal['display_name'],
+                'is_admin': principal['is_admin'],
+                'password_hash': principal['password_hash']
+            }
 
         return None
 
@@ -137,21 +128,17 @@ def authenticate_user(supabase, username, password):
         return None
 
 
-def update_last_login(supabase, user_id):
-    """Update last login timestamp"""
-    try:
-        supabase.table("readers").update({
-            "last_login": "now()"
-        }).eq("reader_id", user_id).execute()
-    except:
-        pass  # Silently fail if it's an admin user
-
-
 # Check if user is already authenticated - use get() to avoid KeyError
+restore_session()
 if st.session_state.get('authenticated', False):
     # Redirect based on user type
     if st.session_state.get('is_admin', False):
         st.switch_page("pages/Admin_Dashboard.py")
+    elif (st.session_state.get('restore_position') or (None,))[0] in TASKS:
+        # Restored session: straight back to the module the reader was working in
+        module = st.session_state.restore_position[0]
+        st.session_state.active_task = module
+        st.switch_page(TASKS[module].page)
     else:
         st.switch_page("pages/Reader_Dashboard.py")
 else:
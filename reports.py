@@ -0,0 +1,46 @@
+# reports.py
+# Cross-module report: the ratings of every module in one table, one row per (reader,
+# image). The modules' manifests share no images, so this is a union, not a join: each
+# row carries the columns of the one module that showed the image and blanks elsewhere.
+#
+# Each result table is projected to its own columns, indexed by (reader_id,
+# image_path) and the three are stacked by a single outer concat on that index. Case
+# ids are per module, so each module keeps its own case_id column.
+import pandas as pd
+
+from tasks import TASKS
+
+REPORT_KEY = ["reader_id", "image_path"]
+
+
+def module_columns(task):
+    """Report column for each result table column of one module"""
+    columns = {"case_id": f"{task.key}_case_id", task.db_column: task.key}
+    if task.has_comment:
+        columns["comment"] = f"{task.key}_comment"
+    columns["created_at"] = f"{task.key}_at"
+    return columns
+
+
+def module_frame(task, rows):
+    """One module's ratings indexed by reader and image, its columns renamed for the report"""
+    columns = module_columns(task)
+    frame = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(list(rows))
+    frame = frame.reindex(columns=REPORT_KEY + list(columns))
+    frame["reader_id"] = frame["reader_id"].astype(str)
+    frame["image_path"] = frame["image_path"].astype(str).str.strip()
+    frame = frame.rename(columns=columns).set_index(REPORT_KEY)
+    # One rating per reader and image; a re-rated image keeps its latest row
+    if frame.index.has_duplicates:
+        frame = frame.sort_values(f"{task.key}_at", kind="stable")
+    return frame[~frame.index.duplicated(keep="last")]
+
+
+def combined_report(tables):
+    """{table: rows or DataFrame} -> DataFrame with one row per (reader_id, image_path)"""
+    frames = [module_frame(TASKS[table], rows) for table, rows in tables.items() if table in TASKS]
+    if not frames:
+        return pd.DataFrame(columns=REPORT_KEY)
+    report = pd.concat(frames, axis=1, join="outer", sort=False)
+    report.index.names = REPORT_KEY
+    return report.sort_index().reset_index()
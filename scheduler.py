@@ -0,0 +1,89 @@
+# scheduler.py
+# Coverage-balanced case assignment (sql/008_case_scheduler.sql).
+#
+# By default every reader gets every case of a task in manifest order. Once an admin
+# seeds a task's queue with k reads per case, readers lease cases from it instead:
+# the database hands out the least covered case the reader has not had yet, reclaims
+# leases that expire before a save, and stops at the reader's quota. A reader's case
+# list is the cases they have leased, in lease order; each save on the last one
+# leases the next.
+import streamlit as st
+
+from tasks import TASKS
+
+QUEUE_TABLE = "case_queue"
+LEASES_TABLE = "case_leases"
+QUOTAS_TABLE = "case_quotas"
+COVERAGE_VIEW = "case_coverage"
+DEFAULT_QUOTA = "*"
+
+LEASE_MINUTES = 30
+
+
+def lease_seconds():
+    return int(float(st.secrets.get("SCHEDULE_LEASE_MINUTES", LEASE_MINUTES)) * 60)
+
+
+def is_scheduled(supabase, table):
+    """True if the table's cases are handed out from a queue"""
+    try:
+        response = supabase.table(QUEUE_TABLE).select("case_id").eq("table_name", table).limit(1).execute()
+    except Exception:
+        # Migration 008 not applied: nothing is scheduled
+        return False
+    return bool(response.data)
+
+
+def lease_cases(supabase, table, reader_id, count=1):
+    """Case ids of the reader's open leases after topping them up to `count`, oldest first"""
+    response = supabase.rpc("lease_cases", {
+        "p_table": table, "p_reader": str(reader_id), "p_count": count, "p_lease_seconds": lease_seconds(),
+    }).execute()
+    return [str(row["case_id"]) for row in response.data or []]
+
+
+def assigned_cases(supabase, table, reader_id):
+    """Every case the reader has leased on the table, saved or not, in lease order"""
+    response = supabase.table(LEASES_TABLE).select("case_id, leased_at").eq("table_name", table).eq(
+        "reader_id", str(reader_id)).order("leased_at").order("case_id").execute()
+    return [str(row["case_id"]) for row in response.data or []]
+
+
+def seed(supabase, table, case_ids, reads_per_case):
+    """Schedule a table: its queue becomes `case_ids`, each wanting `reads_per_case` readers"""
+    response = supabase.rpc("seed_case_queue", {
+        "p_table": table, "p_cases": [str(case_id) for case_id in case_ids], "p_reads": int(reads_per_case),
+    }).execute()
+    return int(response.data or 0)
+
+
+def stop(supabase, table):
+    """Hand out the whole manifest again; drops the table's queue and leases"""
+    return seed(supabase, table, [], 0)
+
+
+def reclaim(supabase, table=None):
+    """Return every expired lease to the queue now (hand-out also does this in small batches)"""
+    response = supabase.rpc("reclaim_expired_leases", {"p_table": table}).execute()
+    return int(response.data or 0)
+
+
+def coverage(supabase):
+    """{table: coverage row} of the scheduled tables"""
+    response = supabase.table(COVERAGE_VIEW).select("*").execute()
+    return {row["table_name"]: row for row in response.data or [] if row["table_name"] in TASKS}
+
+
+def quotas(supabase, table):
+    """{reader_id or '*': quota} of a table"""
+    response = supabase.table(QUOTAS_TABLE).select("reader_id, quota").eq("table_name", table).execute()
+    return {row["reader_id"]: int(row["quota"]) for row in response.data or []}
+
+
+def set_quota(supabase, table, reader_id, quota):
+    """Cap the cases a reader (or '*': everyone without their own) may lease; None removes the cap"""
+    if quota is None:
+        supabase.table(QUOTAS_TABLE).delete().eq("table_name", table).eq("reader_id", str(reader_id)).execute()
+    else:
+        supabase.table(QUOTAS_TABLE).upsert(
+            {"table_name": table, "reader_id": str(reader_id), "quota": int(quota)}).execute()
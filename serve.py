@@ -0,0 +1,83 @@
+# serve.py
+# Run several Streamlit workers for a load balancer.
+#
+# Routing must be sticky: each browser stays on one worker (the ct_route cookie in
+# deploy/nginx.conf). A tab's st.session_state, its uploads (/_stcore/upload_file)
+# and its st.download_button files (/media/) exist only in the worker holding the
+# tab's websocket, and those requests 404 on any other worker.
+#
+# Stickiness is needed for routing only, not for recovery: logins and positions are
+# in the shared session database (session_store), results are read back from the
+# database, and images come from the shared disk cache under static/. When a worker
+# dies, its browsers move to another worker and are restored from there.
+#
+#   python serve.py --workers 4 --base-port 8601
+import argparse
+import os
+import secrets
+import signal
+import subprocess
+import sys
+import time
+
+RESTART_DELAY_SECONDS = 2
+
+
+def start_worker(port, cookie_secret, entry="main.py", warm_up=False):
+    # With warm-up the worker fills its caches first and only then binds the port
+    launcher = ["warmup.py"] if warm_up else ["-m", "streamlit"]
+    command = [
+        sys.executable, *launcher, "run", entry,
+        "--server.port", str(port),
+        "--server.headless", "true",
+        # Serves the shared image cache
+        "--server.enableStaticServing", "true",
+    ]
+    # XSRF cookies must validate on whichever worker receives the request
+    env = dict(os.environ, STREAMLIT_SERVER_COOKIE_SECRET=cookie_secret)
+    return subprocess.Popen(command, env=env)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Streamlit workers for a load balancer")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="number of worker processes (default: one per core)")
+    parser.add_argument("--base-port", type=int, default=8601)
+    parser.add_argument("--entry", default="main.py")
+    parser.add_argument("--warm-up", action="store_true",
+                        help="preload modules, manifests and images before each worker accepts traffic")
+    args = parser.parse_args()
+
+    cookie_secret = os.environ.get("STREAMLIT_SERVER_COOKIE_SECRET") or secrets.token_urlsafe(32)
+    ports = [args.base_port + i for i in range(args.workers)]
+    workers = {port: start_worker(port, cookie_secret, args.entry, args.warm_up) for port in ports}
+    print("upstream workers: " + ", ".join(f"127.0.0.1:{port}" for port in ports), flush=True)
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    # Restart crashed workers; readers on them reconnect to another one and are restored
+    while not stopping:
+        time.sleep(RESTART_DELAY_SECONDS)
+        for port, process in list(workers.items()):
+            if process.poll() is not None and not stopping:
+                print(f"worker on port {port} exited with {process.returncode}, restarting", flush=True)
+                workers[port] = start_worker(port, cookie_secret, args.entry, args.warm_up)
+
+    for process in workers.values():
+        process.terminate()
+    for process in workers.values():
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+# session_monitor.py
+# Per-session memory accounting and idle eviction for this worker process.
+#
+# Streamlit keeps a session's state until it drops the session, so a reader who
+# just closes the tab leaves their manifest copy and result columns (and an admin
+# their live tables and change feed subscription) behind. Every run touches the
+# session here; a background sweep evicts the heavy state of sessions idle for
+# longer than SESSION_IDLE_MINUTES (secret, default 20) and keeps identity, task
+# and position, so a returning reader resumes on the same case after one reload
+# of their results.
+import os
+import sys
+import threading
+import time
+import weakref
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+IDLE_MINUTES = 20
+SWEEP_INTERVAL_SECONDS = 60
+
+# Session state keys that belong to the admin Data tab
+ADMIN_DATA_KEYS = ("admin_live_tables", "admin_epochs", "admin_feed_subscriber", "admin_agreement",
+                   "admin_comment_index", "admin_query_result")
+
+# Widget keys of the rating inputs, one per case visited (see task_engine)
+WIDGET_MARKERS = ("_radio_", "_comment_")
+
+# Containers deeper than this are not followed when sizing state
+MAX_SIZE_DEPTH = 6
+
+
+class SessionMonitor:
+    """Registry of this process's sessions, swept for idle ones by a daemon thread"""
+
+    def __init__(self, idle_seconds, sweep_interval=SWEEP_INTERVAL_SECONDS):
+        self.idle_seconds = idle_seconds
+        self.sessions = {}
+        # Held while a session is evicted and on every touch, so a run never sees half-evicted state
+        self.lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, args=(sweep_interval,),
+                                        name="session-monitor", daemon=True)
+        self._thread.start()
+
+    def _run(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.evict_idle()
+            except Exception as e:
+                print(f"session monitor: sweep failed: {e}", file=sys.stderr)
+
+    def touch(self, session_id, state):
+        with self.lock:
+            entry = self.sessions.get(session_id)
+            if entry is None or entry["state"]() is None:
+                entry = self.sessions[session_id] = {"state": weakref.ref(state), "evicted_at": None}
+            entry["last_active"] = time.time()
+            entry["evicted_at"] = None
+            entry["reader_id"] = state["reader_id"] if "reader_id" in state else None
+            entry["reader_name"] = state["reader_name"] if "reader_name" in state else None
+            entry["is_admin"] = bool(state["is_admin"]) if "is_admin" in state else False
+            entry["module"] = state["active_task"] if "active_task" in state else None
+
+    def live_sessions(self):
+        """(session_id, entry, state) of sessions Streamlit still holds; dropped ones are forgotten"""
+        with self.lock:
+            result = []
+            for session_id, entry in list(self.sessions.items()):
+                state = entry["state"]()
+                if state is None:
+                    del self.sessions[session_id]
+                else:
+                    result.append((session_id, entry, state))
+            return result
+
+    def evict_idle(self, idle_seconds=None):
+        """Evict every session idle for longer than the timeout, returns how many were evicted"""
+        idle_seconds = self.idle_seconds if idle_seconds is None else idle_seconds
+        evicted = 0
+        for session_id, entry, state in self.live_sessions():
+            with self.lock:
+                # Re-checked under the lock: a run that started meanwhile has touched the entry
+                if entry["evicted_at"] is not None or time.time() - entry["last_active"] < idle_seconds:
+                    continue
+                evict_state(state)
+                entry["evicted_at"] = time.time()
+                evicted += 1
+        return evicted
+
+
+@st.cache_resource
+def get_session_monitor():
+    try:
+        idle_minutes = float(st.secrets.get("SESSION_IDLE_MINUTES", IDLE_MINUTES))
+    except Exception:
+        idle_minutes = IDLE_MINUTES
+    return SessionMonitor(idle_minutes * 60)
+
+
+def touch_session():
+    """Record activity of the running session; call at the start of every page and fragment run"""
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return
+    get_session_monitor().touch(ctx.session_id, ctx.session_state)
+
+
+def is_widget_key(key):
+    return any(marker in key for marker in WIDGET_MARKERS)
+
+
+def evict_state(state):
+    """Drop the heavy part of one session's state, keeping what resuming needs"""
+    keys = set(state.filtered_state)
+
+    # Reader: the reloaded task reopens the case on screen (see task_engine.render_task).
+    # Widget values stay: Streamlit already drops those of widgets no longer rendered.
+    df = state["df"] if "df" in keys else None
+    if df is not None:
+        try:
+            if "active_task" in keys and state["active_task"]:
+                index = state["current_index"] if "current_index" in keys else 0
+                # current_index is a position in the reader's case order (case_order.py)
+                order = state["case_order"] if "case_order" in keys else None
+                if order is not None and order[0][0] == state["active_task"]:
+                    index = int(order[1][index])
+                state["restore_position"] = (state["active_task"], str(df.iloc[index]["CaseID"]))
+        except Exception:
+            pass
+        state["df"] = None
+        state["data_loaded"] = False
+
+    # Admin: the Data tab refetches its tables and resubscribes when they are missing
+    if "admin_feed_subscriber" in keys and state["admin_feed_subscriber"] is not None:
+        from change_feed import get_change_feed
+        feed = get_change_feed()
+        if feed is not None:
+            feed.unsubscribe(state["admin_feed_subscriber"])
+    for key in ADMIN_DATA_KEYS:
+        if key in keys:
+            del state[key]
+
+
+def deep_size(value, seen=None, depth=0):
+    """Approximate bytes held by a value, shared objects counted once"""
+    seen = set() if seen is None else seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if hasattr(value, "memory_usage") and hasattr(value, "columns"):
+        return int(value.memory_usage(deep=True).sum())
+    if hasattr(value, "nbytes") and hasattr(value, "dtype"):
+        return int(value.nbytes)
+    size = sys.getsizeof(value)
+    if depth >= MAX_SIZE_DEPTH:
+        return size
+    if isinstance(value, dict):
+        size += sum(deep_size(k, seen, depth + 1) + deep_size(v, seen, depth + 1) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(deep_size(item, seen, depth + 1) for item in value)
+    elif hasattr(value, "__dict__"):
+        size += deep_size(vars(value), seen, depth + 1)
+    return size
+
+
+def dataframe_split(df, result_column_names):
+    """(manifest bytes, result bytes) of a task DataFrame"""
+    usage = df.memory_usage(deep=True)
+    results = int(sum(usage[column] for column in result_column_names if column in usage))
+    return int(usage.sum()) - results, results
+
+
+def session_media_bytes(session_id):
+    """Bytes of images Streamlit holds for the session (st.image copies), None if unknown"""
+    try:
+        # No public API for per-session media; this reads the media manager's index
+        from streamlit.runtime import Runtime
+        manager = Runtime.instance().media_file_mgr
+        storage = manager._storage
+        file_ids = manager._files_by_session_and_coord.get(session_id, {}).values()
+        return sum(storage.get_file(file_id).content_size for file_id in set(file_ids))
+    except Exception:
+        return None
+
+
+def session_footprint(session_id, state):
+    """Bytes per category of one session: manifest, results, widgets, admin, images, other"""
+    from tasks import TASKS
+    from task_engine import result_columns
+
+    footprint = {"manifest": 0, "results": 0, "widgets": 0, "admin": 0, "other": 0}
+    seen = set()
+    for key, value in state.filtered_state.items():
+        if key == "df" and value is not None:
+            task = TASKS.get(state["active_task"]) if "active_task" in state else None
+            columns = result_columns(task) if task is not None else []
+            manifest, results = dataframe_split(value, columns)
+            footprint["manifest"] += manifest
+            footprint["results"] += results
+            seen.add(id(value))
+        elif is_widget_key(key):
+            footprint["widgets"] += deep_size(value, seen)
+        elif key in ADMIN_DATA_KEYS:
+            footprint["admin"] += deep_size(value, seen)
+        else:
+            footprint["other"] += deep_size(value, seen)
+    footprint["images"] = session_media_bytes(session_id) or 0
+    return footprint
+
+
+def session_report():
+    """One row per live session of this process, largest first"""
+    now = time.time()
+    rows = []
+    for session_id, entry, state in get_session_monitor().live_sessions():
+        footprint = session_footprint(session_id, state)
+        rows.append({
+            "reader": entry["reader_name"] or entry["reader_id"] or "(not logged in)",
+            "role": "admin" if entry["is_admin"] else "reader",
+            "module": entry["module"] or "",
+            "idle_min": round((now - entry["last_active"]) / 60, 1),
+            "evicted": entry["evicted_at"] is not None,
+            "total_mb": round(sum(footprint.values()) / 2 ** 20, 3),
+            **{f"{category}_mb": round(size / 2 ** 20, 3) for category, size in footprint.items()},
+        })
+    return sorted(rows, key=lambda row: row["total_mb"], reverse=True)
+
+
+def process_summary():
+    """Resident memory of this process and the size of the shared disk image cache, in MB"""
+    from utils import IMAGE_CACHE_DIR
+
+    try:
+        with open("/proc/self/statm") as f:
+            rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        rss = None
+    image_cache = 0
+    if os.path.isdir(IMAGE_CACHE_DIR):
+        with os.scandir(IMAGE_CACHE_DIR) as entries:
+            image_cache = sum(entry.stat().st_size for entry in entries if entry.is_file())
+    return {
+        "rss_mb": None if rss is None else round(rss / 2 ** 20, 1),
+        "image_cache_mb": round(image_cache / 2 ** 20, 1),
+    }
@@ -0,0 +1,275 @@
+# session_store.py
+# Server-side login sessions that survive a browser refresh or a redeploy.
+#
+# The browser only holds a signed token (in the `sid` query parameter); identity,
+# module and position live in a small SQLite file so a returning reader is put
+# back where they were without logging in again or re-running the load path.
+#
+# A URL leaks (shared links, history, screenshots), so the token alone does not
+# restore a session: it must come from the browser it was issued to (the balancer's
+# HttpOnly route cookie and the user agent, see deploy/nginx.conf), within
+# SESSION_IDLE_SECONDS of the session's last use, and it is replaced by a fresh
+# token on every restore.
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import sqlite3
+import time
+
+import streamlit as st
+
+from auth import resolve_principal
+from session_monitor import touch_session
+
+SESSION_PARAM = "sid"
+SESSION_TTL_SECONDS = 12 * 60 * 60
+SESSION_IDLE_SECONDS = 30 * 60
+# An open tab slides the idle expiry at most this often
+TOUCH_INTERVAL_SECONDS = 60
+# HttpOnly cookie set by the balancer, never part of a URL
+CLIENT_COOKIE = "ct_route"
+
+
+class SessionStore:
+    """SQLite-backed session table, safe to share between processes on one host"""
+
+    def __init__(self, path, secret):
+        self.path = path
+        self.secret = secret
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id  TEXT PRIMARY KEY,
+                    reader_id   TEXT NOT NULL,
+                    reader_name TEXT,
+                    username    TEXT,
+                    is_admin    INTEGER NOT NULL DEFAULT 0,
+                    module      TEXT,
+                    case_id     TEXT,
+                    created_at  REAL NOT NULL,
+                    expires_at  REAL NOT NULL,
+                    client      TEXT
+                )
+            """)
+            # Session databases from before client binding; their sessions no longer restore
+            if "client" not in [column[1] for column in db.execute("PRAGMA table_info(sessions)")]:
+                db.execute("ALTER TABLE sessions ADD COLUMN client TEXT")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def _sign(self, session_id):
+        digest = hmac.new(self.secret.encode(), session_id.encode(), hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).decode().rstrip("=")
+
+    def _session_id(self, token):
+        session_id, _, signature = str(token or "").partition(".")
+        if not session_id or not hmac.compare_digest(signature, self._sign(session_id)):
+            return None
+        return session_id
+
+    def create(self, reader_id, reader_name, username, is_admin, client):
+        """Start a session bound to a client fingerprint, returns its signed token"""
+        session_id = secrets.token_urlsafe(24)
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO sessions (session_id, reader_id, reader_name, username, is_admin, created_at,"
+                " expires_at, client) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (session_id, str(reader_id), reader_name, username, int(bool(is_admin)), now,
+                 now + SESSION_IDLE_SECONDS, client),
+            )
+        return f"{session_id}.{self._sign(session_id)}"
+
+    def load(self, token, client):
+        """Session for a token, or None if the token is forged, unknown, expired or from another client"""
+        session_id = self._session_id(token)
+        if session_id is None:
+            return None
+        now = time.time()
+        with self._connect() as db:
+            db.row_factory = sqlite3.Row
+            row = db.execute("SELECT * FROM sessions WHERE session_id = ? AND expires_at > ? AND created_at > ?",
+                             (session_id, now, now - SESSION_TTL_SECONDS)).fetchone()
+        if row is None or not hmac.compare_digest(row["client"] or "", client):
+            return None
+        return dict(row)
+
+    def rotate(self, token):
+        """Move a session to a fresh token, the old one stops working; None if the session is gone"""
+        session_id = self._session_id(token)
+        if session_id is None:
+            return None
+        new_id = secrets.token_urlsafe(24)
+        with self._connect() as db:
+            moved = db.execute("UPDATE sessions SET session_id = ?, expires_at = ? WHERE session_id = ?",
+                               (new_id, time.time() + SESSION_IDLE_SECONDS, session_id)).rowcount
+        return f"{new_id}.{self._sign(new_id)}" if moved else None
+
+    def update(self, token, **fields):
+        """Store module/position and slide the idle expiry forward"""
+        session_id = self._session_id(token)
+        if session_id is None:
+            return
+        fields = {k: v for k, v in fields.items() if k in ("module", "case_id")}
+        assignments = "".join(f"{column} = ?, " for column in fields)
+        with self._connect() as db:
+            db.execute(f"UPDATE sessions SET {assignments}expires_at = ? WHERE session_id = ?",
+                       (*fields.values(), time.time() + SESSION_IDLE_SECONDS, session_id))
+
+    def delete(self, token):
+        session_id = self._session_id(token)
+        if session_id is None:
+            return
+        now = time.time()
+        with self._connect() as db:
+            db.execute("DELETE FROM sessions WHERE session_id = ? OR expires_at < ? OR created_at < ?",
+                       (session_id, now, now - SESSION_TTL_SECONDS))
+
+    def delete_readers(self, reader_ids):
+        """End every session of these readers, e.g. after they were deactivated or deleted"""
+        reader_ids = [str(reader_id) for reader_id in reader_ids]
+        if not reader_ids:
+            return
+        with self._connect() as db:
+            db.execute(f"DELETE FROM sessions WHERE is_admin = 0 AND reader_id IN ({', '.join('?' * len(reader_ids))})",
+                       reader_ids)
+
+
+@st.cache_resource
+def get_session_store():
+    path = st.secrets.get("SESSION_DB", ".sessions.db")
+    return SessionStore(path, st.secrets.get("SESSION_SECRET") or _local_secret(path))
+
+
+def _local_secret(db_path):
+    # Without a configured secret, one is generated next to the database and shared by all workers
+    secret_path = db_path + ".key"
+    if not os.path.exists(secret_path):
+        fd = os.open(secret_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(secrets.token_urlsafe(32))
+    with open(secret_path) as f:
+        return f.read().strip()
+
+
+def client_fingerprint():
+    """Hash of what the browser sends with every request but never puts in a URL"""
+    try:
+        cookie = st.context.cookies.get(CLIENT_COOKIE, "")
+        agent = st.context.headers.get("User-Agent", "")
+    except Exception:
+        cookie = agent = ""
+    return hashlib.sha256(f"{cookie}\n{agent}".encode()).hexdigest()
+
+
+def start_session():
+    """Persist the freshly logged in user and put the token in the URL"""
+    token = get_session_store().create(
+        st.session_state.reader_id,
+        st.session_state.reader_name,
+        st.session_state.username,
+        st.session_state.is_admin,
+        client_fingerprint(),
+    )
+    st.session_state.session_token = token
+    st.session_state["_session_touched"] = time.time()
+    st.query_params[SESSION_PARAM] = token
+
+
+def restore_session():
+    """Re-authenticate from the URL token if needed, returns the stored session or None"""
+    touch_session()
+    token = st.session_state.get("session_token") or st.query_params.get(SESSION_PARAM)
+    if not token:
+        return None
+    if st.session_state.get("authenticated", False):
+        # switch_page drops query parameters, so put the token back on every page
+        if st.query_params.get(SESSION_PARAM) != token:
+            st.query_params[SESSION_PARAM] = token
+        keep_session_alive(token)
+        return None
+
+    store = get_session_store()
+    stored = store.load(token, client_fingerprint())
+    if stored is not None:
+        try:
+            allowed = account_is_active(stored)
+        except Exception:
+            # Database unreachable: no restore now, the session is kept for later
+            return None
+        if not allowed:
+            store.delete(token)
+            stored = None
+        else:
+            # The token that came in the URL is spent
+            token = store.rotate(token)
+            if token is None:
+                stored = None
+    if stored is None:
+        st.query_params.pop(SESSION_PARAM, None)
+        return None
+
+    st.session_state.authenticated = True
+    st.session_state.reader_id = stored["reader_id"]
+    st.session_state.reader_name = stored["reader_name"]
+    st.session_state.username = stored["username"]
+    st.session_state.is_admin = bool(stored["is_admin"])
+    st.session_state.session_token = token
+    st.session_state["_session_touched"] = time.time()
+    st.query_params[SESSION_PARAM] = token
+    if stored["module"] and stored["case_id"]:
+        st.session_state.restore_position = (stored["module"], stored["case_id"])
+    return stored
+
+
+def keep_session_alive(token):
+    """Slide the idle expiry while the tab is in use, one write per TOUCH_INTERVAL_SECONDS"""
+    now = time.time()
+    if now - st.session_state.get("_session_touched", 0) < TOUCH_INTERVAL_SECONDS:
+        return
+    st.session_state["_session_touched"] = now
+    get_session_store().update(token)
+
+
+def account_is_active(stored):
+    """True while a stored session's account still exists and, for a reader, is active"""
+    from utils import init_supabase
+
+    supabase = init_supabase()
+    if supabase is None:
+        raise RuntimeError("database not configured")
+    # resolve_principal only returns active readers, and caches for half a minute
+    return any(str(principal["principal_id"]) == stored["reader_id"]
+               and bool(principal["is_admin"]) == bool(stored["is_admin"])
+               for principal in resolve_principal(supabase, stored["username"]))
+
+
+def remember_position(module, case_id):
+    """Record the case on screen; written only when it changes"""
+    token = st.session_state.get("session_token")
+    position = (module, str(case_id))
+    if not token or st.session_state.get("_stored_position") == position:
+        return
+    st.session_state["_stored_position"] = position
+    get_session_store().update(token, module=module, case_id=str(case_id))
+
+
+def take_restored_case(module):
+    """Case to reopen in this module after a restore, consumed once"""
+    position = st.session_state.get("restore_position")
+    if position is None or position[0] != module:
+        return None
+    st.session_state.restore_position = None
+    return position[1]
+
+
+def end_session():
+    """Forget the persisted session on logout"""
+    token = st.session_state.get("session_token")
+    if token:
+        get_session_store().delete(token)
+    st.query_params.pop(SESSION_PARAM, None)
@@ -0,0 +1,10 @@
+-- Publish the result tables to Supabase Realtime so the admin Data tab can follow
+-- inserts/updates/deletes instead of re-downloading every table on each rerun.
+alter publication supabase_realtime add table public.classifications;
+alter publication supabase_realtime add table public.realistic_appearance;
+alter publication supabase_realtime add table public.anatomic_correctness;
+
+-- Deletes only carry the primary key unless the full old row is logged
+alter table public.classifications replica identity full;
+alter table public.realistic_appearance replica identity full;
+alter table public.anatomic_correctness replica identity full;
@@ -0,0 +1,78 @@
+-- Study rounds ("epochs"): a reset bumps a counter instead of deleting rows.
+-- A reader's active epoch on a table is max(global '*' epoch, the reader's own epoch).
+create table if not exists public.study_epochs (
+    table_name text not null,
+    reader_id  text not null default '*',
+    epoch      integer not null default 0,
+    created_at timestamptz not null default now(),
+    updated_at timestamptz not null default now(),
+    primary key (table_name, reader_id)
+);
+
+-- Tag results with their epoch; the same case can now be stored once per epoch
+alter table public.classifications add column if not exists epoch integer not null default 0;
+alter table public.realistic_appearance add column if not exists epoch integer not null default 0;
+alter table public.anatomic_correctness add column if not exists epoch integer not null default 0;
+
+alter table public.classifications drop constraint if exists classifications_pkey,
+    add primary key (case_id, reader_id, epoch);
+alter table public.realistic_appearance drop constraint if exists realistic_appearance_pkey,
+    add primary key (case_id, reader_id, epoch);
+alter table public.anatomic_correctness drop constraint if exists anatomic_correctness_pkey,
+    add primary key (case_id, reader_id, epoch);
+
+-- Reader pages load "my rows in my active epoch"
+create index if not exists classifications_reader_epoch_idx on public.classifications (reader_id, epoch);
+create index if not exists realistic_appearance_reader_epoch_idx on public.realistic_appearance (reader_id, epoch);
+create index if not exists anatomic_correctness_reader_epoch_idx on public.anatomic_correctness (reader_id, epoch);
+
+-- New epoch = one past the highest epoch used on the table, so it is above every reader's current one
+create or replace function public.bump_study_epoch(p_table text, p_reader text default '*')
+returns integer
+language plpgsql
+as $$
+declare
+    next_epoch integer;
+begin
+    perform pg_advisory_xact_lock(hashtext('study_epochs:' || p_table));
+    select coalesce(max(epoch), 0) + 1 into next_epoch from public.study_epochs where table_name = p_table;
+    insert into public.study_epochs (table_name, reader_id, epoch)
+    values (p_table, p_reader, next_epoch)
+    on conflict (table_name, reader_id) do update set epoch = excluded.epoch, updated_at = now();
+    return next_epoch;
+end;
+$$;
+
+-- Stale rows are archived as JSON before being removed
+create table if not exists public.result_archive (
+    table_name  text not null,
+    epoch       integer not null,
+    row_data    jsonb not null,
+    archived_at timestamptz not null default now()
+);
+
+create or replace function public.purge_stale_epochs(p_table text, p_archive boolean default true)
+returns integer
+language plpgsql
+as $$
+declare
+    purged integer;
+    stale_rows text := format(
+        'select t.* from public.%I t
+         where t.epoch < greatest(
+             coalesce((select epoch from public.study_epochs where table_name = %L and reader_id = ''*''), 0),
+             coalesce((select epoch from public.study_epochs where table_name = %L and reader_id = t.reader_id), 0))',
+        p_table, p_table, p_table);
+begin
+    if p_archive then
+        execute format('insert into public.result_archive (table_name, epoch, row_data)
+                        select %L, s.epoch, to_jsonb(s) from (%s) s', p_table, stale_rows);
+    end if;
+    execute format('delete from public.%I d where (d.case_id, d.reader_id, d.epoch) in
+                    (select s.case_id, s.reader_id, s.epoch from (%s) s)', p_table, stale_rows);
+    get diagnostics purged = row_count;
+    return purged;
+end;
+$$;
+
+alter publication supabase_realtime add table public.study_epochs;
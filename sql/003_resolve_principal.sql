@@ -0,0 +1,19 @@
+-- One round trip per login: every account matching a username, readers first.
+-- Only the columns the login page needs are returned.
+create or replace function public.resolve_principal(p_username text)
+returns table (principal_id text, display_name text, is_admin boolean, password_hash text)
+language sql
+stable
+as $$
+    select r.reader_id, r.reader_name, false, r.password_hash
+    from public.readers r
+    where r.username = p_username and r.is_active
+    union all
+    select a.admin_id::text, 'Admin (' || a.username || ')', true, a.password_hash
+    from public.admin_users a
+    where a.username = p_username
+    order by 3;
+$$;
+
+create unique index if not exists readers_username_idx on public.readers (username);
+create unique index if not exists admin_users_username_idx on public.admin_users (username);
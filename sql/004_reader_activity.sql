@@ -0,0 +1,39 @@
+-- Reader activity written in batches by activity.ActivityTracker
+create table if not exists public.reader_activity (
+    id         bigserial primary key,
+    reader_id  text not null,
+    event      text not null,            -- page_view | case_view | save
+    module     text,
+    case_id    text,
+    dwell_ms   integer,
+    created_at timestamptz not null default now()
+);
+
+create index if not exists reader_activity_created_idx on public.reader_activity (created_at);
+create index if not exists reader_activity_reader_created_idx on public.reader_activity (reader_id, created_at);
+
+-- Readers with any activity in the last 5 minutes, and where they were last seen
+create or replace view public.active_readers as
+select distinct on (a.reader_id)
+    a.reader_id,
+    r.reader_name,
+    a.module,
+    a.created_at as last_seen
+from public.reader_activity a
+left join public.readers r on r.reader_id = a.reader_id
+where a.created_at > now() - interval '5 minutes'
+order by a.reader_id, a.created_at desc;
+
+-- Saves per reader over the last hour and the whole study, with median time per saved case
+create or replace view public.reader_throughput as
+select
+    a.reader_id,
+    r.reader_name,
+    count(*) filter (where a.created_at > now() - interval '1 hour') as saves_last_hour,
+    count(*) as saves_total,
+    percentile_cont(0.5) within group (order by a.dwell_ms) / 1000.0 as median_seconds_per_case,
+    max(a.created_at) as last_save
+from public.reader_activity a
+left join public.readers r on r.reader_id = a.reader_id
+where a.event = 'save'
+group by a.reader_id, r.reader_name;
@@ -0,0 +1,25 @@
+-- reader_id comes from a sequence instead of count(readers) + 1, which repeated ids
+-- after a deletion and raced when two admins created users at once.
+create sequence if not exists public.reader_id_seq;
+
+-- Start past every id handed out so far
+select setval(
+    'public.reader_id_seq',
+    greatest(coalesce((select max(substring(reader_id from '^reader_(\d+)$')::integer) from public.readers), 0), 1),
+    exists (select 1 from public.readers)
+);
+
+-- reader_001 ... reader_999, then reader_1000 and up: padded to three digits, never cut
+create or replace function public.next_reader_id()
+returns text
+language sql
+volatile
+as $$
+    select 'reader_' || lpad(n::text, greatest(3, length(n::text)), '0')
+    from (select nextval('public.reader_id_seq') as n) s;
+$$;
+
+alter table public.readers
+    alter column reader_id set default public.next_reader_id();
+
+-- Username uniqueness is enforced by readers_username_idx (003_resolve_principal.sql)
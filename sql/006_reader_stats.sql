@@ -0,0 +1,13 @@
+-- Header counts of the admin user grid in one row, instead of downloading every reader
+create or replace view public.reader_stats as
+select
+    count(*) as total_users,
+    count(*) filter (where is_active) as active_users,
+    count(*) filter (where not is_active) as inactive_users,
+    count(*) filter (where last_login is not null) as logged_in_users
+from public.readers;
+
+-- Filters and sorts of the paged grid
+create index if not exists readers_created_at_idx on public.readers (created_at);
+create index if not exists readers_last_login_idx on public.readers (last_login);
+create index if not exists readers_is_active_idx on public.readers (is_active);
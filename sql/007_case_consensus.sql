@@ -0,0 +1,176 @@
+-- Per-case consensus of the current study round, maintained by triggers on every save,
+-- so per-case questions read one small table instead of every rating.
+-- Only rows in their reader's active epoch count (see 002_study_epochs.sql).
+
+-- Rating scale of each result table, worst to best; written from tasks.py by
+-- install_task_table (011_task_tables.sql)
+create table if not exists public.consensus_scales (
+    table_name    text primary key,
+    rating_column text not null,
+    ordinal       boolean not null,
+    options       text[] not null
+);
+
+create table if not exists public.case_consensus (
+    table_name   text not null,
+    case_id      text not null,
+    n_reads      integer not null default 0,
+    counts       jsonb not null default '{}',   -- rating -> number of readers
+    mean_score   numeric,                       -- ordinal scales only, first option = 1
+    median_score numeric,
+    majority     text,                          -- most frequent rating, null on a tie
+    updated_at   timestamptz not null default now(),
+    primary key (table_name, case_id)
+);
+
+create or replace function public.active_epoch(p_table text, p_reader text)
+returns integer
+language sql
+stable
+as $$
+    select greatest(
+        coalesce((select epoch from public.study_epochs where table_name = p_table and reader_id = '*'), 0),
+        coalesce((select epoch from public.study_epochs where table_name = p_table and reader_id = p_reader), 0));
+$$;
+
+-- Add (p_delta = 1) or remove (p_delta = -1) one rating and refresh the case's summary;
+-- touches one row and a histogram of a few entries
+create or replace function public.apply_consensus(p_table text, p_case text, p_rating text, p_delta integer)
+returns void
+language plpgsql
+as $$
+declare
+    scale public.consensus_scales;
+begin
+    if p_rating is null or p_rating = '' then
+        return;
+    end if;
+    select * into scale from public.consensus_scales where table_name = p_table;
+
+    insert into public.case_consensus as c (table_name, case_id, n_reads, counts)
+    values (p_table, p_case, p_delta, jsonb_build_object(p_rating, p_delta))
+    on conflict (table_name, case_id) do update set
+        n_reads = c.n_reads + p_delta,
+        counts = c.counts || jsonb_build_object(p_rating, coalesce((c.counts ->> p_rating)::integer, 0) + p_delta),
+        updated_at = now();
+
+    delete from public.case_consensus where table_name = p_table and case_id = p_case and n_reads <= 0;
+
+    with histogram as (
+        select e.key as rating, e.value::integer as n, array_position(scale.options, e.key) as score
+        from public.case_consensus c, jsonb_each_text(c.counts) e
+        where c.table_name = p_table and c.case_id = p_case and e.value::integer > 0
+    ), ranked as (
+        select rating, rank() over (order by n desc) as place from histogram
+    )
+    update public.case_consensus c set
+        counts = coalesce((select jsonb_object_agg(rating, n) from histogram), '{}'),
+        mean_score = case when scale.ordinal then
+            (select sum(n * score)::numeric / nullif(sum(n), 0) from histogram) end,
+        median_score = case when scale.ordinal then
+            (select (percentile_cont(0.5) within group (order by score))::numeric
+             from histogram, generate_series(1, n)) end,
+        majority = (select min(rating) from ranked where place = 1 having count(*) = 1)
+    where c.table_name = p_table and c.case_id = p_case;
+end;
+$$;
+
+create or replace function public.maintain_case_consensus()
+returns trigger
+language plpgsql
+as $$
+declare
+    rating_column text;
+begin
+    select s.rating_column into rating_column from public.consensus_scales s where s.table_name = TG_TABLE_NAME;
+    if TG_OP = 'UPDATE' and old.epoch = new.epoch
+            and (to_jsonb(old) ->> rating_column) is not distinct from (to_jsonb(new) ->> rating_column) then
+        return null;
+    end if;
+    if TG_OP in ('UPDATE', 'DELETE') then
+        -- Rows of retired rounds were already taken out when their epoch was bumped
+        if old.epoch >= public.active_epoch(TG_TABLE_NAME, old.reader_id) then
+            perform public.apply_consensus(TG_TABLE_NAME, old.case_id, to_jsonb(old) ->> rating_column, -1);
+        end if;
+    end if;
+    if TG_OP in ('INSERT', 'UPDATE') then
+        if new.epoch >= public.active_epoch(TG_TABLE_NAME, new.reader_id) then
+            perform public.apply_consensus(TG_TABLE_NAME, new.case_id, to_jsonb(new) ->> rating_column, 1);
+        end if;
+    end if;
+    return null;
+end;
+$$;
+
+-- Installed on each result table by install_task_table (011_task_tables.sql)
+
+-- An epoch bump retires rows: a global one every row of the table (the new epoch is above
+-- all of them), a reader's one the rows that reader had in the round that just ended
+create or replace function public.retire_case_consensus()
+returns trigger
+language plpgsql
+as $$
+declare
+    rating_column text;
+    previous_epoch integer;
+    retired record;
+begin
+    if new.reader_id = '*' then
+        delete from public.case_consensus where table_name = new.table_name;
+        return null;
+    end if;
+    select s.rating_column into rating_column from public.consensus_scales s where s.table_name = new.table_name;
+    if rating_column is null then
+        return null;
+    end if;
+    previous_epoch := greatest(
+        coalesce((select epoch from public.study_epochs where table_name = new.table_name and reader_id = '*'), 0),
+        case when TG_OP = 'UPDATE' then old.epoch else 0 end);
+    for retired in execute format(
+        'select case_id, %I as rating from public.%I where reader_id = $1 and epoch >= $2 and epoch < $3',
+        rating_column, new.table_name) using new.reader_id, previous_epoch, new.epoch
+    loop
+        perform public.apply_consensus(new.table_name, retired.case_id, retired.rating, -1);
+    end loop;
+    return null;
+end;
+$$;
+
+drop trigger if exists study_epochs_consensus on public.study_epochs;
+create trigger study_epochs_consensus after insert or update on public.study_epochs
+    for each row execute function public.retire_case_consensus();
+
+-- Recompute one table's consensus from its current rows (python consensus.py rebuild)
+create or replace function public.rebuild_case_consensus(p_table text)
+returns integer
+language plpgsql
+as $$
+declare
+    rating_column text;
+    current_row record;
+    rebuilt integer;
+begin
+    select s.rating_column into rating_column from public.consensus_scales s where s.table_name = p_table;
+    if rating_column is null then
+        raise exception 'no consensus scale for table %', p_table;
+    end if;
+    -- Saves wait for the rebuild instead of being counted twice
+    execute format('lock table public.%I in share mode', p_table);
+    delete from public.case_consensus where table_name = p_table;
+    for current_row in execute format(
+        'select t.case_id, t.%I as rating from public.%I t where t.epoch >= public.active_epoch(%L, t.reader_id)',
+        rating_column, p_table, p_table)
+    loop
+        perform public.apply_consensus(p_table, current_row.case_id, current_row.rating, 1);
+    end loop;
+    select count(*) into rebuilt from public.case_consensus where table_name = p_table;
+    return rebuilt;
+end;
+$$;
+
+create or replace function public.rebuild_all_case_consensus()
+returns integer
+language sql
+as $$
+    select coalesce(sum(public.rebuild_case_consensus(table_name)), 0)::integer from public.consensus_scales;
+$$;
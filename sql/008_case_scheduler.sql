@@ -0,0 +1,231 @@
+-- Coverage-balanced case assignment: each case of a scheduled table is read by `target`
+-- readers. Readers lease cases from a shared queue instead of getting the whole manifest;
+-- a lease expires unless the reader keeps saving, and expired leases go back to the queue.
+-- A table is scheduled once seed_case_queue has filled its queue (see scheduler.py).
+
+create table if not exists public.case_queue (
+    table_name text not null,
+    case_id    text not null,
+    target     integer not null,            -- readers wanted per case
+    assigned   integer not null default 0,  -- completed reads + open leases of the current round
+    primary key (table_name, case_id)
+);
+
+-- Hand-out walks the open cases in coverage order on this index (cost: see lease_cases)
+create index if not exists case_queue_open_idx on public.case_queue (table_name, assigned, case_id)
+    where assigned < target;
+
+create table if not exists public.case_leases (
+    table_name   text not null,
+    case_id      text not null,
+    reader_id    text not null,
+    leased_at    timestamptz not null default now(),
+    expires_at   timestamptz not null,
+    completed_at timestamptz,                -- set by the first save of the case
+    primary key (table_name, case_id, reader_id)
+);
+
+create index if not exists case_leases_reader_idx on public.case_leases (table_name, reader_id, leased_at);
+create index if not exists case_leases_expiry_idx on public.case_leases (expires_at) where completed_at is null;
+
+-- Cases a reader may lease per table in total; reader_id '*' is the default for everyone
+create table if not exists public.case_quotas (
+    table_name text not null,
+    reader_id  text not null default '*',
+    quota      integer not null,
+    primary key (table_name, reader_id)
+);
+
+-- Return expired, unsaved leases to the queue, oldest first; p_limit null = all of them
+create or replace function public.reclaim_expired_leases(p_table text default null, p_limit integer default null)
+returns integer
+language plpgsql
+as $$
+declare
+    reclaimed integer;
+begin
+    with expired as (
+        select l.table_name, l.case_id, l.reader_id
+        from public.case_leases l
+        where l.completed_at is null and l.expires_at < now() and (p_table is null or l.table_name = p_table)
+        order by l.expires_at
+        limit p_limit
+        for update skip locked
+    ), removed as (
+        delete from public.case_leases l using expired e
+        where l.table_name = e.table_name and l.case_id = e.case_id and l.reader_id = e.reader_id
+        returning l.table_name, l.case_id
+    ), freed as (
+        select r.table_name, r.case_id, count(*) as n from removed r group by r.table_name, r.case_id
+    ), requeued as (
+        update public.case_queue q set assigned = q.assigned - f.n
+        from freed f
+        where q.table_name = f.table_name and q.case_id = f.case_id
+        returning 1
+    )
+    select count(*) into reclaimed from removed;
+    return reclaimed;
+end;
+$$;
+
+-- Top the reader up to p_count open leases (within their quota) and return the open ones,
+-- oldest first. Open leases are renewed. Each new lease takes the least covered case the
+-- reader has not had yet; rows another reader is leasing right now are skipped, not waited for.
+-- Cost of one new lease: the walk over case_queue_open_idx passes over the open cases this
+-- reader already had (one primary key probe of case_leases each) and the rows locked by
+-- concurrent hand-outs, so it is O(1 + cases the reader already holds below target + readers
+-- leasing at the same moment). That is bounded by the reader's quota, not by the queue size;
+-- it is constant only while readers hold few cases each.
+create or replace function public.lease_cases(p_table text, p_reader text, p_count integer default 1,
+                                              p_lease_seconds integer default 1800)
+returns table (case_id text, expires_at timestamptz)
+language plpgsql
+as $$
+#variable_conflict use_column
+declare
+    held integer;
+    reader_quota integer;
+    used integer;
+    picked text;
+begin
+    perform public.reclaim_expired_leases(p_table, 32);
+
+    update public.case_leases l set expires_at = now() + make_interval(secs => p_lease_seconds)
+    where l.table_name = p_table and l.reader_id = p_reader and l.completed_at is null;
+    get diagnostics held = row_count;
+
+    select q.quota into reader_quota from public.case_quotas q
+    where q.table_name = p_table and q.reader_id in (p_reader, '*')
+    order by q.reader_id = '*'
+    limit 1;
+    select count(*) into used from public.case_leases l where l.table_name = p_table and l.reader_id = p_reader;
+
+    while held < p_count and (reader_quota is null or used < reader_quota) loop
+        select q.case_id into picked
+        from public.case_queue q
+        where q.table_name = p_table and q.assigned < q.target
+          and not exists (select 1 from public.case_leases l
+                          where l.table_name = q.table_name and l.case_id = q.case_id and l.reader_id = p_reader)
+        order by q.assigned, q.case_id
+        limit 1
+        for update skip locked;
+        exit when picked is null;
+
+        update public.case_queue q set assigned = q.assigned + 1 where q.table_name = p_table and q.case_id = picked;
+        insert into public.case_leases (table_name, case_id, reader_id, expires_at)
+        values (p_table, picked, p_reader, now() + make_interval(secs => p_lease_seconds));
+        held := held + 1;
+        used := used + 1;
+    end loop;
+
+    return query
+        select l.case_id, l.expires_at from public.case_leases l
+        where l.table_name = p_table and l.reader_id = p_reader and l.completed_at is null
+        order by l.leased_at, l.case_id;
+end;
+$$;
+
+-- The first save of a case completes the reader's lease. A save after the lease was
+-- reclaimed still counts as a read (the case may then end up with one read too many).
+create or replace function public.complete_case_lease()
+returns trigger
+language plpgsql
+as $$
+begin
+    update public.case_leases l set completed_at = now()
+    where l.table_name = TG_TABLE_NAME and l.case_id = new.case_id and l.reader_id = new.reader_id
+      and l.completed_at is null;
+    if not found
+            and exists (select 1 from public.case_queue q where q.table_name = TG_TABLE_NAME and q.case_id = new.case_id)
+            and not exists (select 1 from public.case_leases l where l.table_name = TG_TABLE_NAME
+                            and l.case_id = new.case_id and l.reader_id = new.reader_id) then
+        insert into public.case_leases (table_name, case_id, reader_id, expires_at, completed_at)
+        values (TG_TABLE_NAME, new.case_id, new.reader_id, now(), now());
+        update public.case_queue q set assigned = q.assigned + 1
+        where q.table_name = TG_TABLE_NAME and q.case_id = new.case_id;
+    end if;
+    return null;
+end;
+$$;
+
+-- Installed on each result table by install_task_table (011_task_tables.sql)
+
+-- An epoch bump retires leases like it retires results: a global one every lease of the
+-- table, a reader's one that reader's leases. Their reads no longer count towards coverage,
+-- and the reader is handed cases afresh in the new round.
+create or replace function public.retire_case_leases()
+returns trigger
+language plpgsql
+as $$
+begin
+    with removed as (
+        delete from public.case_leases l
+        where l.table_name = new.table_name and (new.reader_id = '*' or l.reader_id = new.reader_id)
+        returning l.case_id
+    ), freed as (
+        select r.case_id, count(*) as n from removed r group by r.case_id
+    )
+    update public.case_queue q set assigned = q.assigned - f.n
+    from freed f
+    where q.table_name = new.table_name and q.case_id = f.case_id;
+    return null;
+end;
+$$;
+
+drop trigger if exists study_epochs_leases on public.study_epochs;
+create trigger study_epochs_leases after insert or update on public.study_epochs
+    for each row execute function public.retire_case_leases();
+
+-- Schedule a table: its queue becomes exactly p_cases, each wanting p_reads readers.
+-- Reads saved in the current round before scheduling count as completed leases, as do
+-- leases already handed out; an empty p_cases stops scheduling the table.
+create or replace function public.seed_case_queue(p_table text, p_cases text[], p_reads integer)
+returns integer
+language plpgsql
+as $$
+declare
+    queued integer;
+begin
+    if cardinality(p_cases) > 0 then
+        execute format(
+            'insert into public.case_leases (table_name, case_id, reader_id, leased_at, expires_at, completed_at)
+             select %L, t.case_id, t.reader_id, t.created_at, t.created_at, t.created_at
+             from public.%I t
+             where t.case_id = any ($1) and t.epoch >= public.active_epoch(%L, t.reader_id)
+             on conflict (table_name, case_id, reader_id) do nothing',
+            p_table, p_table, p_table) using p_cases;
+    end if;
+
+    insert into public.case_queue as q (table_name, case_id, target, assigned)
+    select p_table, c.case_id, p_reads,
+           (select count(*) from public.case_leases l where l.table_name = p_table and l.case_id = c.case_id)
+    from unnest(p_cases) as c(case_id)
+    on conflict (table_name, case_id) do update set target = excluded.target, assigned = excluded.assigned;
+
+    delete from public.case_queue q where q.table_name = p_table and q.case_id <> all (p_cases);
+    if cardinality(p_cases) = 0 then
+        delete from public.case_leases l where l.table_name = p_table;
+    end if;
+    select count(*) into queued from public.case_queue q where q.table_name = p_table;
+    return queued;
+end;
+$$;
+
+-- Progress of every scheduled table
+create or replace view public.case_coverage as
+select
+    q.table_name,
+    count(*) as cases,
+    sum(q.target) as reads_wanted,
+    coalesce(sum(l.completed), 0) as reads_done,
+    coalesce(sum(l.open), 0) as reads_leased,
+    count(*) filter (where coalesce(l.completed, 0) >= q.target) as cases_complete
+from public.case_queue q
+left join (
+    select table_name, case_id,
+           count(*) filter (where completed_at is not null) as completed,
+           count(*) filter (where completed_at is null) as open
+    from public.case_leases
+    group by table_name, case_id
+) l on l.table_name = q.table_name and l.case_id = q.case_id
+group by q.table_name;
@@ -0,0 +1,16 @@
+-- Saves land in the reader's active study round whatever epoch the app sends: a reader
+-- whose task was loaded before a reset keeps writing into the current round instead of
+-- the retired one. The epoch is set before the ON CONFLICT check, so an upsert matches
+-- the reader's row of the current round. Updates keep their epoch (purges, archives).
+
+create or replace function public.stamp_result_epoch()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.epoch := public.active_epoch(TG_TABLE_NAME, new.reader_id);
+    return new;
+end;
+$$;
+
+-- Installed before insert on each result table by install_task_table (011_task_tables.sql)
@@ -0,0 +1,16 @@
+-- updated_at on the result tables, set by the database on every insert and update, so
+-- the polling change feed (change_feed.PollingChangeFeed) sees re-saved ratings and
+-- not only new rows. Realtime does not need it.
+
+create or replace function public.touch_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.updated_at := now();
+    return new;
+end;
+$$;
+
+-- The column, its index (the poller reads "rows changed since the cursor") and the
+-- trigger are added to each result table by install_task_table (011_task_tables.sql)
@@ -0,0 +1,35 @@
+-- Per-table setup of the result tables, driven from tasks.py instead of copied into SQL:
+-- the consensus scale (007) and the triggers every result table carries: epoch stamp
+-- (009), updated_at (010), consensus (007) and lease completion (008).
+-- `python consensus.py rebuild` calls install_task_table for every task in TASKS, so a
+-- new task or a changed option list needs no hand-written SQL. Run it after migrating.
+
+create or replace function public.install_task_table(p_table text, p_rating_column text, p_ordinal boolean,
+                                                     p_options text[])
+returns void
+language plpgsql
+as $$
+begin
+    insert into public.consensus_scales (table_name, rating_column, ordinal, options)
+    values (p_table, p_rating_column, p_ordinal, p_options)
+    on conflict (table_name) do update
+        set rating_column = excluded.rating_column, ordinal = excluded.ordinal, options = excluded.options;
+
+    execute format('alter table public.%I add column if not exists updated_at timestamptz not null default now()',
+                   p_table);
+    execute format('create index if not exists %I on public.%I (updated_at)', p_table || '_updated_at_idx', p_table);
+
+    execute format('drop trigger if exists %I on public.%I', p_table || '_epoch', p_table);
+    execute format('create trigger %I before insert on public.%I
+                    for each row execute function public.stamp_result_epoch()', p_table || '_epoch', p_table);
+    execute format('drop trigger if exists %I on public.%I', p_table || '_updated_at', p_table);
+    execute format('create trigger %I before insert or update on public.%I
+                    for each row execute function public.touch_updated_at()', p_table || '_updated_at', p_table);
+    execute format('drop trigger if exists %I on public.%I', p_table || '_consensus', p_table);
+    execute format('create trigger %I after insert or update or delete on public.%I
+                    for each row execute function public.maintain_case_consensus()', p_table || '_consensus', p_table);
+    execute format('drop trigger if exists %I on public.%I', p_table || '_lease', p_table);
+    execute format('create trigger %I after insert on public.%I
+                    for each row execute function public.complete_case_lease()', p_table || '_lease', p_table);
+end;
+$$;
@@ -0,0 +1,714 @@
+# task_engine.py
+# One evaluation page for every task in tasks.TASKS.
+#
+# Loading, merging, saving, resetting and navigation are written once here; the
+# task definition only supplies manifest, table, rating scale and wording.
+import pandas as pd
+import streamlit as st
+import streamlit.components.v1 as components
+
+from utils import *
+from tasks import TASKS, open_task
+from epochs import current_epoch, bump_epoch
+from activity import track_page_view, track_case_view, track_save, track_bulk_save
+from session_store import restore_session, remember_position, take_restored_case, end_session
+from session_monitor import touch_session
+from scheduler import is_scheduled, lease_cases, assigned_cases
+from case_order import case_order, position_of, first_open_position
+
+COMMENT_COLUMN = "Comment"
+
+# Grid mode: rows x columns of thumbnails per page
+GRID_SIZES = {"2x2": (2, 2), "3x3": (3, 3), "4x4": (4, 4), "3x5": (3, 5)}
+GRID_THUMB_SIZE = (160, 160)
+VIEW_SINGLE, VIEW_GRID = "Single image", "Grid"
+
+TASK_STYLES = """
+    <style>
+        /* Remove all space above nav/content */
+        [data-testid="stHeader"] { display: none !important; }
+        [data-testid="stAppViewContainer"] .main { padding-top: 0 !important; }
+        .block-container { padding-top: 0 !important; margin-top: 0 !important; }
+
+        /* Remove extra padding from the main container */
+        .main .block-container {
+            padding-top: 0.5rem !important;
+            padding-bottom: 1rem !important;
+        }
+
+        /* Nav title – clear and readable */
+        .nav-title {
+            display: inline-block;
+            font-size: 1.2rem; font-weight: 700; letter-spacing: .2px;
+            padding: .25rem .6rem; border-radius: .5rem;
+            background: linear-gradient(90deg, #f8fafc, #eef2ff);
+            border: 1px solid #e2e8f0;
+        }
+
+        /* Status belt exactly 256px wide (matches image col) */
+        .status-belt { width: 256px; margin: 0 0 8px 0; text-align: center;
+                       padding: 6px 8px; border-radius: 8px; font-weight: 600; }
+        .status-green { background: #ecfdf5; border: 1px solid #10b981; color: #065f46; }
+        .status-blue  { background: #eff6ff; border: 1px solid #3b82f6; color: #1e40af; }
+
+        /* Vertical separator column visual */
+        .v-sep {
+            width: 2px; min-height: 340px;
+            background: linear-gradient(180deg, rgba(0,0,0,0), #cbd5e1, rgba(0,0,0,0));
+            border-radius: 2px;
+        }
+
+        /* Center helpers */
+        .center-col { display: flex; flex-direction: column; align-items: center; justify-content: center; }
+        .center-text { text-align: center; }
+
+        /* Compact button paddings + tighter gaps (Streamlit >=1.25 supports gap="small") */
+        .btn-compact button { padding: .4rem .6rem !important; width: auto !important; }
+
+        /* Compact + centered reset button */
+        .reset-center { display: flex; justify-content: center; }
+        .reset-center button { width: auto !important; }
+
+        /* Center Streamlit metrics horizontally */
+        .stats-wrap [data-testid="stMetric"],
+        .stats-wrap [data-testid="stMetric"] > div,
+        .stats-wrap [data-testid="stMetric"] > div > div {
+            text-align: center !important;
+            justify-content: center !important;
+        }
+        .stats-wrap [data-testid="stMetricLabel"],
+        .stats-wrap [data-testid="stMetricValue"],
+        .stats-wrap [data-testid="stMetricDelta"] {
+            justify-content: center !important;
+            text-align: center !important;
+            width: 100% !important;
+        }
+    </style>
+"""
+
+# Keyboard mode: 1-9 pick the n-th rating, Enter submits the rating form,
+# arrow keys press Back/Skip. Keys typed into a text field are left alone
+# (Escape leaves the comment box).
+KEYBOARD_SCRIPT = """
+<script>
+const doc = window.parent.document;
+if (doc.ctKeyboardHandler) {
+    doc.removeEventListener("keydown", doc.ctKeyboardHandler);
+}
+const clickButton = (text) => {
+    const button = [...doc.querySelectorAll("button")].find(b => b.innerText.trim() === text);
+    if (button) { button.click(); return true; }
+    return false;
+};
+doc.ctKeyboardHandler = (event) => {
+    const target = event.target;
+    if (target.tagName === "TEXTAREA" || (target.tagName === "INPUT" && target.type !== "radio")) {
+        if (event.key === "Escape") { target.blur(); }
+        return;
+    }
+    if (event.ctrlKey || event.metaKey || event.altKey) { return; }
+    const form = doc.querySelector('[data-testid="stForm"]');
+    if (!form) { return; }
+
+    let handled = false;
+    if (/^[1-9]$/.test(event.key)) {
+        const options = form.querySelectorAll('[role="radiogroup"] label');
+        const option = options[Number(event.key) - 1];
+        if (option) { option.click(); handled = true; }
+    } else if (event.key === "Enter") {
+        const submit = form.querySelector('[data-testid="stFormSubmitButton"] button');
+        if (submit) { submit.click(); handled = true; }
+    } else if (event.key === "ArrowLeft") {
+        handled = clickButton("← Back");
+    } else if (event.key === "ArrowRight") {
+        handled = clickButton("Skip →");
+    }
+    if (handled) { event.preventDefault(); }
+};
+doc.addEventListener("keydown", doc.ctKeyboardHandler);
+</script>
+"""
+
+
+def resolve_task_key():
+    # Generic page: the task picked on the dashboard, else the one a restored session was in
+    position = st.session_state.get("restore_position")
+    return (st.session_state.get("active_task")
+            or (position[0] if position and position[0] in TASKS else None)
+            or next(iter(TASKS)))
+
+
+def result_columns(task):
+    return [task.result_column] + ([COMMENT_COLUMN] if task.has_comment else [])
+
+
+def merge_results(df, task, rows):
+    """Fill the task's result columns from the reader's stored rows, by CaseID"""
+    db_columns = {task.result_column: task.db_column}
+    if task.has_comment:
+        db_columns[COMMENT_COLUMN] = "comment"
+
+    results = pd.DataFrame(rows or [], columns=["case_id", *db_columns.values()])
+    results["case_id"] = results["case_id"].astype(str)
+    results = results.drop_duplicates("case_id", keep="last").set_index("case_id")
+    case_ids = df["CaseID"].astype(str)
+    for column, db_column in db_columns.items():
+        # Result columns are always strings; "" marks a case not rated yet
+        df[column] = case_ids.map(results[db_column]).fillna("").astype(str)
+    return df
+
+
+def load_task_data(supabase, task):
+    df = load_data(csv_path=task.csv_path)
+    if df is None:
+        return None
+    df = merge_results(df, task, [])
+
+    try:
+        # Only the reader's active study round counts
+        st.session_state.result_epoch = current_epoch(supabase, task.key, st.session_state.reader_id)
+        response = supabase.table(task.key).select("*").eq(
+            "reader_id", st.session_state.reader_id
+        ).eq("epoch", st.session_state.result_epoch).execute()
+        df = merge_results(df, task, response.data)
+    except Exception as e:
+        st.warning(f"Could not load data from Supabase: {e}")
+        st.info(f"Make sure the {task.key} table has been updated for multi-reader support")
+        return df
+
+    st.session_state.case_schedule = None
+    if is_scheduled(supabase, task.key):
+        try:
+            # Scheduled task: only the cases leased to this reader, in lease order
+            lease_cases(supabase, task.key, st.session_state.reader_id)
+            df = select_cases(df, assigned_cases(supabase, task.key, st.session_state.reader_id))
+            st.session_state.case_schedule = task.key
+        except Exception as e:
+            st.warning(f"Could not load your assigned cases: {e}")
+    return df
+
+
+def select_cases(df, case_ids):
+    """Rows of `df` for `case_ids`, in that order, renumbered from 0"""
+    positions = pd.Series(range(len(df)), index=df["CaseID"].astype(str))
+    positions = positions[~positions.index.duplicated()].reindex(case_ids).dropna()
+    return df.iloc[positions.astype(int).to_numpy()].reset_index(drop=True)
+
+
+def extend_schedule(supabase, task, count=1):
+    """On a scheduled task, lease up to `count` more cases onto the session copy; returns how many"""
+    if st.session_state.get("case_schedule") != task.key:
+        return 0
+    df = st.session_state.df
+    held = set(df["CaseID"].astype(str))
+    try:
+        leased = lease_cases(supabase, task.key, st.session_state.reader_id, count)
+    except Exception as e:
+        st.session_state.save_error = f"Could not get the next case: {e}"
+        return 0
+    new = [case_id for case_id in leased if case_id not in held]
+    if not new:
+        return 0
+    rows = merge_results(select_cases(load_data(csv_path=task.csv_path), new), task, [])
+    st.session_state.df = pd.concat([df, rows], ignore_index=True)
+    return len(new)
+
+
+def render_task(task_key=None):
+    """Render an evaluation task page; without a key the active task is shown"""
+    # Restore first: a refreshed generic page learns its task from the stored session
+    restore_session()
+    task = TASKS[task_key or resolve_task_key()]
+    st.session_state.active_task = task.key
+
+    # Keep big header/subtitle removed
+    setup_page_layout("", "", csv_path=task.csv_path, result_column=task.result_column)
+
+    st.markdown(TASK_STYLES, unsafe_allow_html=True)
+
+    # Initialize Supabase
+    supabase = init_supabase()
+    track_page_view(task.key)
+
+    # Load data once per task
+    if not st.session_state.data_loaded:
+        with timed("load_task_data"):
+            st.session_state.df = load_task_data(supabase, task)
+
+        if st.session_state.df is not None:
+            # current_index is a position in the reader's case order, not a DataFrame row
+            st.session_state.current_index = first_open_position(task, task.result_column)
+            # Reopen the case the reader was on before a refresh or redeploy
+            restored_case = take_restored_case(task.key)
+            if restored_case is not None:
+                st.session_state.current_index = position_of(
+                    task, find_case_index(st.session_state.df, restored_case))
+            st.session_state.data_loaded = True
+
+    # Handle jump request (from quick nav)
+    if st.session_state.jump_to_case is not None and st.session_state.df is not None:
+        st.session_state.current_index = position_of(
+            task, find_case_index(st.session_state.df, st.session_state.jump_to_case))
+        st.session_state.jump_to_case = None
+        st.rerun()
+
+    # Main UI
+    if st.session_state.df is not None and len(st.session_state.df) > 0:
+        nav_bar(task)
+        st.markdown("---")
+
+        # Annotation panel and navigator rerun on their own: a radio click or a save
+        # recomputes only the panel, not the CSS, the nav bar or the case list
+        if task.grid and st.radio("View", [VIEW_SINGLE, VIEW_GRID], horizontal=True,
+                                  key="view_mode", label_visibility="collapsed") == VIEW_GRID:
+            grid_panel(supabase, task)
+        else:
+            annotation_panel(supabase, task)
+        navigator_panel(task)
+
+    elif st.session_state.get("case_schedule") == task.key:
+        st.info("No cases are assigned to you right now. Please check back later.")
+    else:
+        st.info("No data available. Please check the CSV file.")
+
+
+def nav_bar(task):
+    # Top Navigation Menu (compact): title, Home, the other tasks, Logout
+    others = [other for other in TASKS.values() if other.key != task.key]
+    nav_cols = st.columns([2] + [1] * (len(others) + 2))
+    with nav_cols[0]:
+        st.markdown(f'<div class="nav-title">{task.title}</div>', unsafe_allow_html=True)
+    with nav_cols[1]:
+        if st.button("Home", use_container_width=True):
+            st.switch_page("pages/Reader_Dashboard.py")
+    for col, other in zip(nav_cols[2:], others):
+        with col:
+            if st.button(other.nav_label, use_container_width=True):
+                open_task(other.key)
+    with nav_cols[-1]:
+        if st.button("Logout", use_container_width=True):
+            end_session()
+            for key in list(st.session_state.keys()):
+                del st.session_state[key]
+            st.rerun()
+
+
+def resume_fragment():
+    # Fragment reruns count as activity; one in a session evicted while idle reloads the page instead
+    touch_session()
+    if st.session_state.get("df") is None:
+        st.rerun()
+    if st.session_state.get("round_notice"):
+        st.warning(st.session_state.pop("round_notice"))
+
+
+def ensure_task_data(supabase, task):
+    # A save can be the first click after an idle eviction; reload before mirroring into the copy
+    if st.session_state.get("df") is None:
+        st.session_state.df = load_task_data(supabase, task)
+        st.session_state.data_loaded = st.session_state.df is not None
+        take_restored_case(task.key)
+
+
+@st.fragment
+def annotation_panel(supabase, task):
+    resume_fragment()
+    df = st.session_state.df
+    current_index = max(0, min(st.session_state.current_index, len(df) - 1))
+
+    row_index = int(case_order(task)[current_index])
+    row = df.iloc[row_index]
+    case_id = str(row["CaseID"])
+    image_path = str(row["ImagePath"])
+    track_case_view(task.key, case_id)
+    remember_position(task.key, case_id)
+    current_result = row[task.result_column]
+    current_comment = row[COMMENT_COLUMN] if task.has_comment else ""
+
+    # ====== 5-column layout with real separators: Image | Sep | Controls | Sep | Stats ======
+    col_img, col_sep12, col_ctrl, col_sep23, col_stats = st.columns(
+        [3, 0.2, 7, 0.2, 2],
+        vertical_alignment="center"
+    )
+
+    # Left image column (256x256 image + status belt)
+    with col_img:
+        if current_result:
+            st.markdown(
+                f'<div class="status-belt status-blue">🔄 <b>{task.current_label}: {current_result}</b></div>',
+                unsafe_allow_html=True
+            )
+        else:
+            st.markdown(
+                f'<div class="status-belt status-green">🆕 <b>{task.new_label}</b></div>',
+                unsafe_allow_html=True
+            )
+        with timed("load_image"):
+            show_image(image_path, task.image_subfolder, case_id)
+
+    # Vertical separator between col 1 and 2
+    with col_sep12:
+        st.markdown('<div class="v-sep"></div>', unsafe_allow_html=True)
+
+    # Middle controls column (radio + comment + buttons + confirmation + reset centered)
+    with col_ctrl:
+        st.subheader(f"Image {current_index + 1} of {len(df)}")
+
+        is_last_image = current_index == len(df) - 1
+        button_label = "Save" if is_last_image else ("Update & Next" if current_result else "Save & Next")
+        keyboard = st.toggle(
+            "⌨️ Keyboard mode", key="keyboard_mode",
+            help=f"1–{len(task.options)} pick a rating, Enter saves and moves on, ←/→ go back/skip",
+        )
+
+        if keyboard:
+            # Rating and comment sit in a form: picking an option does not rerun,
+            # the submit saves and advances in its callback, so one rerun per case
+            with st.form(f"{task.key}_form_{case_id}", border=False):
+                rating_inputs(task, case_id, current_result, current_comment)
+                st.form_submit_button(button_label, type="primary", on_click=submit_rating,
+                                      args=(supabase, task, current_index, row_index, case_id, image_path,
+                                            is_last_image))
+            if st.session_state.get("save_error"):
+                st.error(st.session_state.pop("save_error"))
+            keyboard_shortcuts()
+
+        else:
+            result_choice, comment_choice = rating_inputs(task, case_id, current_result, current_comment)
+
+        # Tighter button row (gap="small") and compact buttons (not full width)
+        st.markdown('<div class="btn-compact">', unsafe_allow_html=True)
+        bcol1, bcol2, bcol3 = st.columns(3, gap="small")
+        with bcol1:
+            if current_index > 0 and st.button("← Back", use_container_width=False, key=f"back_{case_id}"):
+                st.session_state.current_index = current_index - 1
+                rerun_fragment()
+        with bcol2:
+            if current_index < len(df) - 1 and st.button("Skip →", use_container_width=False,
+                                                         key=f"skip_{case_id}"):
+                st.session_state.current_index = current_index + 1
+                rerun_fragment()
+        with bcol3:
+            if not keyboard and st.button(button_label, type="primary", use_container_width=False,
+                                          key=f"save_{case_id}"):
+                try:
+                    with timed("save_result"):
+                        save_result(supabase, task, row_index, case_id, image_path,
+                                    result_choice, comment_choice)
+                    advance(supabase, task, current_index, is_last_image)
+                    rerun_fragment()
+                except Exception as e:
+                    st.error(f"Failed to save to database: {e}")
+        st.markdown('</div>', unsafe_allow_html=True)
+
+        # Inline confirmation after LAST save (Reset-style)
+        if st.session_state.get("next_task_confirm", False):
+            next_task_prompt(task)
+
+        # ---- Reset My Labels (compact & centered) ----
+        st.markdown("---")
+        reset_key = f"reset_confirm_{current_index}"
+        if st.session_state.get(reset_key, False):
+            st.warning(f"⚠️ Are you sure you want to reset ALL your {task.noun}s? This action cannot be undone!")
+            rc1, rc2 = st.columns(2, gap="small")
+            with rc1:
+                if st.button("✅ Yes, Reset Everything", type="primary", use_container_width=True):
+                    try:
+                        # Start a new round instead of deleting; old rows are archived later
+                        st.session_state.result_epoch = bump_epoch(
+                            supabase, task.key, st.session_state.reader_id
+                        )
+                        for column in result_columns(task):
+                            st.session_state.df[column] = ""
+                        st.session_state.current_index = 0
+                        if reset_key in st.session_state:
+                            del st.session_state[reset_key]
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"Failed to reset: {e}")
+            with rc2:
+                if st.button("❌ Cancel", use_container_width=True):
+                    if reset_key in st.session_state:
+                        del st.session_state[reset_key]
+                    rerun_fragment()
+        else:
+            # Centered reset button using columns approach
+            left_space, center_col, right_space = st.columns([1, 2, 1])
+            with center_col:
+                if st.button(task.reset_label, type="secondary", use_container_width=True):
+                    st.session_state[reset_key] = True
+                    rerun_fragment()
+
+    # Vertical separator between col 2 and 3
+    with col_sep23:
+        st.markdown('<div class="v-sep"></div>', unsafe_allow_html=True)
+
+    # Right stats column (centered vertically & horizontally)
+    with col_stats:
+        done_count = int((df[task.result_column] != "").sum())
+        total_count = len(df)
+        remaining = total_count - done_count
+        progress = (done_count / total_count) if total_count > 0 else 0.0
+
+        st.markdown('<div class="stats-wrap">', unsafe_allow_html=True)
+        st.metric("Total", total_count)
+        st.metric(task.done_label, done_count)
+        st.metric("Remaining", remaining)
+        st.metric("Progress", f"{progress:.1%}")
+        st.markdown('</div>', unsafe_allow_html=True)
+
+
+def show_image(image_path, subfolder, case_id, size=(256, 256)):
+    # With static serving on (multi-worker deployments) the image comes from the shared
+    # disk cache, otherwise from this process's media store
+    if shared_image_cache_enabled():
+        url, error = cached_image_url(image_path, subfolder=subfolder, size=size)
+        if not error:
+            st.markdown(
+                f'<img src="{url}" width="{size[0]}" alt="Case {case_id}">'
+                f'<div style="font-size:.875rem;color:#808495;">Case: {case_id}</div>',
+                unsafe_allow_html=True
+            )
+    else:
+        image, error = load_and_display_image(image_path, subfolder=subfolder, size=size)
+        if not error:
+            st.image(image, caption=f"Case: {case_id}", width=size[0])
+    if error:
+        st.error(error)
+
+
+def rating_inputs(task, case_id, current_result, current_comment):
+    """Rating radio and optional comment box, returns their values"""
+    options = list(task.options)
+    default_index = options.index(current_result) if current_result in options else 0
+    result_choice = st.radio(
+        task.prompt,
+        options,
+        index=default_index,
+        key=f"{task.key}_radio_{case_id}",
+    )
+
+    comment_choice = ""
+    if task.has_comment:
+        comment_choice = st.text_area(
+            "Additional Comments (optional):",
+            value=current_comment,
+            height=task.comment_height,
+            key=f"{task.key}_comment_{case_id}",
+            placeholder=task.comment_placeholder,
+        )
+    return result_choice, comment_choice
+
+
+def advance(supabase, task, position, is_last_image):
+    # After a save: next case (on a scheduled task, a newly leased one), or the next-task prompt
+    if is_last_image and not extend_schedule(supabase, task):
+        st.session_state["next_task_confirm"] = True
+    else:
+        st.session_state.current_index = position + 1
+
+
+def submit_rating(supabase, task, position, row_index, case_id, image_path, is_last_image):
+    """Keyboard form callback: runs before the rerun, which then shows the next case"""
+    ensure_task_data(supabase, task)
+    result = st.session_state[f"{task.key}_radio_{case_id}"]
+    comment = st.session_state.get(f"{task.key}_comment_{case_id}", "")
+    try:
+        with timed("save_result"):
+            save_result(supabase, task, row_index, case_id, image_path, result, comment)
+    except Exception as e:
+        st.session_state.save_error = f"Failed to save to database: {e}"
+        return
+    advance(supabase, task, position, is_last_image)
+
+
+def keyboard_shortcuts():
+    # The component iframe is same-origin, so it can listen on the app document.
+    # The handler is replaced on every render, never stacked.
+    components.html(KEYBOARD_SCRIPT, height=0)
+
+
+def result_record(task, case_id, image_path, result, comment=""):
+    record = {
+        "case_id": str(case_id).strip(),
+        "reader_id": st.session_state.reader_id,
+        "epoch": st.session_state.result_epoch,
+        task.db_column: str(result).strip(),
+        "image_path": str(image_path).strip(),  # Store ImagePath in database
+    }
+    if task.has_comment:
+        record["comment"] = str(comment).strip()
+    return record
+
+
+def follow_round(task, rows):
+    # The database files saves under the reader's active round (sql/009); a newer epoch on
+    # the saved rows means an admin reset the task since it was loaded
+    epoch = max((int(row.get("epoch") or 0) for row in rows or []), default=None)
+    if epoch is None or epoch <= st.session_state.result_epoch:
+        return
+    st.session_state.result_epoch = epoch
+    # Earlier ratings belong to the retired round, as after "Reset My Labels"
+    for column in result_columns(task):
+        st.session_state.df[column] = ""
+    st.session_state.round_notice = (
+        f"An administrator started a new round of {task.nav_label}. Your earlier {task.noun}s were "
+        f"archived; only {task.noun}s saved from now on count.")
+
+
+def mirror_record(task, index, record):
+    # Keep the session copy in step with what was written
+    st.session_state.df.at[index, task.result_column] = record[task.db_column]
+    if task.has_comment:
+        st.session_state.df.at[index, COMMENT_COLUMN] = record["comment"]
+
+
+def save_result(supabase, task, index, case_id, image_path, result, comment=""):
+    """Upsert one rating for the current reader and mirror it into the session copy"""
+    record = result_record(task, case_id, image_path, result, comment)
+    response = supabase.table(task.key).upsert(record).execute()
+    follow_round(task, response.data)
+    track_save(task.key, record["case_id"])
+    mirror_record(task, index, record)
+
+
+def save_results(supabase, task, ratings):
+    """Upsert a page of ratings in one request; ratings are (index, case_id, image_path, result)"""
+    records = [result_record(task, case_id, image_path, result) for _, case_id, image_path, result in ratings]
+    if not records:
+        return
+    response = supabase.table(task.key).upsert(records).execute()
+    follow_round(task, response.data)
+    track_bulk_save(task.key, [record["case_id"] for record in records])
+    for (index, *_), record in zip(ratings, records):
+        mirror_record(task, index, record)
+
+
+@st.fragment
+def grid_panel(supabase, task):
+    resume_fragment()
+    df = st.session_state.df
+    size_col, page_col, stats_col = st.columns([1, 2, 2], vertical_alignment="center")
+    with size_col:
+        grid_size = st.selectbox("Grid", list(GRID_SIZES), index=1, key="grid_size")
+    rows, cols = GRID_SIZES[grid_size]
+    per_page = rows * cols
+
+    # Pages are aligned to the grid size, starting from the page holding the current case
+    current_index = max(0, min(st.session_state.current_index, len(df) - 1))
+    start = current_index - current_index % per_page
+    page = df.iloc[case_order(task)[start:start + per_page]]
+    is_last_page = start + per_page >= len(df)
+    track_case_view(task.key, page["CaseID"].iloc[0])
+    remember_position(task.key, page["CaseID"].iloc[0])
+
+    with page_col:
+        st.subheader(f"Images {start + 1}–{start + len(page)} of {len(df)}")
+    with stats_col:
+        done_count = int((df[task.result_column] != "").sum())
+        st.progress(done_count / len(df), text=f"{task.done_label}: {done_count} / {len(df)}")
+
+    # Marks live in a form: choosing does not rerun, the page is committed in one upsert
+    with st.form(f"{task.key}_grid_{start}_{grid_size}", border=False):
+        for row_start in range(0, len(page), cols):
+            for col, (index, case) in zip(st.columns(cols), page.iloc[row_start:row_start + cols].iterrows()):
+                with col:
+                    case_id = str(case["CaseID"])
+                    show_image(case["ImagePath"], task.image_subfolder, case_id, size=GRID_THUMB_SIZE)
+                    current_result = case[task.result_column]
+                    st.radio(
+                        f"Case {case_id}",
+                        task.options,
+                        index=task.options.index(current_result) if current_result in task.options else None,
+                        key=f"{task.key}_grid_radio_{case_id}",
+                        horizontal=True,
+                        label_visibility="collapsed",
+                    )
+        st.form_submit_button("💾 Save page" if is_last_page else "💾 Save page & Next", type="primary",
+                              on_click=submit_grid_page, args=(supabase, task, page, start, per_page, is_last_page))
+
+    if st.session_state.get("save_error"):
+        st.error(st.session_state.pop("save_error"))
+
+    bcol1, bcol2, _ = st.columns([1, 1, 4], gap="small")
+    with bcol1:
+        if start > 0 and st.button("← Previous page", key=f"grid_back_{start}"):
+            st.session_state.current_index = max(0, start - per_page)
+            rerun_fragment()
+    with bcol2:
+        if not is_last_page and st.button("Skip page →", key=f"grid_skip_{start}"):
+            st.session_state.current_index = start + per_page
+            rerun_fragment()
+
+    if st.session_state.get("next_task_confirm", False):
+        next_task_prompt(task)
+
+
+def submit_grid_page(supabase, task, page, start, per_page, is_last_page):
+    """Grid form callback: one bulk upsert for every marked case that changed"""
+    ensure_task_data(supabase, task)
+    ratings = []
+    for index, case in page.iterrows():
+        choice = st.session_state.get(f"{task.key}_grid_radio_{case['CaseID']}")
+        if choice is not None and choice != case[task.result_column]:
+            ratings.append((index, case["CaseID"], case["ImagePath"], choice))
+    try:
+        with timed("save_results"):
+            save_results(supabase, task, ratings)
+    except Exception as e:
+        st.session_state.save_error = f"Failed to save to database: {e}"
+        return
+    if is_last_page and not extend_schedule(supabase, task, per_page):
+        st.session_state["next_task_confirm"] = True
+    else:
+        st.session_state.current_index = start + per_page
+
+
+def next_task_prompt(task):
+    if task.next_task:
+        st.warning(f"Would you like to move to next task ({task.next_task_name})?")
+        c1, c2 = st.columns(2, gap="small")
+        with c1:
+            if st.button(f"✅ Yes, go to {task.next_task_name} Task", use_container_width=True,
+                         key="confirm_yes_next_task"):
+                st.session_state["next_task_confirm"] = False
+                open_task(task.next_task)
+        with c2:
+            if st.button("❌ No, stay here", use_container_width=True, key="confirm_no_next_task"):
+                st.session_state["next_task_confirm"] = False
+                rerun_fragment()
+    else:
+        st.warning(f"🎉 All tasks completed! You've finished all {task.noun}s.")
+        c1, c2 = st.columns(2, gap="small")
+        with c1:
+            if st.button("🏠 Return to Home", use_container_width=True, key="confirm_yes_next_task"):
+                st.session_state["next_task_confirm"] = False
+                st.switch_page("pages/Reader_Dashboard.py")
+        with c2:
+            if st.button("🔄 Review Again", use_container_width=True, key="confirm_no_next_task"):
+                st.session_state["next_task_confirm"] = False
+                st.session_state.current_index = 0
+                rerun_fragment()
+
+
+@st.fragment
+def navigator_panel(task):
+    resume_fragment()
+    # In the reader's order, numbered by position
+    df = st.session_state.df.iloc[case_order(task)].reset_index(drop=True)
+
+    # Data viewer + quick navigation, built from the session copy rather than a fresh query.
+    # Statuses catch up with saves made in the annotation panel on the next full rerun.
+    with st.expander("View All Images", expanded=True):
+        st.dataframe(df[["CaseID", "ImagePath", *result_columns(task)]])
+
+        st.write("### Quick Navigation")
+        nav_cols = st.columns(4)
+        for idx, (cid, result) in enumerate(zip(df["CaseID"], df[task.result_column])):  # type: ignore
+            col_idx = idx % 4
+            cid_str = str(cid)
+            result_str = result or task.missing_label
+            with nav_cols[col_idx]:
+                if st.button(f"{cid_str} ({result_str})", key=f"jump_{cid_str}"):
+                    st.session_state.jump_to_case = cid_str
+                    st.rerun()
@@ -0,0 +1,132 @@
+# tasks.py
+# Declarative definitions of the evaluation tasks.
+#
+# Every reader module is rendered by task_engine.render_task from one of these
+# entries; adding a task means adding an entry here (and its manifest, image
+# folder and result table), not a new page.
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import streamlit as st
+
+GENERIC_TASK_PAGE = "pages/Evaluation.py"
+
+
+@dataclass(frozen=True)
+class Task:
+    key: str                       # result table, also the task id
+    title: str                     # title shown in the nav bar
+    nav_label: str                 # button label in the other tasks' nav bars
+    csv_path: str                  # manifest with CaseID, ImagePath
+    image_subfolder: str           # folder under images/
+    options: Tuple[str, ...]       # rating scale, worst to best
+    prompt: str = "Select the most appropriate description:"
+    result_column: str = "Assessment"   # session DataFrame column
+    db_column: str = "assessment"       # result table column
+    comment_placeholder: Optional[str] = None  # None: no comment field
+    comment_height: int = 100
+    noun: str = "assessment"
+    current_label: str = "Current assessment"
+    new_label: str = "New image to assess"
+    done_label: str = "Assessed"
+    missing_label: str = "Unassessed"
+    reset_label: str = "🔄 Reset all Assessments"
+    grid: bool = False             # offer the thumbnail grid mode (tasks without comments)
+    shuffle: bool = True           # each reader gets their own seeded case order (case_order.py)
+    ordinal: bool = False          # options are an ordered scale (weighted agreement statistics)
+    truth_column: Optional[str] = None      # manifest column with the ground truth, as codes 0, 1, ...
+    truth_options: Tuple[str, ...] = ()     # option each truth code stands for
+    positive_option: Optional[str] = None   # option counted as positive for sensitivity
+    next_task: Optional[str] = None
+    next_task_name: Optional[str] = None
+    page: str = GENERIC_TASK_PAGE
+    # Reader dashboard tile
+    icon: str = "📝"
+    subtitle: str = ""
+    description: str = ""
+
+    @property
+    def has_comment(self):
+        return self.comment_placeholder is not None
+
+
+TASKS = {
+    task.key: task for task in (
+        Task(
+            key="classifications",
+            title="Image Classification",
+            nav_label="Classification",
+            csv_path="classification.csv",
+            image_subfolder="classification",
+            options=("Real", "Synthetic"),
+            prompt="Is this image:",
+            result_column="Classification",
+            db_column="classification",
+            noun="classification",
+            current_label="Currently classified as",
+            new_label="New image to classify",
+            done_label="Classified",
+            missing_label="Unclassified",
+            reset_label="🔄 Reset all Labels",
+            grid=True,
+            truth_column="Labels",
+            truth_options=("Real", "Synthetic"),
+            positive_option="Synthetic",
+            next_task="realistic_appearance",
+            next_task_name="Realistic Appearance",
+            page="pages/Classification.py",
+            icon="🎯",
+            subtitle="Real vs Synthetic",
+            description="Determine if images are real or synthetically generated",
+        ),
+        Task(
+            key="realistic_appearance",
+            title="Realistic Appearance",
+            nav_label="Realistic Appearance",
+            csv_path="realistic_appearance.csv",
+            image_subfolder="realistic_appearance",
+            options=(
+                "Not recognizable as CT",
+                "Recognizable as CT, but overall unrealistic",
+                "Mostly realistic with only minor unrealistic areas",
+                "Overall realistic",
+            ),
+            ordinal=True,
+            comment_placeholder="Describe any unrealistic features affecting image quality "
+                                "(e.g., artifacts, noise, blurring, texture anomalies) ...",
+            next_task="anatomic_correctness",
+            next_task_name="Anatomic Evaluation",
+            page="pages/Realistic_Appearance.py",
+            icon="🖼️",
+            subtitle="Image Quality Assessment",
+            description="Assess the visual quality and realism of CT images",
+        ),
+        Task(
+            key="anatomic_correctness",
+            title="Anatomic Correctness",
+            nav_label="Anatomic Correctness",
+            csv_path="anatomic_structure.csv",
+            image_subfolder="anatomic_structure",
+            options=(
+                "Anatomic region not recognizable",
+                "Recognizable, but major parts show anatomic incorrectness",
+                "Only minor anatomic incorrectness",
+                "Anatomic features are correct",
+            ),
+            ordinal=True,
+            comment_placeholder="Specify anatomical inaccuracies "
+                                "(e.g., organ shape/size/position, missing structures, abnormal morphology)...",
+            comment_height=120,
+            page="pages/Anatomic_Correctness.py",
+            icon="🔍",
+            subtitle="Structural Accuracy",
+            description="Evaluate the anatomical accuracy and structural integrity",
+        ),
+    )
+}
+
+
+def open_task(task_key):
+    """Switch to a task's page, remembering which task the generic page should show"""
+    st.session_state.active_task = task_key
+    st.switch_page(TASKS[task_key].page)
@@ -1,10 +1,26 @@
 # utils.py
+# pandas, PIL and the supabase SDK are imported where first needed, so pages that
+# do not use them (login, dashboard) start without paying for them.
 import streamlit as st
-import pandas as pd
+import streamlit.errors
 import os
-from PIL import Image
-from supabase import create_client
+import time
+import hashlib
+import logging
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+from session_store import restore_session
+from tasks import TASKS
 
+logger = logging.getLogger(__name__)
+
+# Result tables written by the reader modules, keyed by (case_id, reader_id)
+RESULT_TABLES = {key: task.nav_label for key, task in TASKS.items()}
+RESULT_KEY = ("case_id", "reader_id")
+# Primary key of a result table row: a case is stored once per reader and epoch
+RESULT_ROW_KEY = RESULT_KEY + ("epoch",)
+
+PAGE_SIZE = 1000            # PostgREST's default row cap per request
 
 # Initialize Supabase client
 @st.cache_resource
@@ -20,7 +36,13 @@ def init_supabase():
         st.error(f"❌ Error accessing secrets: {e}")
         return None
 
+    if str(url).startswith("local://"):
+        # In-process stand-in, for load tests and offline runs
+        from local_backend import get_local_backend
+        return get_local_backend()
+
     try:
+        from supabase import create_client
         return create_client(url, key)
     except Exception as e:
         st.error(f"❌ Failed to initialize Supabase client: {e}")
@@ -28,6 +50,82 @@ def init_supabase():
 
 
 
+def fetch_all(build_query, order):
+    """Every row of a query, paged past the server's per-request row cap
+
+    build_query() returns a fresh filtered query; `order` makes the pages deterministic.
+    """
+    rows, start = [], 0
+    while True:
+        query = build_query()
+        for column in order:
+            query = query.order(column)
+        page = query.range(start, start + PAGE_SIZE - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+        start += PAGE_SIZE
+
+
+def fetch_tables_concurrently(supabase, tables, columns="*", timeout=None, prepare=None, order=RESULT_ROW_KEY):
+    """Query several tables in parallel, yielding (table, rows, error) in completion order
+
+    Each table is read in pages ordered by `order` (its primary key by default), so the
+    server's row cap does not cut it off. prepare(table, query) may add filters to each
+    query before it is executed.
+    """
+    if not tables:
+        return
+
+    def fetch(table):
+        def build_query():
+            query = supabase.table(table).select(columns)
+            return query if prepare is None else prepare(table, query)
+        return fetch_all(build_query, order)
+
+    executor = ThreadPoolExecutor(max_workers=len(tables), thread_name_prefix="fetch")
+    futures = {executor.submit(fetch, table): table for table in tables}
+    pending = set(futures)
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            pending.discard(future)
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, e
+    except FuturesTimeout:
+        for future in pending:
+            yield futures[future], None, TimeoutError(f"query timed out after {timeout}s")
+    finally:
+        # Never block the page on a straggler; its result is simply dropped
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def is_unique_violation(error):
+    """True for a Postgres unique_violation coming back through PostgREST"""
+    return getattr(error, "code", None) == "23505" or "23505" in str(error)
+
+
+@contextmanager
+def timed(label):
+    """Time a block of the hot path; the last duration per label is kept in session state"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        st.session_state.setdefault("_timings", {})[label] = elapsed_ms
+        logger.debug("%s took %.1f ms", label, elapsed_ms)
+
+
+def rerun_fragment():
+    """Rerun only the calling fragment; falls back to a full rerun outside a fragment run"""
+    try:
+        st.rerun(scope="fragment")
+    except st.errors.StreamlitAPIException:
+        st.rerun()
+
+
 # Initialize module-specific session state
 def init_module_session_state():
     if 'current_index' not in st.session_state:
@@ -44,11 +142,14 @@ def init_module_session_state():
         st.session_state.current_csv_path = ""
     if 'current_result_column' not in st.session_state:
         st.session_state.current_result_column = ""
+    if 'result_epoch' not in st.session_state:
+        st.session_state.result_epoch = 0
 
 
-# Check authentication for module pages
 # Check authentication for module pages
 def check_authentication():
+    # A refreshed browser tab is re-authenticated from its session token
+    restore_session()
     if not st.session_state.get('authenticated', False):
         st.warning("Please log in to access this page")
         st.switch_page("pages/login.py")
@@ -63,10 +164,17 @@ def check_authentication():
     return True
 
 
+# Manifests are read once per process; every caller gets its own copy
+@st.cache_data(show_spinner=False)
+def read_manifest(csv_path):
+    import pandas as pd
+    return pd.read_csv(csv_path)
+
+
 # Load CSV data (for initial image list only)
 def load_data(csv_path=""):
     if os.path.exists(csv_path):
-        df = pd.read_csv(csv_path)
+        df = read_manifest(csv_path)
         return df
     else:
         st.error(f"CSV file '{csv_path}' not found in the current directory.")
@@ -74,17 +182,13 @@ def load_data(csv_path=""):
 
 
 def find_first_unclassified_index(df, result_column=''):
-    for idx, row in df.iterrows():
-        if pd.isna(row[result_column]) or row[result_column] == '':
-            return idx
-    return 0
+    missing = df[result_column].isna() | (df[result_column] == '')
+    return missing.idxmax() if missing.any() else 0
 
 
 def find_case_index(df, case_id):
-    for idx, row in df.iterrows():
-        if str(row['CaseID']) == str(case_id):
-            return idx
-    return 0
+    matches = df.index[df['CaseID'].astype(str) == str(case_id)]
+    return matches[0] if len(matches) else 0
 
 
 def load_and_display_image(image_path, subfolder="", size=(256, 256)):
@@ -96,15 +200,56 @@ def load_and_display_image(image_path, subfolder="", size=(256, 256)):
             full_image_path = os.path.join("images", image_path)
 
         if os.path.exists(full_image_path):
-            image = Image.open(full_image_path)
-            image_resized = image.resize(size)
-            return image_resized, None
+            # Keyed on mtime so a replaced image is picked up
+            return open_resized_image(full_image_path, tuple(size), os.path.getmtime(full_image_path)), None
         else:
             return None, f"Image not found: {full_image_path}"
     except Exception as e:
         return None, f"Error loading image: {e}"
 
 
+# Resized images shared by all worker processes, served by Streamlit's static file handler
+IMAGE_CACHE_DIR = os.path.join("static", "image_cache")
+IMAGE_CACHE_URL = "app/static/image_cache"
+
+
+def shared_image_cache_enabled():
+    return bool(st.get_option("server.enableStaticServing"))
+
+
+def cached_image_url(image_path, subfolder="", size=(256, 256)):
+    """URL of a resized copy in the shared disk cache, or (None, error) like load_and_display_image
+
+    Any worker can serve the URL; unlike uploads and downloads, images do not depend on the sticky route.
+    """
+    full_image_path = os.path.join("images", subfolder, image_path)
+    if not os.path.exists(full_image_path):
+        return None, f"Image not found: {full_image_path}"
+    try:
+        # Named after source path, mtime and size: a replaced image gets a new entry
+        key = f"{full_image_path}|{os.path.getmtime(full_image_path)}|{size[0]}x{size[1]}"
+        name = hashlib.sha1(key.encode()).hexdigest() + ".png"
+        cache_path = os.path.join(IMAGE_CACHE_DIR, name)
+        if not os.path.exists(cache_path):
+            os.makedirs(IMAGE_CACHE_DIR, exist_ok=True)
+            # Write then rename, so a concurrent worker never serves a partial file
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            open_resized_image(full_image_path, tuple(size), os.path.getmtime(full_image_path)).save(
+                tmp_path, format="PNG")
+            os.replace(tmp_path, cache_path)
+        return f"{IMAGE_CACHE_URL}/{name}", None
+    except Exception as e:
+        return None, f"Error loading image: {e}"
+
+
+# Decoded, resized images are shared by all sessions; only found files get cached
+@st.cache_resource(max_entries=512, show_spinner=False)
+def open_resized_image(full_image_path, size, mtime):
+    from PIL import Image
+    with Image.open(full_image_path) as image:
+        return image.resize(size)
+
+
 def setup_page_layout(title, description, csv_path="", result_column=""):
     # Check authentication first
     if not check_authentication():
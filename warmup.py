@@ -0,0 +1,109 @@
+# warmup.py
+# Optional warm-up before a worker accepts traffic.
+#
+# Imports the heavy modules, connects the database client and fills the manifest
+# and image caches in this process, then hands over to the Streamlit CLI so the
+# server only binds its port once the first reader would hit warm caches:
+#
+#   python warmup.py run main.py --server.port 8601      (serve.py --warm-up does this)
+import os
+import sys
+import time
+
+import numpy as np
+
+from case_order import order_key, permutation
+from tasks import TASKS
+from utils import (init_supabase, load_data, read_manifest, load_and_display_image, cached_image_url,
+                   shared_image_cache_enabled)
+
+WARM_IMAGES_PER_TASK = 12
+# Readers whose first cases are warmed, the most recent logins first
+WARM_READERS = 50
+
+
+def recent_readers(supabase, limit=WARM_READERS):
+    """reader_ids of the active readers who logged in last"""
+    rows = (supabase.table("readers").select("reader_id").eq("is_active", True)
+            .order("last_login", desc=True).limit(limit).execute().data or [])
+    return [str(row["reader_id"]) for row in rows]
+
+
+def opening_rows(task, df, readers, count):
+    """Manifest rows readers open first: each reader's first position, then their second...
+
+    Shuffled tasks start every reader at a different case (case_order.py), so the
+    manifest head is not where readers start. Without known readers the rows are an
+    even spread over the manifest, which a keyed order samples uniformly.
+    """
+    if not task.shuffle:
+        return list(range(min(count, len(df))))
+    if not readers:
+        return sorted(set(np.linspace(0, len(df) - 1, num=min(count, len(df)), dtype=int).tolist()))
+    depth = -(-count // len(readers))
+    orders = [permutation(df["CaseID"], order_key(task.key, reader_id))[:depth] for reader_id in readers]
+    rows = []
+    for position in range(depth):
+        for order in orders:
+            if position < len(order) and int(order[position]) not in rows:
+                rows.append(int(order[position]))
+    return rows[:count]
+
+
+def warm_up(images_per_task=WARM_IMAGES_PER_TASK, static_cache=False):
+    """Preload what the first requests need, returns the seconds spent per step"""
+    timings = {}
+
+    def step(name, function):
+        started = time.perf_counter()
+        try:
+            function()
+        except Exception as e:
+            print(f"warm-up: {name} failed: {e}", file=sys.stderr)
+        timings[name] = time.perf_counter() - started
+
+    def import_modules():
+        import pandas  # noqa: F401  (task pages)
+        import PIL.Image  # noqa: F401  (image loading)
+        import supabase  # noqa: F401  (database client)
+        import task_engine  # noqa: F401
+
+    def load_manifests():
+        for task in TASKS.values():
+            if os.path.exists(task.csv_path):
+                read_manifest(task.csv_path)
+
+    def load_images():
+        try:
+            readers = recent_readers(init_supabase())
+        except Exception as e:
+            print(f"warm-up: no reader list ({e}), warming a spread of cases", file=sys.stderr)
+            readers = []
+        for task in TASKS.values():
+            df = load_data(csv_path=task.csv_path)
+            if df is None or df.empty:
+                continue
+            for image_path in df["ImagePath"].iloc[opening_rows(task, df, readers, images_per_task)]:
+                if static_cache:
+                    cached_image_url(str(image_path), subfolder=task.image_subfolder)
+                else:
+                    load_and_display_image(str(image_path), subfolder=task.image_subfolder)
+
+    step("imports", import_modules)
+    step("database client", init_supabase)
+    step("manifests", load_manifests)
+    step("images", load_images)
+    return timings
+
+
+if __name__ == "__main__":
+    # Warm this process, then run the server in it
+    from streamlit.web import cli
+
+    static_cache = "--server.enableStaticServing" in sys.argv or shared_image_cache_enabled()
+    started = time.perf_counter()
+    timings = warm_up(static_cache=static_cache)
+    print("warm-up: " + ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in timings.items())
+          + f" (total {(time.perf_counter() - started) * 1000:.0f} ms)", flush=True)
+    sys.argv = ["streamlit", *sys.argv[1:]]
+    sys.exit(cli.main())